@@ -36,6 +36,28 @@ from supabase import create_client
 from pydantic import BaseModel, Field
 from typing import Optional, List
 
+from utils.recipe_pool import RecipePool
+from utils.plan_optimizer import SEEDED_MAX_RESTARTS, optimize_week
+from utils.food_matcher import get_exclusion_matcher
+from utils.plan_diff import diff_plan
+from utils.nutrient_tree import nutrient_values
+from utils.plan_memo import plan_memo, plan_memo_key, plan_seed
+from utils.suggest_index import SuggestIndex
+from utils.pagination import decode_cursor, encode_cursor, page_size
+from utils.fields import FOOD_LOG_FIELDS, PLAN_FIELDS, RECIPE_FIELDS, parse_fields, select_clause
+from utils.http_cache import http_cached
+from utils.compression import init_compression
+from utils.facets import FACETS, PREP_TIME_BUCKETS
+from services.recipe_catalog import get_recipe_catalog
+from services.job_queue import JobQueue
+from services.usage_counters import get_usage_counters
+from services.product_cache import (ProductCache, KIND_PRODUCT, KIND_SEARCH, PRODUCT_TTL_SECONDS,
+                                    SEARCH_TTL_SECONDS, normalize_barcode, search_key)
+from services.off_dump import open_offline_store, SEARCH_FIELDS
+from utils.http_client import http_get, BARCODE_TIMEOUT, SEARCH_TIMEOUT
+from utils.fanout import BoundedExecutor, fan_out
+from services.recipe_search import search_recipes
+
 # ==================== LOGGING CONFIGURATION ====================
 # Configure logging for debugging (no file logging in serverless)
 logging.basicConfig(
@@ -48,6 +70,7 @@ logger.info("Starting Diet Tracker API...")
 
 app = Flask(__name__)
 CORS(app, origins=["*"], supports_credentials=True)
+init_compression(app)
 
 # Credenciales Supabase desde variables de entorno
 SUPABASE_URL = os.getenv("SUPABASE_URL", "https://kaomgwojvnncidyezdzj.supabase.co")
@@ -121,6 +144,10 @@ class GeneratePlanRequest(BaseModel):
     user_id: Optional[str] = None  # Optional, uses token if not provided
     target_calories: Optional[int] = None  # Uses profile if not provided
     preferences: Optional[dict] = None  # Optional preferences override
+    mode: Optional[str] = Field('random', pattern="^(random|optimize)$")  # 'optimize' fits daily macros
+    incremental: Optional[bool] = False  # Only rewrite the meals that changed
+    deterministic: Optional[bool] = False  # Seed from (user, ISO week): same inputs, same plan
+    seed: Optional[int] = None  # Explicit seed (benchmarks); implies deterministic
 
 # ==================== UTILIDADES ====================
 
@@ -262,7 +289,19 @@ def distribute_meal_calories(total_calories: float, meals_per_day: int) -> dict:
         for meal, ratio in distribution.items()
     }
 
-def select_recipes(supabase, meal_type: str, preferences: dict, target_calories: float, limit: int = 5) -> list:
+def project_fields(rows: list, fields: tuple) -> list:
+    """Copy only the given keys of each row (cached catalog rows are shared)."""
+    return [{field: row.get(field) for field in fields} for row in rows]
+
+def excluded_recipe_ids(supabase, preferences: dict) -> frozenset:
+    """Ids of catalog recipes containing any allergen or disliked food (set lookup on the ingredient index)."""
+    matcher = get_exclusion_matcher(preferences)
+    if not matcher:
+        return frozenset()
+    return get_recipe_catalog(supabase).ingredient_index().excluded_ids(matcher)
+
+def select_recipes(supabase, meal_type: str, preferences: dict, target_calories: float, limit: int = 5,
+                   pool: RecipePool = None, excluded_ids: frozenset = None) -> list:
     """
     Select suitable recipes for a meal type based on preferences and calorie target.
     
@@ -272,6 +311,8 @@ def select_recipes(supabase, meal_type: str, preferences: dict, target_calories:
         preferences: dict with allergies, disliked_foods, goal_type
         target_calories: Target calories for this meal
         limit: Max number of recipes to return
+        pool: Optional preloaded RecipePool; defaults to the cached catalog
+        excluded_ids: Optional precomputed excluded_recipe_ids() for these preferences
     
     Returns:
         List of suitable recipe dicts
@@ -283,51 +324,47 @@ def select_recipes(supabase, meal_type: str, preferences: dict, target_calories:
     max_cal = int(target_calories * 1.20)
     
     try:
-        # Base query for meal type
-        query = supabase.table('master_recipes').select('*').eq('meal_type', meal_type)
+        if pool is None:
+            pool = get_recipe_catalog(supabase).pool()
         
-        # Filter by calorie range
-        query = query.gte('calories', min_cal).lte('calories', max_cal)
-        
-        # Execute query
-        result = query.limit(limit * 2).execute()  # Get extra for filtering
-        recipes = result.data or []
+        # Answer from the in-memory index instead of querying master_recipes
+        recipes = pool.candidates(meal_type, min_cal, max_cal)
         logger.debug(f"Found {len(recipes)} recipes for {meal_type}")
         
-        # Filter by allergies and disliked foods
-        allergies = preferences.get('allergies', '').lower() if preferences else ''
-        disliked = preferences.get('disliked_foods', '').lower() if preferences else ''
-        
-        filtered = []
-        for recipe in recipes:
-            ingredients = recipe.get('ingredients', '').lower()
-            
-            # Skip if contains allergens
-            if allergies:
-                allergen_list = [a.strip() for a in allergies.split(',') if a.strip()]
-                if any(allergen in ingredients for allergen in allergen_list):
-                    continue
-            
-            # Skip if contains disliked foods
-            if disliked:
-                disliked_list = [d.strip() for d in disliked.split(',') if d.strip()]
-                if any(food in ingredients for food in disliked_list):
-                    continue
-            
-            filtered.append(recipe)
-            
-            if len(filtered) >= limit:
-                break
+        # Filter by allergies and disliked foods: set difference against the ingredient index
+        if excluded_ids is None:
+            excluded_ids = excluded_recipe_ids(supabase, preferences)
+        filtered = [r for r in recipes if r.get('id') not in excluded_ids][:limit]
         
-        # If not enough recipes after filtering, return what we have
-        logger.debug(f"Returning {len(filtered[:limit])} filtered recipes for {meal_type}")
-        return filtered[:limit] if filtered else recipes[:limit]
+        # Never fall back to excluded recipes: an empty list leaves the slot empty
+        logger.debug(f"Returning {len(filtered)} filtered recipes for {meal_type}")
+        return filtered
         
     except Exception as e:
         logger.error(f"Error selecting recipes for {meal_type}: {e}")
         return []
 
-def generate_weekly_plan(supabase, user_id: str, profile: dict, target_calories: int = None) -> dict:
+# Candidates per meal handed to the optimizer
+OPTIMIZER_CANDIDATES = 40
+
+# Upper bound for k in the swap alternatives endpoint
+MAX_ALTERNATIVES = 20
+
+# Default protein floor (g) for the high-protein discovery endpoint
+DEFAULT_MIN_PROTEIN = 20.0
+
+# Typeahead: upper bound for k and the suggestion sources
+MAX_SUGGESTIONS = 20
+SUGGESTION_TYPES = ('recipe', 'ingredient', 'product')
+
+# search-food: recipes and Open Food Facts run at the same time under one deadline, each on
+# its own bounded pool (a backlog of slow OFF calls never delays the recipe search)
+SEARCH_FOOD_DEADLINE_SECONDS = float(os.getenv('SEARCH_FOOD_DEADLINE', '2.5'))
+recipe_search_executor = BoundedExecutor(max_workers=8, max_pending=16, thread_name_prefix='recipe-search')
+off_search_executor = BoundedExecutor(max_workers=8, max_pending=16, thread_name_prefix='off-search')
+
+def generate_weekly_plan(supabase, user_id: str, profile: dict, target_calories: int = None, mode: str = 'random',
+                         incremental: bool = False, deterministic: bool = False, seed: int = None) -> dict:
     """
     Generate a complete weekly meal plan for a user.
     
@@ -336,6 +373,13 @@ def generate_weekly_plan(supabase, user_id: str, profile: dict, target_calories:
         user_id: User UUID
         profile: User profile dict with preferences
         target_calories: Optional override for calories
+        mode: 'random' picks any recipe within the calorie window;
+              'optimize' picks each day's combination closest to the calorie and macro targets
+        incremental: Diff against the stored week and write only the changed meals
+                     (manual swaps and still-valid meals are kept)
+        deterministic: Seed the generator from (user, ISO year, ISO week); seeded plans are
+                       memoized by profile inputs, calorie target and catalog version
+        seed: Explicit seed; implies deterministic
     
     Returns:
         dict with plan_id, week_number, days structure
@@ -365,32 +409,136 @@ def generate_weekly_plan(supabase, user_id: str, profile: dict, target_calories:
     }
     
     # Get current week number
-    week_number = datetime.now().isocalendar()[1]
+    iso_year, week_number, _ = datetime.now().isocalendar()
     
-    # Delete existing plan for this week
+    # Candidate pool comes from the cached catalog; every lookup is answered from memory
+    catalog_version = None
     try:
-        supabase.table('weekly_plans').delete().eq('user_id', user_id).eq('week_number', week_number).execute()
-    except:
-        pass  # Continue even if delete fails
+        catalog = get_recipe_catalog(supabase)
+        pool = catalog.pool()
+        catalog_version = catalog.version
+        excluded_ids = excluded_recipe_ids(supabase, preferences)
+    except Exception as e:
+        logger.error(f"Error loading recipe pool: {e}")
+        pool = RecipePool([])
+        excluded_ids = frozenset()
+    
+    if seed is None and deterministic:
+        seed = plan_seed(user_id, iso_year, week_number)
+    rng = random.Random(seed)
+    
+    # Seeded plans are reproducible, so identical inputs reuse the previous computation
+    memo_key = None
+    if seed is not None and catalog_version is not None:
+        memo_key = plan_memo_key(
+            user_id=user_id, week_number=week_number, seed=seed, mode=mode,
+            meals_per_day=meals_per_day, goal=goal_type, target_calories=target_calories,
+            allergies=preferences['allergies'], disliked_foods=preferences['disliked_foods'],
+            catalog_version=catalog_version
+        )
+    memoized = plan_memo.get(memo_key) if memo_key else None
+    
+    # Delete existing plan for this week (incremental mode diffs against it instead)
+    if not incremental:
+        try:
+            supabase.table('weekly_plans').delete().eq('user_id', user_id).eq('week_number', week_number).execute()
+        except:
+            pass  # Continue even if delete fails
     
     # Generate plan for each day (7 days)
     days_of_week = ['lunes', 'martes', 'miércoles', 'jueves', 'viernes', 'sábado', 'domingo']
+    if memoized is not None:
+        weekly_plan, all_meals = memoized
+    else:
+        weekly_plan, all_meals = build_weekly_entries(
+            supabase, user_id, week_number, days_of_week, meal_types, meal_calories, macros,
+            target_calories, preferences, pool, excluded_ids, mode, rng, seeded=seed is not None
+        )
+        if memo_key:
+            plan_memo.put(memo_key, (weekly_plan, all_meals))
+    
+    if incremental:
+        changes = apply_plan_incrementally(supabase, user_id, week_number, all_meals,
+                                           keep_valid=(mode == 'random'), pool=pool,
+                                           excluded_ids=excluded_ids, meal_calories=meal_calories)
+        weekly_plan = {day_name: [] for day_name in days_of_week}
+        for entry in changes.pop('plan'):
+            day_idx = entry.get('day_of_week')
+            if isinstance(day_idx, int) and 0 <= day_idx < len(days_of_week):
+                weekly_plan[days_of_week[day_idx]].append(entry)
+        total_entries = sum(len(meals) for meals in weekly_plan.values())
+    else:
+        # Batch insert all meals
+        changes = None
+        created_entries = []
+        if all_meals:
+            try:
+                insert_result = supabase.table('weekly_plans').insert(all_meals).execute()
+                created_entries = insert_result.data or []
+            except Exception as e:
+                print(f"Error inserting meals: {e}")
+        total_entries = len(created_entries)
+    
+    return {
+        'user_id': user_id,
+        'week_number': week_number,
+        'days': weekly_plan,
+        'total_entries': total_entries,
+        'macros_target': macros,
+        'meal_calories': meal_calories,
+        'mode': mode,
+        'changes': changes,
+        'seed': seed,
+        'cached': memoized is not None
+    }
+
+def build_weekly_entries(supabase, user_id: str, week_number: int, days_of_week: list, meal_types: list,
+                         meal_calories: dict, macros: dict, target_calories: int, preferences: dict,
+                         pool: RecipePool, excluded_ids: frozenset, mode: str, rng, seeded: bool = False) -> tuple:
+    """
+    Pick a recipe for every meal of the week.
+    
+    Args:
+        rng: random.Random used for every choice (seeded for reproducible plans)
+        seeded: The rng is seeded; the optimizer then stops at a fixed restart cap
+                (SEEDED_MAX_RESTARTS) so the result depends on the seed, not on machine load
+    
+    Returns:
+        (weekly_plan by day name, flat list of weekly_plans entries)
+    """
     weekly_plan = {}
     all_meals = []
     
+    optimized_days = None
+    if mode == 'optimize':
+        # Choose every day's combination against the daily calorie and macro targets
+        candidates = {
+            meal_type: select_recipes(supabase, meal_type, preferences, meal_calories[meal_type],
+                                      limit=OPTIMIZER_CANDIDATES, pool=pool, excluded_ids=excluded_ids)
+            for meal_type in meal_types
+        }
+        # Seeded runs keep the time budget as a hard limit and stop at a fixed restart cap,
+        # which is reached well before the deadline, so the plan is reproducible
+        optimized_days = optimize_week(
+            candidates, meal_calories, {**macros, 'calories': target_calories}, days=len(days_of_week),
+            rng=rng, max_restarts=SEEDED_MAX_RESTARTS if seeded else None
+        )
+    
     for day_idx, day_name in enumerate(days_of_week):
         day_meals = []
         
         for meal_type in meal_types:
             target = meal_calories.get(meal_type, target_calories / len(meal_types))
             
-            # Select recipes for this meal
-            recipes = select_recipes(supabase, meal_type, preferences, target, limit=10)
+            if optimized_days is not None:
+                selected_recipe = optimized_days[day_idx].get(meal_type)
+            else:
+                # Select recipes for this meal and pick a random one
+                recipes = select_recipes(supabase, meal_type, preferences, target, limit=10, pool=pool,
+                                         excluded_ids=excluded_ids)
+                selected_recipe = rng.choice(recipes) if recipes else None
             
-            if recipes:
-                # Pick a random recipe from suitable ones
-                selected_recipe = random.choice(recipes)
-                
+            if selected_recipe:
                 meal_entry = {
                     'user_id': user_id,
                     'week_number': week_number,
@@ -410,23 +558,54 @@ def generate_weekly_plan(supabase, user_id: str, profile: dict, target_calories:
         
         weekly_plan[day_name] = day_meals
     
-    # Batch insert all meals
-    created_entries = []
-    if all_meals:
-        try:
-            insert_result = supabase.table('weekly_plans').insert(all_meals).execute()
-            created_entries = insert_result.data or []
-        except Exception as e:
-            print(f"Error inserting meals: {e}")
+    return weekly_plan, all_meals
+
+def apply_plan_incrementally(supabase, user_id: str, week_number: int, new_entries: list, keep_valid: bool,
+                             pool: RecipePool, excluded_ids: frozenset, meal_calories: dict) -> dict:
+    """
+    Write a regenerated week as a diff against the stored weekly_plans rows.
     
-    return {
-        'user_id': user_id,
-        'week_number': week_number,
-        'days': weekly_plan,
-        'total_entries': len(created_entries),
-        'macros_target': macros,
-        'meal_calories': meal_calories
-    }
+    Args:
+        supabase: Supabase client
+        user_id: User UUID
+        week_number: ISO week being regenerated
+        new_entries: Freshly generated weekly_plans entries
+        keep_valid: Keep stored meals whose recipe still fits the preferences and calorie window
+        pool: RecipePool used for the generation
+        excluded_ids: Recipe ids excluded by the user's preferences
+        meal_calories: Target calories per meal type
+    
+    Returns:
+        dict with inserted, updated, deleted and kept counts plus the resulting plan rows
+    """
+    existing_result = supabase.table('weekly_plans').select('*').eq('user_id', user_id).eq('week_number', week_number).execute()
+    existing_rows = existing_result.data or []
+    
+    valid_ids = {}
+    def still_valid(row: dict) -> bool:
+        meal_type = row.get('meal_type')
+        if meal_type not in valid_ids:
+            target = meal_calories.get(meal_type, 0)
+            window = pool.candidates(meal_type, int(target * 0.80), int(target * 1.20))
+            valid_ids[meal_type] = {r.get('id') for r in window if r.get('id') not in excluded_ids}
+        return row.get('selected_recipe_id') in valid_ids[meal_type]
+    
+    diff = diff_plan(existing_rows, new_entries, still_valid if keep_valid else None)
+    counts = {'inserted': 0, 'updated': 0, 'deleted': 0}
+    if diff['upserts'] or diff['delete_ids']:
+        # Single RPC: deletes, updates and inserts are applied in one transaction
+        upserts = [{k: v for k, v in entry.items() if k != 'user_id'} for entry in diff['upserts']]
+        result = supabase.rpc('apply_weekly_plan_diff', {
+            'p_user_id': user_id,
+            'p_week_number': week_number,
+            'p_upserts': upserts,
+            'p_delete_ids': diff['delete_ids']
+        }).execute()
+        if isinstance(result.data, dict):
+            counts.update({k: result.data.get(k, 0) for k in counts})
+    
+    logger.info(f"Incremental plan for {user_id} week {week_number}: {counts}, kept {len(diff['kept'])}")
+    return {**counts, 'kept': len(diff['kept']), 'plan': diff['plan']}
 
 # ==================== ENDPOINTS ====================
 
@@ -437,6 +616,70 @@ def health():
 
 # ==================== PRODUCT SEARCH (Open Food Facts) ====================
 
+# Product names seen in Open Food Facts responses, offered by /api/suggest
+RECENT_PRODUCTS_MAX = 2000
+recent_products = SuggestIndex(max_entries=RECENT_PRODUCTS_MAX)
+
+def remember_products(products: list):
+    """Add product names from an Open Food Facts response to the typeahead index."""
+    for product in products:
+        try:
+            recent_products.add(product.get('name') or '', 'product', weight=1.5,
+                                barcode=product.get('barcode'), brand=product.get('brands') or product.get('brand') or '')
+        except Exception as e:
+            logger.debug(f"Could not index product name: {e}")
+
+# Open Food Facts lookups go through a persistent cache (SQLite + in-memory LRU);
+# concurrent misses for the same barcode or search share a single outbound call
+product_cache = ProductCache()
+# Optional offline dump built with import_off_dump.py; barcode lookups try it first
+offline_products = open_offline_store(os.getenv('OFF_DUMP_DIR'))
+
+OFF_PRODUCT_URL = "https://world.openfoodfacts.org/api/v2/product/{barcode}.json"
+OFF_SEARCH_URL = "https://world.openfoodfacts.org/api/v2/search"
+OFF_FOOD_SEARCH_URL = "https://world.openfoodfacts.org/cgi/search.pl"
+# Every field read by search_by_barcode and get_product_by_barcode (keeps cached payloads small)
+OFF_PRODUCT_FIELDS = (
+    'code,product_name,product_name_es,product_name_en,brands,brand_owner,categories,categories_tags,nutriments,'
+    'image_url,image_front_url,image_small_url,image_ingredients_url,image_nutrition_url,quantity,serving_size,'
+    'ingredients_text,ingredients,allergens,allergens_tags,traces,stores,countries,nutriscore_grade,'
+    'nutriscore_score,nova_group,ecoscore_grade,ecoscore_score,last_modified_t'
+)
+
+def fetch_off_product(barcode: str):
+    """Raw Open Food Facts product for a barcode, or None if OFF does not know it."""
+    response = http_get(OFF_PRODUCT_URL.format(barcode=barcode), params={'fields': OFF_PRODUCT_FIELDS}, timeout=BARCODE_TIMEOUT)
+    data = response.json()
+    return data['product'] if data.get('status') == 1 else None
+
+def get_off_product(barcode: str):
+    """
+    Open Food Facts product from the offline dump or through the product cache.
+    
+    Barcodes missing from the dump (or with no dump configured) go to the
+    cache and, on a miss, to Open Food Facts. Unknown barcodes are cached too (negative caching); network errors and
+    timeouts propagate and are not cached.
+    """
+    barcode = normalize_barcode(barcode)
+    if offline_products is not None:
+        product = offline_products.get(barcode)
+        if product is not None:
+            return product
+    return product_cache.get_or_fetch(KIND_PRODUCT, barcode, lambda: fetch_off_product(barcode), PRODUCT_TTL_SECONDS)
+
+def fetch_off_search(params: dict) -> list:
+    """Raw products from the Open Food Facts v2 search API."""
+    response = http_get(OFF_SEARCH_URL, params=params, timeout=SEARCH_TIMEOUT)
+    return response.json().get('products', [])
+
+def fetch_off_food_search(query: str, page_size: int) -> list:
+    """Raw products from the legacy Open Food Facts search used by search-food."""
+    response = http_get(OFF_FOOD_SEARCH_URL, params={
+        'search_terms': query, 'json': 1, 'page_size': page_size,
+        'fields': 'code,product_name,nutriments,image_small_url,brands,serving_size'
+    }, timeout=SEARCH_TIMEOUT)
+    return response.json().get('products') or []
+
 @app.route('/api/search-products', methods=['GET'])
 def search_products():
     """
@@ -474,13 +717,15 @@ def search_products():
 def search_by_barcode(barcode: str):
     """Busca un producto específico por su código de barras."""
     try:
-        url = f"https://world.openfoodfacts.org/api/v2/product/{barcode}.json"
-        response = requests.get(url, timeout=10)
-        data = response.json()
+        product = get_off_product(barcode)
         
-        if data.get('status') == 1:
-            product = data['product']
+        if product is not None:
             nutriments = product.get('nutriments', {})
+            remember_products([{
+                'barcode': barcode,
+                'name': product.get('product_name', '') or product.get('product_name_es', ''),
+                'brands': product.get('brands', '')
+            }])
             
             return jsonify({
                 'products': [{
@@ -524,9 +769,6 @@ def search_by_barcode(barcode: str):
 def search_by_name(query: str, supermarket: str = ''):
     """Busca productos por nombre con filtros opcionales."""
     try:
-        # Construir URL de búsqueda
-        search_url = "https://world.openfoodfacts.org/api/v2/search"
-        
         # Parámetros de búsqueda
         params = {
             'search_terms': query,
@@ -534,7 +776,7 @@ def search_by_name(query: str, supermarket: str = ''):
             'action': 'process',
             'json': '1',
             'page_size': 20,
-            'fields': 'code,product_name,brands,categories,nutriments,image_url,image_small_url,quantity,serving_size,ingredients_text,stores,countries,nutriscore_grade,nova_group'
+            'fields': ','.join(SEARCH_FIELDS)
         }
         
         # Filtrar por supermercado si se especifica
@@ -547,11 +789,13 @@ def search_by_name(query: str, supermarket: str = ''):
             if supermarket in supermarket_map:
                 params['stores_tags'] = supermarket_map[supermarket]
         
-        response = requests.get(search_url, params=params, timeout=15)
-        data = response.json()
+        raw_products = product_cache.get_or_fetch(
+            KIND_SEARCH, search_key(query, 'products', params.get('stores_tags')),
+            lambda: fetch_off_search(params), SEARCH_TTL_SECONDS
+        ) or []
         
         products = []
-        for product in data.get('products', []):
+        for product in raw_products:
             nutriments = product.get('nutriments', {})
             
             # Solo incluir productos con datos nutricionales
@@ -574,6 +818,8 @@ def search_by_name(query: str, supermarket: str = ''):
                     'nutriscore': product.get('nutriscore_grade', '')
                 })
         
+        remember_products(products)
+        
         return jsonify({
             'products': products,
             'count': len(products),
@@ -599,18 +845,20 @@ def get_product_by_barcode(barcode: str):
     Retorna información nutricional detallada.
     """
     try:
-        url = f"https://world.openfoodfacts.org/api/v2/product/{barcode}.json"
-        response = requests.get(url, timeout=10)
-        data = response.json()
+        product = get_off_product(barcode)
         
-        if data.get('status') != 1:
+        if product is None:
             return jsonify({
                 'error': 'Producto no encontrado',
                 'barcode': barcode
             }), 404
         
-        product = data['product']
         nutriments = product.get('nutriments', {})
+        remember_products([{
+            'barcode': barcode,
+            'name': product.get('product_name', '') or product.get('product_name_es', ''),
+            'brands': product.get('brands', '')
+        }])
         
         return jsonify({
             'barcode': barcode,
@@ -854,6 +1102,18 @@ def get_profile():
         return jsonify({'error': f'Error interno: {str(e)}'}), 500
 
 # 3. POST /api/profile - Actualiza perfil
+def recalculate_profile_targets(user_id: str) -> dict:
+    """Recompute TMB, TDEE and target calories from the stored profile."""
+    updated = supabase.table('user_profiles').select('*').eq('user_id', user_id).execute().data[0]
+    tmb = calculate_tmb(updated['age'], updated['gender'], updated['height_cm'], updated['weight_kg'])
+    tdee = calculate_tdee(tmb, updated['activity_level'])
+    target = calculate_target_calories(tdee, updated['goal'], updated['weight_kg'], updated['target_weight_kg'])
+    return {
+        'tmb': round(tmb),
+        'tdee': round(tdee),
+        'target_calories': int(target)
+    }
+
 @app.route('/api/profile', methods=['POST'])
 @token_required
 def update_profile():
@@ -909,17 +1169,10 @@ def update_profile():
         
         # Recalcular si es necesario
         if needs_recalc:
-            updated = supabase.table('user_profiles').select('*').eq('user_id', user_id).execute().data[0]
-            tmb = calculate_tmb(updated['age'], updated['gender'], updated['height_cm'], updated['weight_kg'])
-            tdee = calculate_tdee(tmb, updated['activity_level'])
-            target = calculate_target_calories(tdee, updated['goal'], updated['weight_kg'], updated['target_weight_kg'])
-            
             return jsonify({
                 'message': 'Perfil actualizado',
                 'recalculated': True,
-                'tmb': round(tmb),
-                'tdee': round(tdee),
-                'target_calories': int(target)
+                **recalculate_profile_targets(user_id)
             }), 200
         
         return jsonify({'message': 'Perfil actualizado', 'recalculated': False}), 200
@@ -929,29 +1182,115 @@ def update_profile():
 
 # 4. GET /api/recipes - Lista recetas con filtros
 @app.route('/api/recipes', methods=['GET'])
+@http_cached(version=lambda: get_recipe_catalog(supabase).ensure_version(),
+             last_modified=lambda: get_recipe_catalog(supabase).loaded_at)
 def get_recipes():
-    """Obtiene lista de recetas con filtros opcionales."""
+    """Obtiene recetas con filtros opcionales, paginadas por cursor.
+
+    Orden estable por (meal_type, calories, id); pasar next_cursor como
+    cursor devuelve la página siguiente. limit se acota a MAX_PAGE_SIZE.
+    fields=name,calories,... limita las columnas de cada receta.
+    """
     try:
         meal_type = request.args.get('meal_type')
-        limit = request.args.get('limit', default=50, type=int)
+        limit = page_size(request.args.get('limit', type=int))
         min_calories = request.args.get('min_calories', type=float)
         max_calories = request.args.get('max_calories', type=float)
+        try:
+            after = decode_cursor(request.args.get('cursor'))
+            fields = parse_fields(request.args.get('fields'), RECIPE_FIELDS, required=('id',))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        recipes, last_key = get_recipe_catalog(supabase).page(
+            after=after, limit=limit, meal_type=meal_type,
+            min_calories=min_calories, max_calories=max_calories
+        )
+        if fields:
+            recipes = project_fields(recipes, fields)
         
-        query = supabase.table('master_recipes').select('*')
+        return jsonify({
+            'recipes': recipes,
+            'count': len(recipes),
+            'next_cursor': encode_cursor(last_key) if last_key else None
+        }), 200
         
-        if meal_type:
-            query = query.eq('meal_type', meal_type)
-        if min_calories is not None:
-            query = query.gte('calories', min_calories)
-        if max_calories is not None:
-            query = query.lte('calories', max_calories)
+    except Exception as e:
+        return jsonify({'error': f'Error interno: {str(e)}'}), 500
+
+# 4b. GET /api/recipes/facets - Filtrado por facetas con recuentos
+@app.route('/api/recipes/facets', methods=['GET'])
+@http_cached(version=lambda: get_recipe_catalog(supabase).ensure_version(),
+             last_modified=lambda: get_recipe_catalog(supabase).loaded_at)
+def get_recipe_facets():
+    """Recetas que cumplen una combinación de facetas, con los recuentos de cada faceta.
+
+    Cada faceta admite varios valores (?tag=vegano&tag=sin gluten&cost=barato):
+    se combinan con OR dentro de la faceta (AND en las etiquetas) y con AND
+    entre facetas. prep_time usa los tramos de PREP_TIME_BUCKETS.
+    """
+    try:
+        limit = page_size(request.args.get('limit', type=int))
+        offset = max(request.args.get('offset', default=0, type=int), 0)
+        filters = {facet: request.args.getlist(facet) for facet in FACETS if request.args.getlist(facet)}
+        valid_buckets = {label for label, _, _ in PREP_TIME_BUCKETS}
+        invalid = [b for b in filters.get('prep_time', []) if b not in valid_buckets]
+        if invalid:
+            return jsonify({'error': f"prep_time debe ser uno de: {', '.join(sorted(valid_buckets))}"}), 400
+        try:
+            fields = parse_fields(request.args.get('fields'), RECIPE_FIELDS, required=('id',))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        result = get_recipe_catalog(supabase).facet_index().search(filters, limit=limit, offset=offset)
+        recipes = project_fields(result['recipes'], fields) if fields else result['recipes']
         
-        query = query.limit(limit)
-        result = query.execute()
+        return jsonify({
+            'recipes': recipes,
+            'count': len(recipes),
+            'total': result['total'],
+            'facets': result['facets']
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Error interno: {str(e)}'}), 500
+
+# 4c. GET /api/recipes/high-protein - Recetas con más proteína por caloría
+@app.route('/api/recipes/high-protein', methods=['GET'])
+@http_cached(version=lambda: get_recipe_catalog(supabase).ensure_version(),
+             last_modified=lambda: get_recipe_catalog(supabase).loaded_at)
+def get_high_protein_recipes():
+    """Recetas con al menos min_protein g de proteína, ordenadas por gramos de proteína por 100 kcal.
+
+    Admite meal_type, min_calories/max_calories y max_fat/max_carbs; se
+    resuelve sobre las columnas en memoria del catálogo (NutritionStore).
+    """
+    try:
+        meal_type = request.args.get('meal_type')
+        limit = page_size(request.args.get('limit', default=20, type=int))
+        min_protein = request.args.get('min_protein', default=DEFAULT_MIN_PROTEIN, type=float)
+        try:
+            fields = parse_fields(request.args.get('fields'), RECIPE_FIELDS, required=('id',))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        store = get_recipe_catalog(supabase).nutrition()
+        positions = store.query(
+            meal_type,
+            request.args.get('min_calories', type=float),
+            request.args.get('max_calories', type=float),
+            min_protein=min_protein,
+            max_fat=request.args.get('max_fat', type=float),
+            max_carbs=request.args.get('max_carbs', type=float)
+        )
+        recipes = store.top_protein_density(positions, limit)
+        if fields:
+            recipes = project_fields(recipes, fields)
         
         return jsonify({
-            'recipes': result.data if result.data else [],
-            'count': len(result.data) if result.data else 0
+            'recipes': recipes,
+            'count': len(recipes),
+            'total': int(len(positions))
         }), 200
         
     except Exception as e:
@@ -961,12 +1300,17 @@ def get_recipes():
 @app.route('/api/plan', methods=['GET'])
 @token_required
 def get_plan():
-    """Obtiene plan semanal del usuario autenticado."""
+    """Obtiene plan semanal del usuario autenticado (fields= limita las columnas de cada entrada)."""
     try:
         user_id = request.current_user['user_id']
         week_number = request.args.get('week', default=datetime.now().isocalendar()[1], type=int)
+        try:
+            fields = parse_fields(request.args.get('fields'), PLAN_FIELDS,
+                                  required=('id', 'day_of_week', 'selected_recipe_id'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        plan_result = supabase.table('weekly_plans').select('*').eq('user_id', user_id).eq('week_number', week_number).order('day_of_week').execute()
+        plan_result = supabase.table('weekly_plans').select(select_clause(fields)).eq('user_id', user_id).eq('week_number', week_number).order('day_of_week').execute()
         
         # Agrupar por día
         days = {}
@@ -979,8 +1323,8 @@ def get_plan():
         # Obtener detalles de recetas
         recipe_ids = set(entry['selected_recipe_id'] for entry in (plan_result.data or []))
         if recipe_ids:
-            recipes_result = supabase.table('master_recipes').select('id, name, image_url').in_('id', list(recipe_ids)).execute()
-            recipes_dict = {r['id']: r for r in (recipes_result.data or [])}
+            recipes = get_recipe_catalog(supabase).get_many(recipe_ids)
+            recipes_dict = {r['id']: r for r in project_fields(recipes, ('id', 'name', 'image_url'))}
         else:
             recipes_dict = {}
         
@@ -1017,21 +1361,23 @@ def swap_plan_meal():
             return jsonify({'error': 'Plan no encontrado'}), 404
         
         # Obtener datos de la nueva receta
-        recipe_result = supabase.table('master_recipes').select('*').eq('id', swap_data.new_recipe_id).execute()
-        if not recipe_result.data:
+        recipe = get_recipe_catalog(supabase).get(swap_data.new_recipe_id)
+        if not recipe:
             return jsonify({'error': 'Receta no encontrada'}), 404
         
-        recipe = recipe_result.data[0]
-        
         # Actualizar plan
         supabase.table('weekly_plans').update({
             'selected_recipe_id': swap_data.new_recipe_id,
             'calories': recipe['calories'],
             'protein': recipe['protein'],
             'carbs': recipe['carbs'],
-            'fat': recipe['fat']
+            'fat': recipe['fat'],
+            'is_manual': True
         }).eq('id', swap_data.plan_id).execute()
         
+        # Uso en el banco de alimentos: se acumula y se escribe por lotes
+        get_usage_counters(supabase).increment(user_id, swap_data.new_recipe_id)
+        
         return jsonify({
             'message': 'Comida actualizada',
             'new_calories': recipe['calories'],
@@ -1043,6 +1389,52 @@ def swap_plan_meal():
     except Exception as e:
         return jsonify({'error': f'Error interno: {str(e)}'}), 500
 
+# 6b. GET /api/plan/<plan_id>/alternatives - Recetas parecidas para cambiar una comida
+@app.route('/api/plan/<plan_id>/alternatives', methods=['GET'])
+@token_required
+def get_plan_alternatives(plan_id):
+    """Devuelve las k recetas más cercanas en calorías y macros a la comida del plan."""
+    try:
+        user_id = request.current_user['user_id']
+        k = max(1, min(request.args.get('k', default=5, type=int), MAX_ALTERNATIVES))
+        
+        plan_result = supabase.table('weekly_plans').select('*').eq('id', plan_id).eq('user_id', user_id).execute()
+        if not plan_result.data:
+            return jsonify({'error': 'Plan no encontrado'}), 404
+        entry = plan_result.data[0]
+        
+        catalog = get_recipe_catalog(supabase)
+        current = catalog.get(entry.get('selected_recipe_id'))
+        meal_type = entry.get('meal_type') or (current or {}).get('meal_type')
+        
+        # Excluir alérgenos y alimentos no deseados del usuario, y la propia receta
+        profile_result = supabase.table('user_profiles').select('allergies, disliked_foods').eq('user_id', user_id).execute()
+        profile = profile_result.data[0] if profile_result.data else {}
+        excluded = set(excluded_recipe_ids(supabase, profile))
+        excluded.add(entry.get('selected_recipe_id'))
+        
+        nearest = catalog.neighbors().nearest(meal_type, nutrient_values(current or entry), k, excluded)
+        alternatives = [{
+            'id': recipe.get('id'),
+            'name': recipe.get('name'),
+            'calories': recipe.get('calories'),
+            'protein': recipe.get('protein'),
+            'carbs': recipe.get('carbs'),
+            'fat': recipe.get('fat'),
+            'image_url': recipe.get('image_url'),
+            'distance': round(distance, 4)
+        } for distance, recipe in nearest]
+        
+        return jsonify({
+            'plan_id': plan_id,
+            'meal_type': meal_type,
+            'current_recipe_id': entry.get('selected_recipe_id'),
+            'alternatives': alternatives
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Error interno: {str(e)}'}), 500
+
 # 7. GET /api/shopping-list - Lista de compra
 @app.route('/api/shopping-list', methods=['GET'])
 @token_required
@@ -1075,8 +1467,7 @@ def get_shopping_list():
             }), 200
         
         # Obtener recetas con ingredientes completos
-        recipes_result = supabase.table('master_recipes').select('id, name, ingredients, supermarket').in_('id', recipe_ids).execute()
-        recipes_dict = {r['id']: r for r in (recipes_result.data or [])}
+        recipes_dict = {r['id']: r for r in get_recipe_catalog(supabase).get_many(recipe_ids)}
         
         # Agrupar ingredientes por nombre y supermercado
         ingredients = {}
@@ -1310,6 +1701,90 @@ def clear_shopping_list():
 
 
 # 7.5 GET /api/shopping-list/export - Exportar lista
+def build_shopping_list_export(user_id: str, week_number: int, format_type: str = 'text') -> tuple:
+    """
+    Build the shopping list export text for a week (endpoint and background job).
+    
+    Returns:
+        (export dict, error message); error is set when the week has no plan
+    """
+    # Obtener lista completa
+    plan_result = supabase.table('weekly_plans').select('*').eq('user_id', user_id).eq('week_number', week_number).execute()
+    
+    if not plan_result.data:
+        return None, 'No hay plan para esta semana'
+    
+    recipe_ids = list(set(entry.get('selected_recipe_id') for entry in plan_result.data if entry.get('selected_recipe_id')))
+    recipes_dict = {r['id']: r for r in get_recipe_catalog(supabase).get_many(recipe_ids)}
+    
+    # Agrupar por supermercado
+    grouped = {'mercadona': [], 'lidl': [], 'carrefour': [], 'generic': [], 'manual': []}
+    
+    for entry in plan_result.data:
+        recipe_id = entry.get('selected_recipe_id')
+        if not recipe_id:
+            continue
+        
+        recipe = recipes_dict.get(recipe_id, {})
+        supermarket = recipe.get('supermarket', 'generic') or 'generic'
+        
+        if supermarket not in grouped:
+            supermarket = 'generic'
+        
+        recipe_ingredients = recipe.get('ingredients', [])
+        if isinstance(recipe_ingredients, str):
+            for ing in recipe_ingredients.split(','):
+                ing = ing.strip()
+                if ing:
+                    grouped[supermarket].append(ing)
+        elif isinstance(recipe_ingredients, list):
+            for ing in recipe_ingredients:
+                if isinstance(ing, dict):
+                    grouped[supermarket].append(f"{ing.get('amount', '')} {ing.get('unit', '')} {ing.get('name', '')}".strip())
+                elif isinstance(ing, str):
+                    grouped[supermarket].append(ing)
+    
+    # Añadir items manuales
+    manual_items = supabase.table('shopping_lists').select('*').eq('user_id', user_id).execute()
+    for item in (manual_items.data or []):
+        grouped['manual'].append(f"{item.get('quantity', '')} {item.get('unit', '')} {item.get('ingredient', '')}".strip())
+    
+    # Generar texto según formato
+    supermarket_names = {
+        'mercadona': '🛒 MERCADONA',
+        'lidl': '🛒 LIDL',
+        'carrefour': '🛒 CARREFOUR',
+        'generic': '📦 OTROS',
+        'manual': '✍️ MANUAL'
+    }
+    
+    lines = []
+    for key, items in grouped.items():
+        if items:
+            # Eliminar duplicados y ordenar
+            unique_items = sorted(set(items))
+            lines.append(f"\n{supermarket_names.get(key, key)}")
+            lines.append("=" * 30)
+            for item in unique_items:
+                if format_type == 'whatsapp':
+                    lines.append(f"☐ {item}")
+                else:
+                    lines.append(f"□ {item}")
+    
+    if format_type == 'whatsapp':
+        header = f"🛒 *LISTA DE COMPRA - Semana {week_number}*\n\n"
+        export_text = header + "\n".join(lines)
+    else:
+        header = f"LISTA DE COMPRA - Semana {week_number}\n"
+        export_text = header + "\n".join(lines)
+    
+    return {
+        'format': format_type,
+        'text': export_text,
+        'week_number': week_number,
+        'total_items': sum(len(items) for items in grouped.values())
+    }, None
+
 @app.route('/api/shopping-list/export', methods=['GET'])
 @token_required
 def export_shopping_list():
@@ -1319,83 +1794,11 @@ def export_shopping_list():
         week_number = request.args.get('week', default=datetime.now().isocalendar()[1], type=int)
         format_type = request.args.get('format', 'text')  # text, whatsapp
         
-        # Obtener lista completa
-        plan_result = supabase.table('weekly_plans').select('*').eq('user_id', user_id).eq('week_number', week_number).execute()
-        
-        if not plan_result.data:
-            return jsonify({'error': 'No hay plan para esta semana'}), 404
-        
-        recipe_ids = list(set(entry.get('selected_recipe_id') for entry in plan_result.data if entry.get('selected_recipe_id')))
-        recipes_result = supabase.table('master_recipes').select('id, name, ingredients, supermarket').in_('id', recipe_ids).execute()
-        recipes_dict = {r['id']: r for r in (recipes_result.data or [])}
-        
-        # Agrupar por supermercado
-        grouped = {'mercadona': [], 'lidl': [], 'carrefour': [], 'generic': [], 'manual': []}
-        
-        for entry in plan_result.data:
-            recipe_id = entry.get('selected_recipe_id')
-            if not recipe_id:
-                continue
-            
-            recipe = recipes_dict.get(recipe_id, {})
-            supermarket = recipe.get('supermarket', 'generic') or 'generic'
-            
-            if supermarket not in grouped:
-                supermarket = 'generic'
-            
-            recipe_ingredients = recipe.get('ingredients', [])
-            if isinstance(recipe_ingredients, str):
-                for ing in recipe_ingredients.split(','):
-                    ing = ing.strip()
-                    if ing:
-                        grouped[supermarket].append(ing)
-            elif isinstance(recipe_ingredients, list):
-                for ing in recipe_ingredients:
-                    if isinstance(ing, dict):
-                        grouped[supermarket].append(f"{ing.get('amount', '')} {ing.get('unit', '')} {ing.get('name', '')}".strip())
-                    elif isinstance(ing, str):
-                        grouped[supermarket].append(ing)
-        
-        # Añadir items manuales
-        manual_items = supabase.table('shopping_lists').select('*').eq('user_id', user_id).execute()
-        for item in (manual_items.data or []):
-            grouped['manual'].append(f"{item.get('quantity', '')} {item.get('unit', '')} {item.get('ingredient', '')}".strip())
-        
-        # Generar texto según formato
-        supermarket_names = {
-            'mercadona': '🛒 MERCADONA',
-            'lidl': '🛒 LIDL',
-            'carrefour': '🛒 CARREFOUR',
-            'generic': '📦 OTROS',
-            'manual': '✍️ MANUAL'
-        }
-        
-        lines = []
-        for key, items in grouped.items():
-            if items:
-                # Eliminar duplicados y ordenar
-                unique_items = sorted(set(items))
-                lines.append(f"\n{supermarket_names.get(key, key)}")
-                lines.append("=" * 30)
-                for item in unique_items:
-                    if format_type == 'whatsapp':
-                        lines.append(f"☐ {item}")
-                    else:
-                        lines.append(f"□ {item}")
+        result, error = build_shopping_list_export(user_id, week_number, format_type)
+        if error:
+            return jsonify({'error': error}), 404
         
-        if format_type == 'whatsapp':
-            header = f"🛒 *LISTA DE COMPRA - Semana {week_number}*\n\n"
-            export_text = header + "\n".join(lines)
-        else:
-            header = f"LISTA DE COMPRA - Semana {week_number}\n"
-            export_text = header + "\n".join(lines)
-        
-        return jsonify({
-            'format': format_type,
-            'text': export_text,
-            'week_number': week_number,
-            'total_items': sum(len(items) for items in grouped.values())
-        }), 200
+        return jsonify(result), 200
         
     except Exception as e:
         return jsonify({'error': f'Error interno: {str(e)}'}), 500
@@ -1569,14 +1972,19 @@ def log_food():
 @app.route('/api/food-log/today', methods=['GET'])
 @token_required
 def get_today_food_log():
-    """Obtiene todas las comidas registradas hoy."""
+    """Obtiene todas las comidas registradas hoy (fields= limita las columnas de cada registro)."""
     try:
         user_id = request.current_user['user_id']
         week_number = datetime.now().isocalendar()[1]
         day_of_week = datetime.now().weekday()
+        try:
+            fields = parse_fields(request.args.get('fields'), FOOD_LOG_FIELDS,
+                                  required=('id', 'meal_type', 'calories', 'protein', 'carbs', 'fat'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         # Get today's food logs
-        result = supabase.table('food_logs').select('*').eq('user_id', user_id).eq('week_number', week_number).eq('day_of_week', day_of_week).order('logged_at').execute()
+        result = supabase.table('food_logs').select(select_clause(fields)).eq('user_id', user_id).eq('week_number', week_number).eq('day_of_week', day_of_week).order('logged_at').execute()
         
         logs = result.data or []
         
@@ -1873,14 +2281,52 @@ def reset_password():
     except Exception as e:
         return jsonify({'error': f'Error al resetear contraseña: {str(e)}'}), 500
 
+def search_food_recipes(query: str, limit: int, meal_type: str = None) -> list:
+    """Recipes for search-food (ranked full-text: accents, plurals and ingredients)."""
+    matches = search_recipes(supabase, query, limit=limit, meal_type=meal_type)
+    return project_fields(
+        matches,
+        ('id', 'name', 'calories', 'protein', 'carbs', 'fat', 'meal_type', 'image_url')
+    )
+
+def search_food_products(query: str, limit: int) -> list:
+    """Open Food Facts products for search-food (through the product cache)."""
+    page_size = min(limit, 20)
+    off_products = product_cache.get_or_fetch(
+        KIND_SEARCH, search_key(query, 'food', page_size),
+        lambda: fetch_off_food_search(query, page_size), SEARCH_TTL_SECONDS
+    )
+    
+    products = []
+    for product in off_products or []:
+        nutriments = product.get('nutriments', {})
+        products.append({
+            'barcode': product.get('code'),
+            'name': product.get('product_name', 'Unknown'),
+            'brand': product.get('brands', ''),
+            'image': product.get('image_small_url'),
+            'serving_size': product.get('serving_size', '100g'),
+            'calories': nutriments.get('energy-kcal_100g', nutriments.get('energy-kcal', 0)),
+            'protein': nutriments.get('proteins_100g', nutriments.get('proteins', 0)),
+            'carbs': nutriments.get('carbohydrates_100g', nutriments.get('carbohydrates', 0)),
+            'fat': nutriments.get('fat_100g', nutriments.get('fat', 0)),
+            'source': 'openfoodfacts'
+        })
+    remember_products(products)
+    return products
+
 # 11b. GET /api/search-food - Busca alimentos (recetas y Open Food Facts)
 @app.route('/api/search-food', methods=['GET'])
 def search_food():
-    """Busca alimentos en recetas y Open Food Facts (no requiere autenticación)."""
+    """
+    Busca alimentos en recetas y Open Food Facts (no requiere autenticación).
+    
+    Recetas y Open Food Facts se consultan a la vez, cada fuente en su pool,
+    con un plazo común (SEARCH_FOOD_DEADLINE_SECONDS). La fuente que no
+    responde a tiempo o encuentra su pool lleno se omite y se devuelve
+    partial: true.
+    """
     try:
-        import urllib.request
-        import json as json_module
-        
         query = request.args.get('q', '').strip().lower()
         search_type = request.args.get('type', 'all')  # 'recipes', 'products', 'all'
         limit = request.args.get('limit', default=20, type=int)
@@ -1888,55 +2334,135 @@ def search_food():
         if not query or len(query) < 2:
             return jsonify({'error': 'Búsqueda muy corta (mínimo 2 caracteres)'}), 400
         
-        results = {
-            'recipes': [],
-            'products': [],
-            'total': 0
-        }
-        
-        # Search in master_recipes
+        tasks = {}
         if search_type in ['all', 'recipes']:
-            try:
-                recipe_result = supabase.table('master_recipes').select('id, name, calories, protein, carbs, fat, meal_type, image_url').ilike('name', f'%{query}%').limit(limit).execute()
-                results['recipes'] = recipe_result.data or []
-            except Exception as e:
-                print(f"Error searching recipes: {e}")
-        
-        # Search in Open Food Facts
+            meal_type = request.args.get('meal_type')
+            tasks['recipes'] = (recipe_search_executor, lambda: search_food_recipes(query, limit, meal_type))
         if search_type in ['all', 'products']:
-            try:
-                # Open Food Facts API
-                off_url = f"https://world.openfoodfacts.org/cgi/search.pl?search_terms={query}&json=1&page_size={min(limit, 20)}&fields=code,product_name,nutriments,image_small_url,brands,serving_size"
-                
-                req = urllib.request.Request(off_url, headers={'User-Agent': 'DietTrackerApp/1.0'})
-                response = urllib.request.urlopen(req, timeout=10)
-                off_data = json_module.loads(response.read().decode())
-                
-                if off_data.get('products'):
-                    for product in off_data['products']:
-                        nutriments = product.get('nutriments', {})
-                        results['products'].append({
-                            'barcode': product.get('code'),
-                            'name': product.get('product_name', 'Unknown'),
-                            'brand': product.get('brands', ''),
-                            'image': product.get('image_small_url'),
-                            'serving_size': product.get('serving_size', '100g'),
-                            'calories': nutriments.get('energy-kcal_100g', nutriments.get('energy-kcal', 0)),
-                            'protein': nutriments.get('proteins_100g', nutriments.get('proteins', 0)),
-                            'carbs': nutriments.get('carbohydrates_100g', nutriments.get('carbohydrates', 0)),
-                            'fat': nutriments.get('fat_100g', nutriments.get('fat', 0)),
-                            'source': 'openfoodfacts'
-                        })
-            except Exception as e:
-                print(f"Error searching Open Food Facts: {e}")
+            tasks['products'] = (off_search_executor, lambda: search_food_products(query, limit))
+        
+        # A source that misses the deadline, or finds its pool full, is left out (partial)
+        found, pending = fan_out(tasks, SEARCH_FOOD_DEADLINE_SECONDS)
+        recipes = found.get('recipes', [])
+        products = found.get('products', [])
+        
+        return jsonify({
+            'recipes': recipes,
+            'products': products,
+            'total': len(recipes) + len(products),
+            'partial': bool(pending)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Error interno: {str(e)}'}), 500
+
+# 11c. GET /api/suggest - Autocompletado (solo memoria, sin red)
+@app.route('/api/suggest', methods=['GET'])
+def suggest():
+    """
+    Sugerencias mientras se escribe: nombres de recetas, ingredientes y productos vistos recientemente.
+    
+    Parámetros:
+        - prefix: texto escrito (sin tildes ni mayúsculas no importa)
+        - k: número de sugerencias (por defecto 8)
+        - types: tipos separados por comas (recipe, ingredient, product)
+    
+    Se responde desde índices en memoria; nunca consulta Supabase ni Open Food Facts.
+    """
+    try:
+        prefix = request.args.get('prefix', '').strip()
+        k = max(1, min(request.args.get('k', default=8, type=int), MAX_SUGGESTIONS))
+        types = [t.strip() for t in request.args.get('types', '').split(',') if t.strip()] or list(SUGGESTION_TYPES)
+        
+        if not prefix:
+            return jsonify({'prefix': prefix, 'suggestions': []}), 200
+        
+        candidates = []
+        if 'recipe' in types or 'ingredient' in types:
+            catalog_types = [t for t in types if t in ('recipe', 'ingredient')]
+            candidates += get_recipe_catalog(supabase).suggest_index().suggest(prefix, k, catalog_types)
+        if 'product' in types:
+            candidates += recent_products.suggest(prefix, k)
         
-        results['total'] = len(results['recipes']) + len(results['products'])
+        candidates.sort(key=lambda e: (-e['weight'], len(e['text']), e['text']))
+        suggestions = [{key: value for key, value in entry.items() if key != 'weight'} for entry in candidates[:k]]
         
-        return jsonify(results), 200
+        return jsonify({'prefix': prefix, 'suggestions': suggestions}), 200
         
     except Exception as e:
         return jsonify({'error': f'Error interno: {str(e)}'}), 500
 
+def run_plan_generation(user_id: str, request_data: GeneratePlanRequest) -> tuple:
+    """
+    Generate and store a weekly plan for /api/generate-plan (inline or as a background job).
+    
+    Args:
+        user_id: Authenticated user id
+        request_data: Validated GeneratePlanRequest
+    
+    Returns:
+        (response dict, error message); error is set when the profile does not exist
+    """
+    # Override user_id if provided (for admin use)
+    effective_user_id = request_data.user_id or user_id
+    
+    # Get user profile
+    profile_result = supabase.table('user_profiles').select('*').eq('user_id', effective_user_id).execute()
+    if not profile_result.data:
+        return None, 'Perfil no encontrado. Completa el onboarding primero.'
+    
+    profile = profile_result.data[0]
+    
+    # Get target calories
+    target_calories = request_data.target_calories or profile.get('target_calories', 2000)
+    
+    # Override preferences if provided
+    if request_data.preferences:
+        profile['allergies'] = request_data.preferences.get('allergies', profile.get('allergies', ''))
+        profile['disliked_foods'] = request_data.preferences.get('disliked_foods', profile.get('disliked_foods', ''))
+        profile['goal'] = request_data.preferences.get('goal_type', profile.get('goal', 'maintain'))
+    
+    # Generate the weekly plan
+    plan = generate_weekly_plan(supabase, effective_user_id, profile, target_calories,
+                                mode=request_data.mode or 'random', incremental=bool(request_data.incremental),
+                                deterministic=bool(request_data.deterministic), seed=request_data.seed)
+    
+    # Calculate daily totals for verification
+    meals_per_day = profile.get('meals_per_day', 4)
+    meal_types = get_meal_types_for_count(meals_per_day)
+    
+    daily_totals = {
+        'calories': sum(m.get('calories', 0) for m in plan['days'].get('lunes', [])),
+        'protein': sum(m.get('protein', 0) for m in plan['days'].get('lunes', [])),
+        'carbs': sum(m.get('carbs', 0) for m in plan['days'].get('lunes', [])),
+        'fat': sum(m.get('fat', 0) for m in plan['days'].get('lunes', []))
+    }
+    
+    return {
+        'success': True,
+        'message': 'Plan semanal generado correctamente',
+        'user_id': effective_user_id,
+        'week_number': plan['week_number'],
+        'target_calories': target_calories,
+        'mode': plan['mode'],
+        'changes': plan['changes'],
+        'seed': plan['seed'],
+        'cached': plan['cached'],
+        'macros_target': plan['macros_target'],
+        'meal_distribution': plan['meal_calories'],
+        'days': plan['days'],
+        'summary': {
+            'total_entries': plan['total_entries'],
+            'meals_per_day': meals_per_day,
+            'estimated_daily_calories': daily_totals['calories'],
+            'estimated_daily_macros': {
+                'protein': daily_totals['protein'],
+                'carbs': daily_totals['carbs'],
+                'fat': daily_totals['fat']
+            }
+        }
+    }, None
+
 # 12. POST /api/generate-plan - Genera plan semanal automático
 @app.route('/api/generate-plan', methods=['POST'])
 @token_required
@@ -1948,6 +2474,11 @@ def generate_plan():
         - user_id: Si no se proporciona, usa el del token
         - target_calories: Si no se proporciona, usa el del perfil
         - preferences: Override de preferencias (allergies, disliked_foods)
+        - mode: 'random' (por defecto) u 'optimize' para ajustar macros diarias
+        - incremental: si es true, solo reescribe las comidas que cambian y conserva los cambios manuales
+        - deterministic / seed: plan reproducible (semilla por usuario y semana ISO, o la indicada)
+        - ?async=1: encola la generación y responde 202 con el id del trabajo
+          (sin cola configurada, JOB_QUEUE_DB, se genera de forma síncrona)
     
     Output:
         - Plan semanal completo (7 días x N comidas)
@@ -1964,62 +2495,107 @@ def generate_plan():
         except Exception as e:
             return jsonify({'error': f'Datos inválidos: {str(e)}'}), 400
         
-        # Override user_id if provided (for admin use)
-        effective_user_id = request_data.user_id or user_id
-        
-        # Get user profile
-        profile_result = supabase.table('user_profiles').select('*').eq('user_id', effective_user_id).execute()
-        if not profile_result.data:
-            return jsonify({'error': 'Perfil no encontrado. Completa el onboarding primero.'}), 404
-        
-        profile = profile_result.data[0]
-        
-        # Get target calories
-        target_calories = request_data.target_calories or profile.get('target_calories', 2000)
+        # Slow path: queue the generation and let the client poll /api/jobs/<id>.
+        # Without a persistent queue the job could be lost or polled on another
+        # instance, so the plan is generated synchronously instead
+        if job_queue.enabled and request.args.get('async', '').lower() in ('1', 'true', 'yes'):
+            job = job_queue.submit('generate_plan', request_data.dict(), user_id)
+            return jsonify(job_accepted(job)), 202
         
-        # Override preferences if provided
-        if request_data.preferences:
-            profile['allergies'] = request_data.preferences.get('allergies', profile.get('allergies', ''))
-            profile['disliked_foods'] = request_data.preferences.get('disliked_foods', profile.get('disliked_foods', ''))
-            profile['goal'] = request_data.preferences.get('goal_type', profile.get('goal', 'maintain'))
+        result, error = run_plan_generation(user_id, request_data)
+        if error:
+            return jsonify({'error': error}), 404
         
-        # Generate the weekly plan
-        plan = generate_weekly_plan(supabase, effective_user_id, profile, target_calories)
+        return jsonify(result), 201
         
-        # Calculate daily totals for verification
-        meals_per_day = profile.get('meals_per_day', 4)
-        meal_types = get_meal_types_for_count(meals_per_day)
+    except Exception as e:
+        return jsonify({'error': f'Error al generar plan: {str(e)}'}), 500
+
+# ==================== BACKGROUND JOBS ====================
+
+job_queue = JobQueue()
+
+def _job_generate_plan(payload: dict, user_id: str) -> dict:
+    result, error = run_plan_generation(user_id, GeneratePlanRequest(**payload))
+    if error:
+        raise ValueError(error)
+    return result
+
+def _job_export_shopping_list(payload: dict, user_id: str) -> dict:
+    week_number = payload.get('week') or datetime.now().isocalendar()[1]
+    result, error = build_shopping_list_export(user_id, int(week_number), payload.get('format', 'text'))
+    if error:
+        raise ValueError(error)
+    return result
+
+def _job_recalculate_profile(payload: dict, user_id: str) -> dict:
+    return recalculate_profile_targets(user_id)
+
+job_queue.register('generate_plan', _job_generate_plan)
+job_queue.register('export_shopping_list', _job_export_shopping_list)
+job_queue.register('recalculate_profile', _job_recalculate_profile)
+
+def job_accepted(job: dict) -> dict:
+    """202 response body for a queued job."""
+    return {
+        'job_id': job['id'],
+        'type': job['type'],
+        'status': job['status'],
+        'status_url': f"/api/jobs/{job['id']}"
+    }
+
+# 13. POST /api/jobs - Encola un trabajo en segundo plano
+@app.route('/api/jobs', methods=['POST'])
+@token_required
+def submit_job():
+    """
+    Encola un trabajo lento y responde 202 sin esperar a que termine.
+    
+    Input:
+        - type: generate_plan, export_shopping_list o recalculate_profile
+        - payload: parámetros del trabajo (los mismos que el endpoint síncrono)
+    """
+    try:
+        user_id = request.current_user['user_id']
+        data = request.get_json() or {}
+        job_type = data.get('type')
+        payload = data.get('payload') or {}
+        
+        if not job_queue.enabled:
+            return jsonify({'error': 'Cola de trabajos no disponible'}), 503
+        if job_type not in job_queue.job_types():
+            return jsonify({'error': f'Tipo de trabajo inválido. Usa: {", ".join(job_queue.job_types())}'}), 400
+        if not isinstance(payload, dict):
+            return jsonify({'error': 'payload debe ser un objeto'}), 400
+        
+        if job_type == 'generate_plan':
+            # Validar ahora para no encolar trabajos que fallarán seguro
+            try:
+                payload = GeneratePlanRequest(**payload).dict()
+            except Exception as e:
+                return jsonify({'error': f'Datos inválidos: {str(e)}'}), 400
         
-        daily_totals = {
-            'calories': sum(m.get('calories', 0) for m in plan['days'].get('lunes', [])),
-            'protein': sum(m.get('protein', 0) for m in plan['days'].get('lunes', [])),
-            'carbs': sum(m.get('carbs', 0) for m in plan['days'].get('lunes', [])),
-            'fat': sum(m.get('fat', 0) for m in plan['days'].get('lunes', []))
-        }
+        job = job_queue.submit(job_type, payload, user_id)
+        return jsonify(job_accepted(job)), 202
         
-        return jsonify({
-            'success': True,
-            'message': 'Plan semanal generado correctamente',
-            'user_id': effective_user_id,
-            'week_number': plan['week_number'],
-            'target_calories': target_calories,
-            'macros_target': plan['macros_target'],
-            'meal_distribution': plan['meal_calories'],
-            'days': plan['days'],
-            'summary': {
-                'total_entries': plan['total_entries'],
-                'meals_per_day': meals_per_day,
-                'estimated_daily_calories': daily_totals['calories'],
-                'estimated_daily_macros': {
-                    'protein': daily_totals['protein'],
-                    'carbs': daily_totals['carbs'],
-                    'fat': daily_totals['fat']
-                }
-            }
-        }), 201
+    except Exception as e:
+        return jsonify({'error': f'Error interno: {str(e)}'}), 500
+
+# 14. GET /api/jobs/<job_id> - Estado de un trabajo
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@token_required
+def get_job(job_id):
+    """Devuelve el estado de un trabajo del usuario y su resultado cuando termina."""
+    try:
+        if not job_queue.enabled:
+            return jsonify({'error': 'Cola de trabajos no disponible'}), 503
+        job = job_queue.get(job_id, user_id=request.current_user['user_id'])
+        if not job:
+            return jsonify({'error': 'Trabajo no encontrado'}), 404
+        return jsonify(job), 200
         
     except Exception as e:
-        return jsonify({'error': f'Error al generar plan: {str(e)}'}), 500
+        return jsonify({'error': f'Error interno: {str(e)}'}), 500
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
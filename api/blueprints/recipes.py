@@ -4,6 +4,7 @@ from supabase import create_client
 
 from config import Config
 from services.recipe_service import RecipeService
+from utils.http_cache import http_cached
 
 bp = Blueprint('recipes', __name__, url_prefix='/api')
 supabase = create_client(Config.SUPABASE_URL, Config.SUPABASE_KEY)
@@ -11,20 +12,25 @@ recipe_service = RecipeService(supabase)
 
 
 @bp.route('/recipes', methods=['GET'])
+@http_cached(version=recipe_service.catalog.ensure_version, last_modified=lambda: recipe_service.catalog.loaded_at)
 def get_all_recipes():
-    """Obtiene todas las recetas."""
+    """Obtiene recetas paginadas por cursor (limit, cursor)."""
     try:
-        recipes, error = recipe_service.get_all_recipes()
+        limit = request.args.get('limit', type=int)
+        cursor = request.args.get('cursor')
+        
+        page, error = recipe_service.get_all_recipes(limit, cursor)
         if error:
             return jsonify({'error': error}), 400
         
-        return jsonify(recipes), 200
+        return jsonify(page), 200
     
     except Exception as e:
         return jsonify({'error': 'Error interno del servidor', 'details': str(e)}), 500
 
 
 @bp.route('/recipes/meal/<meal_type>', methods=['GET'])
+@http_cached(version=recipe_service.catalog.ensure_version, last_modified=lambda: recipe_service.catalog.loaded_at)
 def get_recipes_by_meal_type(meal_type):
     """Obtiene recetas por tipo de comida."""
     try:
@@ -115,6 +121,7 @@ def get_available_recipes(user_id, meal_type):
 
 
 @bp.route('/recipes/popular', methods=['GET'])
+@http_cached()
 def get_popular_recipes():
     """Obtiene recetas más populares."""
     try:
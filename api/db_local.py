@@ -7,7 +7,9 @@ import os
 from datetime import datetime
 from contextlib import contextmanager
 
-DB_PATH = os.path.join(os.path.dirname(__file__), 'local.db')
+from utils.text_search import fts5_query, recipe_fields, tokenize
+
+DB_PATH = os.getenv('LOCAL_DB_PATH', os.path.join(os.path.dirname(__file__), 'local.db'))
 
 @contextmanager
 def get_db():
@@ -111,6 +113,22 @@ def init_db():
             )
         ''')
         
+        # Tabla de banco de alimentos
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_food_bank (
+                id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                meal_type TEXT,
+                recipe_id TEXT NOT NULL,
+                times_used INTEGER DEFAULT 0,
+                added_week INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users(id),
+                FOREIGN KEY (recipe_id) REFERENCES master_recipes(id)
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_food_bank_user_meal ON user_food_bank(user_id, meal_type)')
+        
         # Tabla de lista de compra
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS shopping_items (
@@ -126,6 +144,19 @@ def init_db():
             )
         ''')
         
+        # Índice de búsqueda de texto. FTS5 no trae stemmer en español, así que
+        # se indexan los términos ya normalizados por utils.text_search
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS master_recipes_fts USING fts5(
+                recipe_id UNINDEXED,
+                name,
+                description,
+                ingredients,
+                tags,
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+        ''')
+        
         conn.commit()
         
         # Insertar recetas si no existen
@@ -133,6 +164,11 @@ def init_db():
         if cursor.fetchone()[0] == 0:
             insert_recipes(cursor)
             conn.commit()
+        
+        cursor.execute('SELECT COUNT(*) FROM master_recipes_fts')
+        if cursor.fetchone()[0] == 0:
+            reindex_recipe_search(cursor)
+            conn.commit()
 
 def insert_recipes(cursor):
     """Inserta recetas de ejemplo"""
@@ -177,5 +213,61 @@ def insert_recipes(cursor):
             recipe['protein'], recipe['carbs'], recipe['fat'], recipe.get('tags', '')
         ))
 
+def reindex_recipe_search(cursor):
+    """Reconstruye master_recipes_fts a partir de master_recipes"""
+    cursor.execute('DELETE FROM master_recipes_fts')
+    for row in cursor.execute('SELECT * FROM master_recipes').fetchall():
+        recipe = dict(row)
+        fields = recipe_fields(recipe)
+        cursor.execute(
+            'INSERT INTO master_recipes_fts (recipe_id, name, description, ingredients, tags) VALUES (?, ?, ?, ?, ?)',
+            (recipe['id'], *(' '.join(tokenize(fields[f])) for f in ('name', 'description', 'ingredients', 'tags')))
+        )
+
+def search_recipes(query, limit=20, meal_type=None):
+    """Búsqueda de texto completo ordenada por BM25 (nombre > descripción > ingredientes = etiquetas)"""
+    match = fts5_query(query)
+    if not match:
+        return []
+    sql = '''
+        SELECT r.*, -bm25(master_recipes_fts, 0.0, 3.0, 1.5, 1.0, 1.0) AS rank
+        FROM master_recipes_fts
+        JOIN master_recipes r ON r.id = master_recipes_fts.recipe_id
+        WHERE master_recipes_fts MATCH ?
+    '''
+    params = [match]
+    if meal_type:
+        sql += ' AND r.meal_type = ?'
+        params.append(meal_type)
+    sql += ' ORDER BY rank DESC LIMIT ?'
+    params.append(limit)
+    with get_db() as conn:
+        return [dict(row) for row in conn.execute(sql, params).fetchall()]
+
+def get_food_bank(user_id, meal_type=None, with_recipes=False):
+    """Banco de alimentos; con with_recipes, cada entrada lleva su receta en 'master_recipes' (mismo formato que el embedding de PostgREST)"""
+    with get_db() as conn:
+        recipe_columns = [c[0] for c in conn.execute('SELECT * FROM master_recipes LIMIT 0').description] if with_recipes else []
+        sql = 'SELECT ' + ', '.join(['b.*'] + [
+            f'r.{c} AS "r.{c}"' for c in recipe_columns
+        ]) + '''
+            FROM user_food_bank b
+            LEFT JOIN master_recipes r ON r.id = b.recipe_id
+            WHERE b.user_id = ?
+        '''
+        params = [str(user_id)]
+        if meal_type:
+            sql += ' AND b.meal_type = ?'
+            params.append(meal_type)
+        sql += ' ORDER BY b.created_at, b.id'
+        rows = []
+        for row in conn.execute(sql, params).fetchall():
+            row = dict(row)
+            if with_recipes:
+                recipe = {c: row.pop(f'r.{c}') for c in recipe_columns}
+                row['master_recipes'] = recipe if recipe['id'] is not None else None
+            rows.append(row)
+        return rows
+
 # Inicializar DB al importar
 init_db()
\ No newline at end of file
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""Importar un volcado de Open Food Facts para consultar productos sin red.
+
+Lee el volcado JSONL o CSV (también .gz) en streaming, conserva solo los
+campos que usa la API y genera un almacén compacto con un índice ordenado de
+códigos de barras. Con OFF_DUMP_DIR apuntando a la salida, /api/products/<barcode>
+responde desde ese almacén antes de ir a Open Food Facts.
+
+Uso:
+    python import_off_dump.py openfoodfacts-products.jsonl.gz --out data/off --spain --supermarkets
+"""
+
+import argparse
+import json
+
+from services.off_dump import import_dump, SPAIN_TAG, SUPERMARKETS
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Importar volcado de Open Food Facts')
+    parser.add_argument('source', help='Volcado JSONL o CSV de Open Food Facts (admite .gz)')
+    parser.add_argument('--out', default='off_dump', help='Directorio de salida')
+    parser.add_argument('--spain', action='store_true', help='Solo productos vendidos en España')
+    parser.add_argument('--supermarkets', action='store_true',
+                        help=f"Solo productos de {', '.join(SUPERMARKETS)}")
+    parser.add_argument('--country', action='append', default=[], help='Etiqueta de país adicional (p. ej. en:portugal)')
+    args = parser.parse_args()
+
+    countries = args.country + ([SPAIN_TAG] if args.spain else [])
+    stores = list(SUPERMARKETS) if args.supermarkets else []
+
+    print(f"📦 Importando {args.source}...")
+    stats = import_dump(args.source, args.out, countries=countries, stores=stores)
+    print(f"✅ {stats['indexed']} productos indexados de {stats['read']} leídos "
+          f"en {stats['elapsed_seconds']}s")
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,8 @@ import os
 from supabase import create_client
 from dotenv import load_dotenv
 
+from services.recipe_catalog import bump_catalog_version
+
 load_dotenv()
 
 SUPABASE_URL = os.getenv('SUPABASE_URL')
@@ -55,6 +57,8 @@ try:
         for recipe in recipes:
             supabase.table('master_recipes').insert(recipe).execute()
         print(f"✅ {len(recipes)} recetas insertadas")
+        # Invalidar la caché del catálogo en la API
+        bump_catalog_version(supabase)
     else:
         print(f"✅ Ya existen {len(existing.data)} recetas (no se insertan nuevas)")
 except Exception as e:
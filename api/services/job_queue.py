@@ -0,0 +1,260 @@
+"""Cola de trabajos en segundo plano persistida en SQLite."""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Debe apuntar a almacenamiento persistente y compartido por todas las instancias:
+# con un fichero local cada instancia tendría su propia cola. Sin él la cola queda desactivada
+JOB_DB_PATH = os.getenv('JOB_QUEUE_DB')
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+JOB_POLL_SECONDS = 2.0
+JOB_MAX_ATTEMPTS = 3
+# Un trabajo 'running' más antiguo que esto se considera huérfano (proceso caído)
+JOB_STALE_SECONDS = 15 * 60
+# Cada cuánto revisan los trabajadores si hay huérfanos (no solo al arrancar)
+JOB_RECOVER_SECONDS = 60
+JOB_RETENTION_SECONDS = 24 * 3600
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_SUCCEEDED = 'succeeded'
+STATUS_FAILED = 'failed'
+
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+
+
+class JobQueue:
+    """Cola duradera con un pool de hilos trabajadores.
+
+    Los trabajos se guardan en SQLite antes de responder, así que sobreviven
+    a un reinicio: al arrancar, los que quedaron a medias vuelven a la cola
+    (hasta JOB_MAX_ATTEMPTS intentos). Varios procesos pueden compartir el
+    mismo fichero; cada trabajo se reclama dentro de una transacción
+    BEGIN IMMEDIATE, de modo que solo un trabajador lo ejecuta.
+
+    Los handlers reciben (payload, user_id) y devuelven un dict
+    serializable a JSON; cualquier excepción marca el trabajo como fallido.
+
+    Sin db_path (JOB_QUEUE_DB sin definir) la cola queda desactivada
+    (enabled es False): submit() lanza RuntimeError y get() devuelve None.
+    """
+
+    def __init__(self, db_path: Optional[str] = JOB_DB_PATH, workers: int = JOB_WORKERS,
+                 poll_seconds: float = JOB_POLL_SECONDS):
+        self.db_path = db_path
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self._handlers = {}
+        self._threads = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        self._recover_lock = threading.Lock()
+        self._last_recover = 0.0
+        self.enabled = bool(db_path)
+        if self.enabled:
+            self._init_db()
+        else:
+            logger.warning("JOB_QUEUE_DB is not set: background jobs are disabled")
+
+    # ---------- almacenamiento ----------
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    type TEXT NOT NULL,
+                    user_id TEXT,
+                    payload TEXT,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)')
+
+    @staticmethod
+    def _to_dict(row) -> Dict:
+        return {
+            'id': row['id'],
+            'type': row['type'],
+            'status': row['status'],
+            'result': json.loads(row['result']) if row['result'] else None,
+            'error': row['error'],
+            'attempts': row['attempts'],
+            'created_at': _isoformat(row['created_at']),
+            'started_at': _isoformat(row['started_at']),
+            'finished_at': _isoformat(row['finished_at'])
+        }
+
+    # ---------- API ----------
+
+    def register(self, job_type: str, handler: Callable[[Dict, Optional[str]], Dict]):
+        """Asocia un tipo de trabajo con su función."""
+        self._handlers[job_type] = handler
+
+    def job_types(self):
+        """Tipos de trabajo registrados."""
+        return sorted(self._handlers)
+
+    def submit(self, job_type: str, payload: Optional[Dict] = None, user_id: Optional[str] = None) -> Dict:
+        """Encola un trabajo y despierta a los trabajadores. Devuelve su estado inicial."""
+        if not self.enabled:
+            raise RuntimeError('Cola de trabajos no configurada (JOB_QUEUE_DB)')
+        if job_type not in self._handlers:
+            raise ValueError(f"Tipo de trabajo desconocido: {job_type}")
+        job_id = str(uuid.uuid4())
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO jobs (id, type, user_id, payload, status, created_at) VALUES (?, ?, ?, ?, ?, ?)',
+                (job_id, job_type, user_id, json.dumps(payload or {}, default=str), STATUS_QUEUED, time.time())
+            )
+        self.start()
+        self._wake.set()
+        return self.get(job_id)
+
+    def get(self, job_id: str, user_id: Optional[str] = None) -> Optional[Dict]:
+        """Estado de un trabajo (None si no existe o pertenece a otro usuario)."""
+        if not self.enabled:
+            return None
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None or (user_id is not None and row['user_id'] != str(user_id)):
+            return None
+        return self._to_dict(row)
+
+    # ---------- ejecución ----------
+
+    def recover(self) -> int:
+        """Reencola los trabajos huérfanos y purga los terminados antiguos. Devuelve cuántos se reencolaron."""
+        now = time.time()
+        self._last_recover = time.monotonic()
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = 'Demasiados intentos', finished_at = ? "
+                "WHERE status = ? AND started_at < ? AND attempts >= ?",
+                (STATUS_FAILED, now, STATUS_RUNNING, now - JOB_STALE_SECONDS, JOB_MAX_ATTEMPTS)
+            )
+            requeued = conn.execute(
+                'UPDATE jobs SET status = ?, started_at = NULL WHERE status = ? AND started_at < ?',
+                (STATUS_QUEUED, STATUS_RUNNING, now - JOB_STALE_SECONDS)
+            ).rowcount
+            conn.execute(
+                'DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?',
+                (STATUS_SUCCEEDED, STATUS_FAILED, now - JOB_RETENTION_SECONDS)
+            )
+            conn.execute('COMMIT')
+        if requeued:
+            logger.warning(f"Requeued {requeued} stale jobs")
+        return requeued
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                'SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1', (STATUS_QUEUED,)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    'UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1 WHERE id = ?',
+                    (STATUS_RUNNING, time.time(), row['id'])
+                )
+            conn.execute('COMMIT')
+        return row
+
+    def _finish(self, job_id: str, status: str, result: Optional[Dict] = None, error: Optional[str] = None):
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?',
+                (status, json.dumps(result, default=str) if result is not None else None, error, time.time(), job_id)
+            )
+
+    def run_next(self) -> bool:
+        """Ejecuta el siguiente trabajo pendiente en este hilo. Devuelve False si no había ninguno."""
+        row = self._claim()
+        if row is None:
+            return False
+        handler = self._handlers.get(row['type'])
+        started = time.monotonic()
+        try:
+            if handler is None:
+                raise ValueError(f"Tipo de trabajo desconocido: {row['type']}")
+            result = handler(json.loads(row['payload'] or '{}'), row['user_id'])
+            self._finish(row['id'], STATUS_SUCCEEDED, result=result)
+            logger.info(f"Job {row['id']} ({row['type']}) done in {time.monotonic() - started:.2f}s")
+        except Exception as e:
+            logger.exception(f"Job {row['id']} ({row['type']}) failed")
+            self._finish(row['id'], STATUS_FAILED, error=str(e))
+        return True
+
+    def _maybe_recover(self):
+        # Un solo trabajador del proceso revisa los huérfanos cada JOB_RECOVER_SECONDS
+        if time.monotonic() - self._last_recover < JOB_RECOVER_SECONDS:
+            return
+        if not self._recover_lock.acquire(blocking=False):
+            return
+        try:
+            if time.monotonic() - self._last_recover >= JOB_RECOVER_SECONDS:
+                self.recover()
+        finally:
+            self._recover_lock.release()
+
+    def _worker(self):
+        while not self._stop.is_set():
+            try:
+                self._maybe_recover()
+                if self.run_next():
+                    continue
+            except Exception as e:
+                logger.error(f"Job worker error: {e}")
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+    def start(self):
+        """Arranca los hilos trabajadores (una sola vez por proceso)."""
+        if self._threads or self.workers <= 0 or not self.enabled:
+            return
+        with self._start_lock:
+            if self._threads:
+                return
+            self.recover()
+            self._stop.clear()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f'job-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        """Detiene los trabajadores; los trabajos en curso terminan antes."""
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
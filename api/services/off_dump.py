@@ -0,0 +1,271 @@
+"""Importación offline de volcados de Open Food Facts e índice de códigos de barras."""
+import csv
+import gzip
+import io
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+from typing import Dict, Iterable, Iterator, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Los mismos campos que pide search_by_name a la API de Open Food Facts
+SEARCH_FIELDS = (
+    'code', 'product_name', 'brands', 'categories', 'nutriments', 'image_url', 'image_small_url',
+    'quantity', 'serving_size', 'ingredients_text', 'stores', 'countries', 'nutriscore_grade', 'nova_group'
+)
+# Nutrientes que lee la API (se guardan por 100 g, por ración y sin sufijo)
+NUTRIMENTS = (
+    'energy-kcal', 'energy-kj', 'proteins', 'carbohydrates', 'sugars', 'fat', 'saturated-fat',
+    'trans-fat', 'cholesterol', 'fiber', 'salt', 'sodium'
+)
+NUTRIMENT_KEYS = frozenset(
+    f"{name}{suffix}" for name in NUTRIMENTS for suffix in ('', '_100g', '_serving')
+)
+SPAIN_TAG = 'en:spain'
+SUPERMARKETS = ('mercadona', 'lidl', 'carrefour')
+
+DATA_FILE = 'products.jsonl'
+INDEX_FILE = 'barcodes.idx'
+INDEX_MAGIC = b'OFFIDX01'
+_HEADER = struct.Struct('<8sQ')
+BARCODE_BYTES = 24
+_INDEX_DTYPE = np.dtype([('code', f'S{BARCODE_BYTES}'), ('offset', '<u8'), ('length', '<u4')])
+_CHUNK = 65536
+
+
+# ---------- lectura del volcado ----------
+
+def _open_text(path: str):
+    if path.endswith('.gz'):
+        return io.TextIOWrapper(gzip.open(path, 'rb'), encoding='utf-8', errors='replace')
+    return open(path, 'r', encoding='utf-8', errors='replace')
+
+
+def _tags(value) -> list:
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [t.strip().lower() for t in value.split(',') if t.strip()]
+    return [str(t).lower() for t in value]
+
+
+def iter_jsonl(path: str) -> Iterator[Dict]:
+    """Productos de un volcado JSONL (uno por línea), sin cargar el fichero en memoria."""
+    with _open_text(path) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                logger.warning(f"Skipping malformed JSON at line {line_number} of {path}")
+
+
+def iter_csv(path: str) -> Iterator[Dict]:
+    """Productos de un volcado CSV/TSV de OFF; las columnas *_100g pasan a nutriments."""
+    csv.field_size_limit(sys.maxsize)
+    with _open_text(path) as f:
+        header = f.readline()
+        delimiter = '\t' if '\t' in header else ','
+        columns = next(csv.reader([header], delimiter=delimiter))
+        # El volcado oficial es TSV sin comillas; un CSV normal sí las usa
+        quoting = csv.QUOTE_NONE if delimiter == '\t' else csv.QUOTE_MINIMAL
+        for row in csv.DictReader(f, fieldnames=columns, delimiter=delimiter, quoting=quoting):
+            nutriments = {}
+            for key in NUTRIMENT_KEYS:
+                value = row.get(key)
+                if value:
+                    try:
+                        nutriments[key] = float(value)
+                    except ValueError:
+                        pass
+            row['nutriments'] = nutriments
+            yield row
+
+
+def iter_dump(path: str) -> Iterator[Dict]:
+    """Productos de un volcado JSONL o CSV (también comprimidos con gzip)."""
+    name = path[:-3] if path.endswith('.gz') else path
+    if name.endswith(('.csv', '.tsv')):
+        return iter_csv(path)
+    return iter_jsonl(path)
+
+
+def matches(product: Dict, countries: Optional[Iterable[str]] = None,
+            stores: Optional[Iterable[str]] = None) -> bool:
+    """True si el producto se vende en alguno de los países o supermercados indicados.
+
+    Sin filtros se aceptan todos los productos.
+    """
+    countries = [c.lower() for c in countries or ()]
+    stores = [s.lower() for s in stores or ()]
+    if not countries and not stores:
+        return True
+    if countries:
+        tags = _tags(product.get('countries_tags'))
+        text = str(product.get('countries') or '').lower()
+        if any(c in tags or c.split(':')[-1] in text for c in countries):
+            return True
+    if stores:
+        tags = _tags(product.get('stores_tags'))
+        text = str(product.get('stores') or '').lower()
+        if any(s in tags or s in text for s in stores):
+            return True
+    return False
+
+
+def compact_product(product: Dict) -> Dict:
+    """Solo los campos de SEARCH_FIELDS, con los nutrientes que usa la API y sin vacíos."""
+    compact = {}
+    for field in SEARCH_FIELDS:
+        value = product.get(field)
+        if field == 'nutriments':
+            value = {k: v for k, v in (value or {}).items() if k in NUTRIMENT_KEYS and v not in (None, '')}
+        if value not in (None, '', [], {}):
+            compact[field] = value
+    return compact
+
+
+def normalize_code(code) -> str:
+    return ''.join(str(code or '').split())
+
+
+# ---------- importación ----------
+
+def import_dump(source: str, out_dir: str, countries: Optional[Iterable[str]] = None,
+                stores: Optional[Iterable[str]] = None) -> Dict:
+    """Convierte un volcado de OFF en un almacén compacto con índice de códigos de barras.
+
+    Escribe en out_dir products.jsonl (un producto compacto por línea) y
+    barcodes.idx: cabecera + códigos ordenados (S24) + desplazamientos +
+    longitudes, en columnas contiguas para poder buscarlos con mmap.
+    Si un código se repite se queda la última aparición del volcado.
+    """
+    started = time.monotonic()
+    os.makedirs(out_dir, exist_ok=True)
+    data_path = os.path.join(out_dir, DATA_FILE)
+    index_path = os.path.join(out_dir, INDEX_FILE)
+    stats = {'read': 0, 'kept': 0, 'filtered': 0, 'invalid': 0}
+
+    chunks, codes, offsets, lengths = [], [], [], []
+    offset = 0
+    with open(data_path + '.tmp', 'wb') as out:
+        for product in iter_dump(source):
+            stats['read'] += 1
+            code = normalize_code(product.get('code'))
+            if not code or len(code.encode()) > BARCODE_BYTES:
+                stats['invalid'] += 1
+                continue
+            if not matches(product, countries, stores):
+                stats['filtered'] += 1
+                continue
+            compact = compact_product(product)
+            compact['code'] = code
+            line = json.dumps(compact, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+            out.write(line)
+            codes.append(code.encode())
+            offsets.append(offset)
+            lengths.append(len(line) - 1)
+            offset += len(line)
+            stats['kept'] += 1
+            if len(codes) >= _CHUNK:
+                chunks.append(_index_chunk(codes, offsets, lengths))
+                codes, offsets, lengths = [], [], []
+    chunks.append(_index_chunk(codes, offsets, lengths))
+
+    index = np.concatenate(chunks)
+    index = index[np.argsort(index['code'], kind='stable')]
+    if len(index):
+        # Repetidos: el orden estable deja la última aparición al final de cada grupo
+        last = np.append(index['code'][1:] != index['code'][:-1], True)
+        index = index[last]
+    with open(index_path + '.tmp', 'wb') as out:
+        out.write(_HEADER.pack(INDEX_MAGIC, len(index)))
+        for column in ('code', 'offset', 'length'):
+            out.write(np.ascontiguousarray(index[column]).tobytes())
+
+    os.replace(data_path + '.tmp', data_path)
+    os.replace(index_path + '.tmp', index_path)
+    stats['indexed'] = int(len(index))
+    stats['elapsed_seconds'] = round(time.monotonic() - started, 2)
+    return stats
+
+
+def _index_chunk(codes, offsets, lengths) -> np.ndarray:
+    chunk = np.empty(len(codes), dtype=_INDEX_DTYPE)
+    chunk['code'] = codes
+    chunk['offset'] = offsets
+    chunk['length'] = lengths
+    return chunk
+
+
+# ---------- consulta ----------
+
+class OfflineProductStore:
+    """Productos de un volcado importado, consultados por código de barras.
+
+    Índice y datos se abren con mmap: la búsqueda es un searchsorted sobre
+    la columna de códigos (O(log n) páginas leídas) y solo se decodifica la
+    línea del producto encontrado.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._files = []
+        self._data = None
+        self._codes = np.empty(0, dtype=f'S{BARCODE_BYTES}')
+        index = self._map(os.path.join(directory, INDEX_FILE))
+        magic, count = _HEADER.unpack_from(index, 0)
+        if magic != INDEX_MAGIC:
+            raise ValueError(f"Índice de productos no válido: {directory}")
+        if count:
+            position = _HEADER.size
+            self._codes = np.frombuffer(index, dtype=f'S{BARCODE_BYTES}', count=count, offset=position)
+            position += count * BARCODE_BYTES
+            self._offsets = np.frombuffer(index, dtype='<u8', count=count, offset=position)
+            position += count * 8
+            self._lengths = np.frombuffer(index, dtype='<u4', count=count, offset=position)
+            self._data = self._map(os.path.join(directory, DATA_FILE))
+
+    def _map(self, path: str):
+        f = open(path, 'rb')
+        self._files.append(f)
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def get(self, barcode: str) -> Optional[Dict]:
+        """Producto con ese código de barras, o None si no está en el volcado."""
+        key = normalize_code(barcode).encode()
+        if not key or len(key) > BARCODE_BYTES or not len(self._codes):
+            return None
+        i = int(np.searchsorted(self._codes, key))
+        if i >= len(self._codes) or self._codes[i] != key:
+            return None
+        start = int(self._offsets[i])
+        return json.loads(self._data[start:start + int(self._lengths[i])])
+
+    def __contains__(self, barcode: str) -> bool:
+        return self.get(barcode) is not None
+
+
+def open_offline_store(directory: Optional[str]) -> Optional[OfflineProductStore]:
+    """Almacén offline de directory, o None si no está configurado o no se puede abrir."""
+    if not directory:
+        return None
+    try:
+        store = OfflineProductStore(directory)
+    except (OSError, ValueError, struct.error) as e:
+        logger.warning(f"Offline Open Food Facts store unavailable at {directory}: {e}")
+        return None
+    logger.info(f"Offline Open Food Facts store loaded: {len(store)} products")
+    return store
@@ -1,34 +1,89 @@
 """Servicio para planes semanales."""
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 import random
-from datetime import datetime
+from datetime import date, datetime, timedelta
 
 from supabase import Client
 
+from services.recipe_catalog import get_recipe_catalog
+from services.usage_counters import get_usage_counters
 from utils.calculations import get_meal_types_for_count
 
 
+def next_iso_week(today: Optional[date] = None) -> Tuple[int, int]:
+    """(año ISO, semana ISO) de dentro de siete días; cruza correctamente el cambio de año."""
+    year, week, _ = ((today or date.today()) + timedelta(days=7)).isocalendar()
+    return year, week
+
+
+def build_next_week_entries(user_id, meals_per_day: int, food_bank: List[Dict], week_number: int,
+                            get_recipe: Callable, recipes_for_meal: Callable) -> List[Dict]:
+    """
+    Calcula las entradas del plan de la próxima semana sin tocar la base de datos.
+    
+    Para cada comida elige la receta del banco menos usada (contando también
+    las veces que ya se ha elegido en esta semana); si el banco no tiene
+    recetas de ese tipo, usa una receta maestra al azar.
+    """
+    meal_types = get_meal_types_for_count(meals_per_day)
+    
+    # Agrupar recetas del banco por tipo de comida con su contador de uso
+    usage_by_meal = {}
+    for item in food_bank:
+        usage = usage_by_meal.setdefault(item['meal_type'], {})
+        usage[item['recipe_id']] = item.get('times_used') or 0
+    
+    plan_entries = []
+    for day in range(7):
+        for meal_type in meal_types:
+            usage = usage_by_meal.get(meal_type)
+            recipe = None
+            if usage:
+                # Seleccionar receta menos usada que exista en el catálogo
+                for recipe_id in sorted(usage, key=usage.get):
+                    recipe = get_recipe(recipe_id)
+                    if recipe:
+                        usage[recipe_id] += 1
+                        break
+            else:
+                # Si no hay, usar recetas maestras del mismo tipo
+                fallback = recipes_for_meal(meal_type)[:5]
+                if fallback:
+                    recipe = random.choice(fallback)
+            
+            if not recipe:
+                continue
+            
+            plan_entries.append({
+                'user_id': user_id,
+                'week_number': week_number,
+                'day_of_week': day,
+                'meal_type': meal_type,
+                'selected_recipe_id': recipe['id'],
+                'calories': recipe['calories'],
+                'protein': recipe['protein'],
+                'carbs': recipe['carbs'],
+                'fat': recipe['fat']
+            })
+    
+    return plan_entries
+
+
 class PlanService:
     """Servicio para generar y gestionar planes semanales."""
     
     def __init__(self, supabase: Client):
         self.supabase = supabase
+        self.catalog = get_recipe_catalog(supabase)
+        self.usage = get_usage_counters(supabase)
     
     def generate_first_week_varied(self, user_id: int, meals_per_day: int, target_calories: int) -> Tuple[Optional[List], Optional[str]]:
         """Genera la primera semana con recetas variadas."""
         try:
-            # Obtener todas las recetas agrupadas por tipo de comida
-            all_recipes = self.supabase.table('master_recipes').select('*').execute()
-            if not all_recipes.data:
+            # Recetas agrupadas por tipo de comida (catálogo en caché)
+            if not self.catalog.all():
                 return None, 'No hay recetas disponibles'
             
-            recipes_by_meal = {}
-            for recipe in all_recipes.data:
-                meal_type = recipe['meal_type']
-                if meal_type not in recipes_by_meal:
-                    recipes_by_meal[meal_type] = []
-                recipes_by_meal[meal_type].append(recipe)
-            
             # Determinar tipos de comida según meals_per_day
             meal_types = get_meal_types_for_count(meals_per_day)
             
@@ -39,7 +94,7 @@ class PlanService:
             for day in range(7):
                 for meal_type in meal_types:
                     # Filtrar recetas del tipo correspondiente
-                    available = recipes_by_meal.get(meal_type, [])
+                    available = self.catalog.by_meal_type(meal_type)
                     if not available:
                         continue
                     
@@ -80,23 +135,22 @@ class PlanService:
         """Actualiza una entrada del plan con nueva receta."""
         try:
             # Obtener datos de la nueva receta
-            recipe_result = self.supabase.table('master_recipes').select('*').eq('id', new_recipe_id).execute()
-            if not recipe_result.data:
+            recipe = self.catalog.get(new_recipe_id)
+            if not recipe:
                 return None, 'Receta no encontrada'
             
-            recipe = recipe_result.data[0]
-            
             # Actualizar entrada
             self.supabase.table('weekly_plans').update({
                 'selected_recipe_id': new_recipe_id,
                 'calories': recipe['calories'],
                 'protein': recipe['protein'],
                 'carbs': recipe['carbs'],
-                'fat': recipe['fat']
+                'fat': recipe['fat'],
+                'is_manual': True
             }).eq('id', plan_id).execute()
             
-            # Incrementar uso en food bank
-            self.supabase.table('user_food_bank').update({'times_used': 1}).eq('user_id', user_id).eq('recipe_id', new_recipe_id).execute()
+            # Incrementar uso en food bank (acumulado en memoria, volcado por lotes)
+            self.usage.increment(user_id, new_recipe_id)
             
             return {'updated': True}, None
         
@@ -112,72 +166,17 @@ class PlanService:
                 return None, 'Perfil no encontrado'
             
             meals_per_day = profile_result.data[0]['meals_per_day']
-            meal_types = get_meal_types_for_count(meals_per_day)
             
-            # Obtener banco de alimentos del usuario
-            food_bank_result = self.supabase.table('user_food_bank').select('recipe_id, meal_type').eq('user_id', user_id).execute()
+            # Obtener banco de alimentos del usuario (con su uso, en una sola consulta)
+            food_bank_result = self.supabase.table('user_food_bank').select('recipe_id, meal_type, times_used').eq('user_id', user_id).execute()
             if not food_bank_result.data:
                 return None, 'Banco de alimentos vacío'
             
-            # Agrupar recetas por tipo de comida
-            recipes_by_meal = {}
-            for item in food_bank_result.data:
-                meal_type = item['meal_type']
-                if meal_type not in recipes_by_meal:
-                    recipes_by_meal[meal_type] = []
-                recipes_by_meal[meal_type].append(item['recipe_id'])
-            
-            # Obtener detalles de todas las recetas del banco
-            all_recipe_ids = set()
-            for ids in recipes_by_meal.values():
-                all_recipe_ids.update(ids)
-            
-            if not all_recipe_ids:
-                return None, 'Banco de alimentos vacío'
-            
-            recipes_result = self.supabase.table('master_recipes').select('*').in_('id', list(all_recipe_ids)).execute()
-            recipes_dict = {r['id']: r for r in recipes_result.data}
-            
-            # Generar plan
-            week_number = datetime.now().isocalendar()[1] + 1
-            plan_entries = []
-            
-            for day in range(7):
-                for meal_type in meal_types:
-                    # Obtener recetas disponibles para este tipo
-                    available_ids = recipes_by_meal.get(meal_type, [])
-                    if not available_ids:
-                        # Si no hay, buscar recetas maestras del mismo tipo
-                        fallback = self.supabase.table('master_recipes').select('*').eq('meal_type', meal_type).limit(5).execute()
-                        if not fallback.data:
-                            continue
-                        recipe = random.choice(fallback.data)
-                    else:
-                        # Seleccionar receta menos usada
-                        usage_counts = []
-                        for recipe_id in available_ids:
-                            usage = self.supabase.table('user_food_bank').select('times_used').eq('user_id', user_id).eq('recipe_id', recipe_id).execute()
-                            times_used = usage.data[0]['times_used'] if usage.data else 0
-                            usage_counts.append((recipe_id, times_used))
-                        
-                        # Ordenar por menor uso
-                        usage_counts.sort(key=lambda x: x[1])
-                        selected_id = usage_counts[0][0]
-                        recipe = recipes_dict.get(selected_id)
-                        if not recipe:
-                            continue
-                    
-                    plan_entries.append({
-                        'user_id': user_id,
-                        'week_number': week_number,
-                        'day_of_week': day,
-                        'meal_type': meal_type,
-                        'selected_recipe_id': recipe['id'],
-                        'calories': recipe['calories'],
-                        'protein': recipe['protein'],
-                        'carbs': recipe['carbs'],
-                        'fat': recipe['fat']
-                    })
+            _, week_number = next_iso_week()
+            plan_entries = build_next_week_entries(
+                user_id, meals_per_day, food_bank_result.data, week_number,
+                self.catalog.get, self.catalog.by_meal_type
+            )
             
             # Insertar plan
             if plan_entries:
@@ -0,0 +1,174 @@
+"""Caché persistente (SQLite + LRU en memoria) de respuestas de Open Food Facts."""
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable
+
+from utils.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_CACHE_DB = os.getenv('PRODUCT_CACHE_DB', os.path.join(tempfile.gettempdir(), 'diet_tracker_products.db'))
+# Los productos cambian poco; las búsquedas por texto, algo más
+PRODUCT_TTL_SECONDS = float(os.getenv('PRODUCT_CACHE_TTL', str(7 * 24 * 3600)))
+SEARCH_TTL_SECONDS = float(os.getenv('PRODUCT_SEARCH_CACHE_TTL', str(24 * 3600)))
+# Un código no encontrado se recuerda menos tiempo: puede darse de alta en OFF
+NEGATIVE_TTL_SECONDS = float(os.getenv('PRODUCT_NEGATIVE_TTL', str(6 * 3600)))
+MEMORY_ENTRIES = 1024
+
+KIND_PRODUCT = 'product'
+KIND_SEARCH = 'search'
+
+_MISSING = object()
+
+
+class ProductCache:
+    """Caché read-through de Open Food Facts con TTL por entrada.
+
+    Dos espacios: 'product' (código de barras -> producto) y 'search'
+    (consulta normalizada -> lista de productos). Un producto inexistente
+    se guarda como None (caché negativa) con NEGATIVE_TTL_SECONDS.
+
+    Delante del fichero SQLite hay una LRU en memoria con las entradas más
+    recientes; el fichero se comparte entre procesos y sobrevive a reinicios.
+    Los fallos simultáneos de una misma clave comparten una sola descarga
+    (single-flight), así un pico de escaneos del mismo producto hace una
+    única llamada a Open Food Facts por proceso.
+    """
+
+    def __init__(self, db_path: str = PRODUCT_CACHE_DB, memory_entries: int = MEMORY_ENTRIES):
+        self.db_path = db_path
+        self.memory_entries = memory_entries
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()   # (tipo, clave) -> (caduca, valor)
+        self._flights = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self._init_db()
+
+    # ---------- almacenamiento ----------
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS off_cache (
+                    kind TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    payload TEXT,
+                    fetched_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (kind, key)
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_off_cache_expires ON off_cache(expires_at)')
+
+    def _remember(self, entry_key, expires_at: float, value):
+        with self._lock:
+            self._memory[entry_key] = (expires_at, value)
+            self._memory.move_to_end(entry_key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    # ---------- API ----------
+
+    def get(self, kind: str, key: str, default=None):
+        """Valor vigente (puede ser None si se cacheó un 404) o default si no hay entrada válida."""
+        entry_key = (kind, key)
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(entry_key)
+            if cached is not None:
+                if cached[0] > now:
+                    self._memory.move_to_end(entry_key)
+                    return cached[1]
+                del self._memory[entry_key]
+
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    'SELECT payload, expires_at FROM off_cache WHERE kind = ? AND key = ? AND expires_at > ?',
+                    (kind, key, now)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Product cache read failed: {e}")
+            return default
+        if row is None:
+            return default
+        value = json.loads(row[0]) if row[0] is not None else None
+        self._remember(entry_key, row[1], value)
+        return value
+
+    def put(self, kind: str, key: str, value, ttl: float):
+        """Guarda un valor (None = no encontrado) durante ttl segundos."""
+        now = time.time()
+        expires_at = now + ttl
+        self._remember((kind, key), expires_at, value)
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO off_cache (kind, key, payload, fetched_at, expires_at) VALUES (?, ?, ?, ?, ?)',
+                    (kind, key, json.dumps(value) if value is not None else None, now, expires_at)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Product cache write failed: {e}")
+
+    def get_or_fetch(self, kind: str, key: str, fetch: Callable[[], Any], ttl: float,
+                     negative_ttl: float = NEGATIVE_TTL_SECONDS):
+        """Valor cacheado o, si no lo hay, el resultado de fetch() (que se guarda).
+
+        Si fetch() devuelve None se guarda como no encontrado con negative_ttl.
+        Las excepciones de fetch() (timeouts, errores de red) no se cachean,
+        pero sí se propagan a las llamadas que esperaban la misma descarga.
+        """
+        value = self.get(kind, key, _MISSING)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+        return self._flights.do((kind, key), lambda: self._fetch(kind, key, fetch, ttl, negative_ttl))
+
+    def _fetch(self, kind: str, key: str, fetch: Callable[[], Any], ttl: float, negative_ttl: float):
+        # Otra descarga de la misma clave pudo terminar entre get() y do()
+        value = self.get(kind, key, _MISSING)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = fetch()
+        self.put(kind, key, value, ttl if value is not None else negative_ttl)
+        return value
+
+    @property
+    def coalesced(self) -> int:
+        """Consultas que esperaron una descarga en curso en lugar de lanzar otra."""
+        return self._flights.shared
+
+    def purge(self) -> int:
+        """Borra del fichero las entradas caducadas. Devuelve cuántas."""
+        with self._connect() as conn:
+            return conn.execute('DELETE FROM off_cache WHERE expires_at <= ?', (time.time(),)).rowcount
+
+
+def normalize_barcode(barcode: str) -> str:
+    """Código de barras sin espacios (clave de la caché)."""
+    return ''.join((barcode or '').split())
+
+
+def search_key(query: str, *parts) -> str:
+    """Clave de una búsqueda: consulta normalizada más los parámetros que cambian el resultado."""
+    normalized = ' '.join((query or '').lower().split())
+    return '|'.join([normalized] + [str(p or '') for p in parts])
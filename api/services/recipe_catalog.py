@@ -0,0 +1,300 @@
+"""Caché compartida en proceso del catálogo master_recipes."""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from utils.facets import FacetIndex
+from utils.ingredient_index import IngredientIndex
+from utils.nutrient_tree import NutrientNeighbors
+from utils.nutrition_store import NutritionStore
+from utils.pagination import recipe_sort_key
+from utils.recipe_pool import RecipePool
+from utils.suggest_index import SuggestIndex, catalog_suggestions
+from utils.text_search import BM25Index
+
+logger = logging.getLogger(__name__)
+
+CATALOG_TTL_SECONDS = float(os.getenv('RECIPE_CATALOG_TTL', '300'))
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+class RecipeCatalog:
+    """Caché read-through de master_recipes con TTL e invalidación por versión.
+
+    El catálogo completo (unos cientos de filas) se carga en una sola
+    consulta y se reutiliza hasta que vence el TTL. Al vencer, se consulta
+    primero la versión remota (RPC get_catalog_version); si no ha cambiado,
+    se prolonga el TTL sin volver a leer la tabla.
+
+    Las filas devueltas son compartidas entre peticiones: no modificarlas.
+    """
+
+    def __init__(self, supabase, ttl: float = CATALOG_TTL_SECONDS):
+        self.supabase = supabase
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._recipes = None
+        self._by_id = {}
+        self._by_meal = {}
+        self._pool = None
+        self._keyset = None
+        self._facet_index = None
+        self._neighbors = None
+        self._search_index = None
+        self._suggest_index = None
+        self._refreshing = False
+        self._ingredient_index = None
+        self._remote_version = None
+        self._expires_at = 0.0
+        self.version = None
+        self.loaded_at = None
+
+    # ---------- carga ----------
+
+    def _fetch_remote_version(self) -> Optional[int]:
+        try:
+            result = self.supabase.rpc('get_catalog_version').execute()
+            return result.data if isinstance(result.data, int) else None
+        except Exception as e:
+            logger.debug(f"Catalog version RPC unavailable: {e}")
+            return None
+
+    def _load(self, recipes: List[Dict], remote_version: Optional[int]):
+        by_id = {}
+        by_meal = {}
+        for recipe in recipes:
+            by_id[recipe.get('id')] = recipe
+            by_meal.setdefault(recipe.get('meal_type'), []).append(recipe)
+
+        fingerprint = hashlib.sha1(
+            json.dumps(recipes, sort_keys=True, default=str).encode('utf-8')
+        ).hexdigest()[:16]
+
+        self._recipes = recipes
+        self._by_id = by_id
+        self._by_meal = by_meal
+        self._pool = None
+        self._keyset = None
+        self._facet_index = None
+        self._neighbors = None
+        self._search_index = None
+        self._suggest_index = None
+        if self._ingredient_index is not None:
+            # Solo se reindexan las recetas cuyos ingredientes cambiaron
+            changed = self._ingredient_index.sync(recipes)
+            logger.info(f"Ingredient index synced: {changed} recipes changed")
+        self._remote_version = remote_version
+        self.version = fingerprint
+        self.loaded_at = time.time()
+        logger.info(f"Recipe catalog loaded: {len(recipes)} recipes, version {fingerprint}")
+
+    def _refresh(self):
+        remote_version = self._fetch_remote_version()
+        if (self._recipes is not None and remote_version is not None
+                and remote_version == self._remote_version):
+            self._expires_at = time.monotonic() + self.ttl
+            return
+
+        result = self.supabase.table('master_recipes').select('*').execute()
+        self._load(result.data or [], remote_version)
+        self._expires_at = time.monotonic() + self.ttl
+
+    def _ensure_fresh(self):
+        if self._recipes is not None and time.monotonic() < self._expires_at:
+            return
+        with self._lock:
+            if self._recipes is None or time.monotonic() >= self._expires_at:
+                self._refresh()
+
+    def _is_stale(self) -> bool:
+        return self._recipes is None or time.monotonic() >= self._expires_at
+
+    def refresh_in_background(self):
+        """Recarga el catálogo en un hilo aparte si está caducado (sin bloquear a quien llama)."""
+        if not self._is_stale() or self._refreshing:
+            return
+        self._refreshing = True
+
+        def run():
+            try:
+                self._ensure_fresh()
+            except Exception as e:
+                logger.warning(f"Background catalog refresh failed: {e}")
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name='recipe-catalog-refresh', daemon=True).start()
+
+    def bump(self):
+        """Invalida la caché: la próxima lectura recarga el catálogo."""
+        with self._lock:
+            self._expires_at = 0.0
+            self._remote_version = None
+
+    def ensure_version(self) -> str:
+        """Garantiza que el catálogo está cargado y devuelve su versión."""
+        self._ensure_fresh()
+        return self.version
+
+    # ---------- lecturas ----------
+
+    def all(self) -> List[Dict]:
+        """Todas las recetas del catálogo."""
+        self._ensure_fresh()
+        return self._recipes
+
+    def get(self, recipe_id) -> Optional[Dict]:
+        """Receta por id, o None si no existe."""
+        self._ensure_fresh()
+        return self._by_id.get(recipe_id)
+
+    def get_many(self, recipe_ids: Iterable) -> List[Dict]:
+        """Recetas para los ids dados, en el mismo orden y omitiendo los que no existen."""
+        self._ensure_fresh()
+        by_id = self._by_id
+        return [by_id[rid] for rid in recipe_ids if rid in by_id]
+
+    def by_meal_type(self, meal_type: str) -> List[Dict]:
+        """Recetas de un tipo de comida."""
+        self._ensure_fresh()
+        return self._by_meal.get(meal_type, [])
+
+    def pool(self) -> RecipePool:
+        """RecipePool sobre el catálogo actual, reconstruido solo al cambiar de versión."""
+        self._ensure_fresh()
+        pool = self._pool
+        if pool is None:
+            pool = RecipePool(self._recipes)
+            self._pool = pool
+        return pool
+
+    def _sorted_keyset(self):
+        keyset = self._keyset
+        if keyset is None:
+            positions = sorted(range(len(self._recipes)), key=lambda i: recipe_sort_key(self._recipes[i]))
+            ordered = [self._recipes[i] for i in positions]
+            keyset = ([recipe_sort_key(r) for r in ordered], ordered, np.asarray(positions, dtype=np.intp))
+            self._keyset = keyset
+        return keyset
+
+    def page(self, after: Optional[Tuple] = None, limit: int = 50, meal_type: Optional[str] = None,
+             min_calories: Optional[float] = None, max_calories: Optional[float] = None
+             ) -> Tuple[List[Dict], Optional[Tuple]]:
+        """Página ordenada por (meal_type, calories, id) que empieza tras la clave after.
+
+        Devuelve (recetas, clave de la última) o (recetas, None) si no hay más.
+        Los filtros se resuelven con la máscara del NutritionStore, reordenada
+        al orden del cursor, en lugar de recorrer las recetas una a una.
+        """
+        self._ensure_fresh()
+        keys, ordered, positions = self._sorted_keyset()
+        start = bisect_right(keys, after) if after is not None else 0
+        if meal_type is None and min_calories is None and max_calories is None:
+            hits = range(start, min(start + limit + 1, len(keys)))
+        else:
+            mask = self.nutrition().mask(meal_type, min_calories, max_calories)[positions]
+            hits = np.flatnonzero(mask[start:])[:limit + 1] + start
+
+        page = [ordered[i] for i in hits]
+        if len(page) > limit:
+            page = page[:limit]
+            return page, recipe_sort_key(page[-1])
+        return page, None
+
+    def nutrition(self) -> NutritionStore:
+        """Columnas nutricionales en arrays (las del RecipePool de esta versión)."""
+        return self.pool().store
+
+    def neighbors(self) -> NutrientNeighbors:
+        """KD-trees nutricionales por meal_type, reconstruidos solo al cambiar de versión."""
+        self._ensure_fresh()
+        neighbors = self._neighbors
+        if neighbors is None:
+            neighbors = NutrientNeighbors(self._recipes)
+            self._neighbors = neighbors
+        return neighbors
+
+    def facet_index(self) -> FacetIndex:
+        """Bitmaps por faceta (etiquetas, supermercado, dificultad...), reconstruidos solo al cambiar de versión."""
+        self._ensure_fresh()
+        index = self._facet_index
+        if index is None:
+            index = FacetIndex(self._recipes)
+            self._facet_index = index
+        return index
+
+    def search_index(self) -> BM25Index:
+        """Índice BM25 en memoria del catálogo, reconstruido solo al cambiar de versión."""
+        self._ensure_fresh()
+        index = self._search_index
+        if index is None:
+            index = BM25Index(self._recipes)
+            self._search_index = index
+        return index
+
+    def suggest_index(self) -> SuggestIndex:
+        """Índice de autocompletado (recetas e ingredientes) que nunca espera a la red.
+
+        Si el catálogo está caducado se sirve la copia actual y se recarga en
+        segundo plano; si aún no se ha cargado nunca, el índice está vacío.
+        """
+        self.refresh_in_background()
+        recipes = self._recipes
+        if recipes is None:
+            return SuggestIndex()
+        index = self._suggest_index
+        if index is None:
+            index = catalog_suggestions(recipes)
+            if self._recipes is recipes:
+                self._suggest_index = index
+        return index
+
+    def ingredient_index(self) -> IngredientIndex:
+        """Índice invertido de ingredientes, mantenido de forma incremental entre recargas."""
+        self._ensure_fresh()
+        index = self._ingredient_index
+        if index is None:
+            with self._lock:
+                index = self._ingredient_index
+                if index is None:
+                    index = IngredientIndex(self._recipes)
+                    self._ingredient_index = index
+        return index
+
+
+def _catalog_key(supabase):
+    url = getattr(supabase, 'supabase_url', None)
+    return url if isinstance(url, str) else id(supabase)
+
+
+def get_recipe_catalog(supabase) -> RecipeCatalog:
+    """Devuelve el catálogo compartido del proceso para este proyecto Supabase."""
+    key = _catalog_key(supabase)
+    catalog = _catalogs.get(key)
+    if catalog is None:
+        with _catalogs_lock:
+            catalog = _catalogs.get(key)
+            if catalog is None:
+                catalog = RecipeCatalog(supabase)
+                _catalogs[key] = catalog
+    return catalog
+
+
+def bump_catalog_version(supabase=None):
+    """Hook para cargas masivas: sube la versión remota e invalida las cachés locales."""
+    if supabase is not None:
+        try:
+            supabase.rpc('bump_catalog_version').execute()
+        except Exception as e:
+            logger.warning(f"Could not bump remote catalog version: {e}")
+    for catalog in list(_catalogs.values()):
+        catalog.bump()
@@ -0,0 +1,65 @@
+"""Búsqueda de recetas por texto completo, con el mismo API para cada backend."""
+import logging
+import os
+from typing import Dict, List, Optional
+
+from services.recipe_catalog import get_recipe_catalog
+
+logger = logging.getLogger(__name__)
+
+# supabase: RPC search_recipes (tsvector + GIN); local: SQLite FTS5 de db_local; memory: BM25 sobre el catálogo
+RECIPE_SEARCH_BACKEND = os.getenv('RECIPE_SEARCH_BACKEND', 'supabase')
+
+
+def _search_supabase(supabase, query: str, limit: int, meal_type: Optional[str]) -> List[Dict]:
+    result = supabase.rpc('search_recipes', {
+        'p_query': query,
+        'p_limit': limit,
+        'p_meal_type': meal_type
+    }).execute()
+    ids = [row.get('id') for row in (result.data or [])]
+    return get_recipe_catalog(supabase).get_many(ids)
+
+
+def _search_memory(supabase, query: str, limit: int, meal_type: Optional[str]) -> List[Dict]:
+    index = get_recipe_catalog(supabase).search_index()
+    return [recipe for _, recipe in index.search(query, limit=limit, meal_type=meal_type)]
+
+
+def _search_local(query: str, limit: int, meal_type: Optional[str]) -> List[Dict]:
+    # db_local crea la base de datos al importarse: solo se carga si se usa
+    import db_local
+    return db_local.search_recipes(query, limit=limit, meal_type=meal_type)
+
+
+def search_recipes(supabase, query: str, limit: int = 20, meal_type: Optional[str] = None,
+                   backend: Optional[str] = None) -> List[Dict]:
+    """
+    Recetas que coinciden con la búsqueda, de la más a la menos relevante.
+
+    Sin tildes, con stemming en español y el último término como prefijo.
+    Si la RPC de Supabase falla (migración 004 sin aplicar), se responde
+    con el índice BM25 en memoria del catálogo.
+
+    Args:
+        supabase: cliente Supabase
+        query: texto buscado
+        limit: máximo de resultados
+        meal_type: filtro opcional por tipo de comida
+        backend: 'supabase', 'local' o 'memory' (por defecto RECIPE_SEARCH_BACKEND)
+
+    Returns:
+        Lista de recetas (filas compartidas del catálogo: no modificarlas)
+    """
+    backend = backend or RECIPE_SEARCH_BACKEND
+    if not query or not query.strip():
+        return []
+
+    if backend == 'local':
+        return _search_local(query, limit, meal_type)
+    if backend == 'supabase':
+        try:
+            return _search_supabase(supabase, query, limit, meal_type)
+        except Exception as e:
+            logger.warning(f"search_recipes RPC failed, using in-memory index: {e}")
+    return _search_memory(supabase, query, limit, meal_type)
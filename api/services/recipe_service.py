@@ -1,37 +1,61 @@
 """Servicio para operaciones con recetas."""
+import os
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 
 from supabase import Client
 
+from services.recipe_catalog import get_recipe_catalog
+from services.usage_counters import get_usage_counters
+from utils.pagination import decode_cursor, encode_cursor, page_size
+
+# supabase: embedding de PostgREST (user_food_bank -> master_recipes); local: JOIN en db_local
+FOOD_BANK_BACKEND = os.getenv('FOOD_BANK_BACKEND', 'supabase')
+
 
 class RecipeService:
     """Servicio para gestionar recetas y banco de alimentos."""
     
     def __init__(self, supabase: Client):
         self.supabase = supabase
+        self.catalog = get_recipe_catalog(supabase)
+        self.usage = get_usage_counters(supabase)
     
     def get_recipes_by_meal_type(self, meal_type: str, limit: int = 20) -> Tuple[Optional[List], Optional[str]]:
         """Obtiene recetas por tipo de comida."""
         try:
-            result = self.supabase.table('master_recipes').select('*').eq('meal_type', meal_type).limit(limit).execute()
-            return result.data if result.data else [], None
+            return self.catalog.by_meal_type(meal_type)[:limit], None
         except Exception as e:
             return None, str(e)
     
-    def get_all_recipes(self) -> Tuple[Optional[List], Optional[str]]:
-        """Obtiene todas las recetas."""
+    def get_all_recipes(self, limit: Optional[int] = None, cursor: Optional[str] = None) -> Tuple[Optional[Dict], Optional[str]]:
+        """Obtiene una página de recetas ordenadas por (meal_type, calories, id) y el cursor de la siguiente."""
         try:
-            result = self.supabase.table('master_recipes').select('*').execute()
-            return result.data if result.data else [], None
+            recipes, last_key = self.catalog.page(after=decode_cursor(cursor), limit=page_size(limit))
+            return {
+                'recipes': recipes,
+                'count': len(recipes),
+                'next_cursor': encode_cursor(last_key) if last_key else None
+            }, None
         except Exception as e:
             return None, str(e)
     
+    def _food_bank_rows(self, user_id, meal_type: Optional[str] = None, with_recipes: bool = False) -> List[Dict]:
+        """Entradas del banco; con with_recipes, con su receta embebida en 'master_recipes' en la misma consulta."""
+        if FOOD_BANK_BACKEND == 'local':
+            # db_local crea la base de datos al importarse: solo se carga si se usa
+            import db_local
+            return db_local.get_food_bank(user_id, meal_type, with_recipes)
+        query = self.supabase.table('user_food_bank') \
+            .select('*, master_recipes(*)' if with_recipes else '*').eq('user_id', user_id)
+        if meal_type:
+            query = query.eq('meal_type', meal_type)
+        return query.execute().data or []
+    
     def get_food_bank(self, user_id: int) -> Tuple[Optional[List], Optional[str]]:
         """Obtiene banco de alimentos del usuario."""
         try:
-            result = self.supabase.table('user_food_bank').select('*').eq('user_id', user_id).execute()
-            return result.data if result.data else [], None
+            return self._food_bank_rows(user_id), None
         except Exception as e:
             return None, str(e)
     
@@ -68,35 +92,27 @@ class RecipeService:
     def get_available_recipes_for_meal(self, user_id: int, meal_type: str) -> Tuple[Optional[List], Optional[str]]:
         """Obtiene recetas disponibles para un tipo de comida (del banco del usuario)."""
         try:
-            result = self.supabase.table('user_food_bank').select('recipe_id').eq('user_id', user_id).eq('meal_type', meal_type).execute()
-            if not result.data:
-                return [], None
-            
-            recipe_ids = [r['recipe_id'] for r in result.data]
-            recipes_result = self.supabase.table('master_recipes').select('*').in_('id', recipe_ids).execute()
-            return recipes_result.data if recipes_result.data else [], None
+            rows = self._food_bank_rows(user_id, meal_type, with_recipes=True)
+            return [row['master_recipes'] for row in rows if row.get('master_recipes')], None
         except Exception as e:
             return None, str(e)
     
     def increment_recipe_usage(self, user_id: int, recipe_id: int) -> Tuple[bool, Optional[str]]:
-        """Incrementa el contador de uso de una receta."""
+        """Incrementa el contador de uso de una receta (se escribe por lotes en segundo plano)."""
         try:
-            self.supabase.table('user_food_bank').update({'times_used': 1}).eq('user_id', user_id).eq('recipe_id', recipe_id).execute()
+            self.usage.increment(user_id, recipe_id)
             return True, None
         except Exception as e:
             return False, str(e)
     
     def get_popular_recipes(self, limit: int = 10) -> Tuple[Optional[List], Optional[str]]:
-        """Obtiene recetas más populares por uso."""
+        """Obtiene recetas más populares por uso (ranking materializado en popular_recipes)."""
         try:
-            # Esto requiere una consulta más compleja; simplificamos: recetas con mayor times_used
-            result = self.supabase.table('user_food_bank').select('recipe_id, times_used').order('times_used', desc=True).limit(limit).execute()
-            if not result.data:
+            ranking = self.usage.popular(limit)
+            if not ranking:
                 return [], None
             
-            # Obtener detalles de recetas
-            recipe_ids = [r['recipe_id'] for r in result.data]
-            recipes_result = self.supabase.table('master_recipes').select('*').in_('id', recipe_ids).execute()
-            return recipes_result.data if recipes_result.data else [], None
+            # Detalles desde el catálogo en memoria, en el orden del ranking
+            return self.catalog.get_many([r['recipe_id'] for r in ranking]), None
         except Exception as e:
             return None, str(e)
\ No newline at end of file
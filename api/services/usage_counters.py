@@ -0,0 +1,160 @@
+"""Contadores de uso de recetas con escritura diferida y ranking de populares."""
+import atexit
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+USAGE_FLUSH_SECONDS = float(os.getenv('USAGE_FLUSH_SECONDS', '30'))
+# Con tantos pares (usuario, receta) pendientes se vuelca sin esperar al temporizador
+USAGE_MAX_PENDING = int(os.getenv('USAGE_MAX_PENDING', '500'))
+POPULAR_REFRESH_SECONDS = float(os.getenv('POPULAR_REFRESH_SECONDS', '300'))
+POPULAR_CACHE_SECONDS = 60.0
+POPULAR_MAX = 100
+
+_counters = {}
+_counters_lock = threading.Lock()
+
+
+class UsageCounters:
+    """Acumula incrementos de times_used en memoria y los vuelca por lotes.
+
+    increment() solo suma en un dict; un hilo en segundo plano llama cada
+    flush_seconds a la RPC increment_recipe_usage_batch (un único UPDATE
+    atómico por par usuario/receta). Si el volcado falla, los incrementos
+    vuelven a la cola y se reintentan en el siguiente ciclo.
+
+    Tras volcar se refresca, como mucho cada POPULAR_REFRESH_SECONDS, la
+    vista materializada popular_recipes de la que lee popular().
+    """
+
+    def __init__(self, supabase, flush_seconds: float = USAGE_FLUSH_SECONDS,
+                 max_pending: int = USAGE_MAX_PENDING, refresh_seconds: float = POPULAR_REFRESH_SECONDS):
+        self.supabase = supabase
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}
+        self._thread = None
+        self._wake = threading.Event()
+        self._dirty_since_refresh = False
+        self._last_refresh = time.monotonic()
+        self._popular = None
+        self._popular_expires_at = 0.0
+
+    # ---------- escritura ----------
+
+    def increment(self, user_id, recipe_id, delta: int = 1):
+        """Suma delta usos a la receta del banco del usuario (se escribe en el próximo volcado)."""
+        if user_id is None or recipe_id is None or delta == 0:
+            return
+        key = (str(user_id), str(recipe_id))
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + delta
+            full = len(self._pending) >= self.max_pending
+        self._start()
+        if full:
+            self._wake.set()
+
+    def pending(self) -> Dict[Tuple[str, str], int]:
+        """Copia de los incrementos aún no volcados."""
+        with self._lock:
+            return dict(self._pending)
+
+    def flush(self) -> int:
+        """Vuelca los incrementos pendientes en una sola RPC. Devuelve cuántos pares se enviaron."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            increments = [{'user_id': user_id, 'recipe_id': recipe_id, 'delta': delta}
+                          for (user_id, recipe_id), delta in sorted(batch.items())]
+            try:
+                self.supabase.rpc('increment_recipe_usage_batch', {'p_increments': increments}).execute()
+            except Exception as e:
+                logger.warning(f"Usage flush failed, {len(batch)} counters requeued: {e}")
+                with self._lock:
+                    for key, delta in batch.items():
+                        self._pending[key] = self._pending.get(key, 0) + delta
+                raise
+            self._dirty_since_refresh = True
+            return len(batch)
+
+    def refresh_ranking(self, force: bool = False) -> bool:
+        """Refresca la vista popular_recipes si hubo volcados y ha pasado el intervalo."""
+        now = time.monotonic()
+        if not force and (not self._dirty_since_refresh or now - self._last_refresh < self.refresh_seconds):
+            return False
+        self.supabase.rpc('refresh_popular_recipes').execute()
+        self._dirty_since_refresh = False
+        self._last_refresh = now
+        self._popular_expires_at = 0.0
+        return True
+
+    # ---------- lectura ----------
+
+    def popular(self, limit: int = 10) -> List[Dict]:
+        """Ranking [{recipe_id, total_uses, users}] leído de popular_recipes, cacheado unos segundos."""
+        ranking = self._popular
+        if ranking is None or time.monotonic() >= self._popular_expires_at:
+            result = self.supabase.table('popular_recipes').select('recipe_id, total_uses, users') \
+                .order('total_uses', desc=True).order('users', desc=True).limit(POPULAR_MAX).execute()
+            ranking = result.data or []
+            self._popular = ranking
+            self._popular_expires_at = time.monotonic() + POPULAR_CACHE_SECONDS
+        return ranking[:limit]
+
+    # ---------- hilo de volcado ----------
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+                self.refresh_ranking()
+            except Exception as e:
+                logger.debug(f"Usage counters cycle failed: {e}")
+
+    def _start(self):
+        if self._thread is not None or self.flush_seconds <= 0:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='usage-counters', daemon=True)
+            self._thread.start()
+
+
+def _counters_key(supabase):
+    url = getattr(supabase, 'supabase_url', None)
+    return url if isinstance(url, str) else id(supabase)
+
+
+def get_usage_counters(supabase) -> UsageCounters:
+    """Devuelve los contadores compartidos del proceso para este proyecto Supabase."""
+    key = _counters_key(supabase)
+    counters = _counters.get(key)
+    if counters is None:
+        with _counters_lock:
+            counters = _counters.get(key)
+            if counters is None:
+                counters = UsageCounters(supabase)
+                _counters[key] = counters
+    return counters
+
+
+@atexit.register
+def flush_all_usage_counters():
+    """Vuelca lo pendiente al terminar el proceso."""
+    for counters in list(_counters.values()):
+        try:
+            counters.flush()
+        except Exception as e:
+            logger.warning(f"Could not flush usage counters on exit: {e}")
@@ -0,0 +1,218 @@
+"""Cambio de semana en lote: genera el plan de la próxima semana para todos los usuarios activos."""
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from services.plan_service import build_next_week_entries, next_iso_week
+from services.recipe_catalog import get_recipe_catalog
+
+logger = logging.getLogger(__name__)
+
+PROFILE_PAGE_SIZE = 500
+FOOD_BANK_PAGE_SIZE = 1000
+INSERT_BATCH_SIZE = 1000
+# Ids por filtro in_(): 500 UUIDs superan el límite de URL de PostgREST y de los proxies
+USER_ID_CHUNK = 100
+
+# Catálogo de cada proceso del pool (se envía una sola vez con el initializer)
+_worker_recipes_by_id = {}
+_worker_recipes_by_meal = {}
+
+
+def _init_worker(recipes: List[Dict]):
+    global _worker_recipes_by_id, _worker_recipes_by_meal
+    _worker_recipes_by_id = {r.get('id'): r for r in recipes}
+    _worker_recipes_by_meal = {}
+    for recipe in recipes:
+        _worker_recipes_by_meal.setdefault(recipe.get('meal_type'), []).append(recipe)
+
+
+def _plan_for_user(task) -> List[Dict]:
+    user_id, meals_per_day, food_bank, week_number = task
+    if not food_bank:
+        return []
+    return build_next_week_entries(
+        user_id, meals_per_day, food_bank, week_number,
+        _worker_recipes_by_id.get,
+        lambda meal_type: _worker_recipes_by_meal.get(meal_type, [])
+    )
+
+
+class RolloverStats:
+    """Contadores de rendimiento de una ejecución."""
+
+    def __init__(self, year: int, week_number: int):
+        self.started = time.monotonic()
+        self.year = year
+        self.week_number = week_number
+        self.pages = 0
+        self.users = 0
+        self.users_planned = 0
+        self.users_skipped = 0
+        self.entries = 0
+        self.insert_batches = 0
+        self.read_seconds = 0.0
+        self.compute_seconds = 0.0
+        self.write_seconds = 0.0
+
+    def as_dict(self) -> Dict:
+        elapsed = time.monotonic() - self.started
+        return {
+            'year': self.year,
+            'week_number': self.week_number,
+            'pages': self.pages,
+            'users': self.users,
+            'users_planned': self.users_planned,
+            'users_skipped': self.users_skipped,
+            'entries': self.entries,
+            'insert_batches': self.insert_batches,
+            'elapsed_seconds': round(elapsed, 3),
+            'read_seconds': round(self.read_seconds, 3),
+            'compute_seconds': round(self.compute_seconds, 3),
+            'write_seconds': round(self.write_seconds, 3),
+            'users_per_second': round(self.users / elapsed, 1) if elapsed else 0,
+            'entries_per_second': round(self.entries / elapsed, 1) if elapsed else 0
+        }
+
+
+def _iter_profile_pages(supabase, page_size: int):
+    """Recorre user_profiles activos por páginas con paginación keyset sobre user_id."""
+    last_user_id = None
+    while True:
+        query = supabase.table('user_profiles').select('user_id, meals_per_day').eq('onboarding_completed', True)
+        if last_user_id is not None:
+            query = query.gt('user_id', last_user_id)
+        rows = query.order('user_id').limit(page_size).execute().data or []
+        if not rows:
+            return
+        yield rows
+        if len(rows) < page_size:
+            return
+        last_user_id = rows[-1]['user_id']
+
+
+def _chunks(items: List, size: int = USER_ID_CHUNK):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _fetch_food_banks(supabase, user_ids: List) -> Dict:
+    """Bancos de alimentos de una página de usuarios, leídos por rangos y en grupos de USER_ID_CHUNK ids."""
+    banks = {user_id: [] for user_id in user_ids}
+    for chunk in _chunks(user_ids):
+        start = 0
+        while True:
+            rows = supabase.table('user_food_bank').select('user_id, recipe_id, meal_type, times_used') \
+                .in_('user_id', chunk).order('id').range(start, start + FOOD_BANK_PAGE_SIZE - 1).execute().data or []
+            for row in rows:
+                banks.setdefault(row['user_id'], []).append(row)
+            if len(rows) < FOOD_BANK_PAGE_SIZE:
+                break
+            start += FOOD_BANK_PAGE_SIZE
+    return banks
+
+
+def _write_groups(user_ids: List, entries: List[Dict], batch_size: int):
+    """Agrupa usuarios con todas sus entradas: hasta USER_ID_CHUNK usuarios y unas batch_size filas por grupo."""
+    by_user = {user_id: [] for user_id in user_ids}
+    for entry in entries:
+        by_user[entry['user_id']].append(entry)
+
+    group_ids, group_entries = [], []
+    for user_id, user_entries in by_user.items():
+        if group_ids and (len(group_ids) >= USER_ID_CHUNK or len(group_entries) + len(user_entries) > batch_size):
+            yield group_ids, group_entries
+            group_ids, group_entries = [], []
+        group_ids.append(user_id)
+        group_entries.extend(user_entries)
+    if group_ids:
+        yield group_ids, group_entries
+
+
+def _write_entries(supabase, user_ids: List, entries: List[Dict], week_number: int, stats: RolloverStats, batch_size: int):
+    # Cada grupo se reemplaza en una transacción (replace_weekly_plans): si una
+    # llamada falla, esos usuarios conservan su plan anterior
+    for group_ids, group_entries in _write_groups(user_ids, entries, batch_size):
+        supabase.rpc('replace_weekly_plans', {
+            'p_week_number': week_number,
+            'p_user_ids': group_ids,
+            'p_entries': group_entries
+        }).execute()
+        stats.insert_batches += 1
+
+
+def run_week_rollover(supabase, workers: Optional[int] = None, page_size: int = PROFILE_PAGE_SIZE,
+                      batch_size: int = INSERT_BATCH_SIZE, week_number: Optional[int] = None) -> Dict:
+    """
+    Regenera el plan de la próxima semana para todos los usuarios activos.
+
+    Lee user_profiles por páginas, reparte el cálculo de los planes en un
+    pool de procesos y reemplaza weekly_plans por grupos de usuarios, cada
+    grupo en una transacción (replace_weekly_plans).
+
+    Args:
+        supabase: cliente Supabase
+        workers: procesos del pool (por defecto os.cpu_count(); 0 o 1 calcula en este proceso)
+        page_size: perfiles por página
+        batch_size: filas por llamada a replace_weekly_plans (aprox.: un usuario no se parte)
+        week_number: semana a generar (por defecto la semana ISO de dentro de siete días)
+
+    Returns:
+        Estadísticas de rendimiento de la ejecución
+    """
+    year, next_week = next_iso_week()
+    week_number = week_number or next_week
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    stats = RolloverStats(year, week_number)
+    catalog_rows = list(get_recipe_catalog(supabase).all())
+
+    executor = None
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(catalog_rows,))
+    else:
+        _init_worker(catalog_rows)
+
+    try:
+        for profiles in _iter_profile_pages(supabase, page_size):
+            stats.pages += 1
+            stats.users += len(profiles)
+
+            started = time.monotonic()
+            user_ids = [p['user_id'] for p in profiles]
+            banks = _fetch_food_banks(supabase, user_ids)
+            stats.read_seconds += time.monotonic() - started
+
+            started = time.monotonic()
+            tasks = [(p['user_id'], p.get('meals_per_day') or 4, banks.get(p['user_id'], []), week_number) for p in profiles]
+            if executor:
+                chunksize = max(1, len(tasks) // (workers * 4))
+                results = list(executor.map(_plan_for_user, tasks, chunksize=chunksize))
+            else:
+                results = [_plan_for_user(task) for task in tasks]
+            stats.compute_seconds += time.monotonic() - started
+
+            entries = []
+            planned_ids = []
+            for (user_id, _, _, _), user_entries in zip(tasks, results):
+                if user_entries:
+                    entries.extend(user_entries)
+                    planned_ids.append(user_id)
+                    stats.users_planned += 1
+                else:
+                    # Sin banco de alimentos: igual que generate_next_week_plan, no se genera
+                    stats.users_skipped += 1
+
+            if planned_ids:
+                started = time.monotonic()
+                _write_entries(supabase, planned_ids, entries, week_number, stats, batch_size)
+                stats.write_seconds += time.monotonic() - started
+                stats.entries += len(entries)
+
+            logger.info(f"Rollover {year}-W{week_number:02d} page {stats.pages}: {len(planned_ids)}/{len(profiles)} users, {len(entries)} entries")
+    finally:
+        if executor:
+            executor.shutdown()
+
+    return stats.as_dict()
@@ -0,0 +1,97 @@
+"""
+Unit tests for negotiated response compression.
+"""
+import gzip
+import zlib
+
+from flask import Flask, Response, jsonify
+
+from utils.compression import CompressedCache, choose_encoding, compress_stream, init_compression
+from utils.http_cache import http_cached
+
+BIG = {'items': [{'name': f'Ingrediente {i}', 'amount': i} for i in range(200)]}
+
+def make_app(cache=None):
+    app = Flask(__name__)
+    init_compression(app, min_bytes=512, cache=cache)
+
+    @app.route('/big')
+    def big():
+        return jsonify(BIG)
+
+    @app.route('/small')
+    def small():
+        return jsonify({'ok': True})
+
+    @app.route('/catalog')
+    @http_cached(version=lambda: 'v1')
+    def catalog():
+        return jsonify(BIG)
+
+    @app.route('/stream')
+    def stream():
+        return Response((f'{i},linea\n' for i in range(500)), mimetype='text/csv')
+
+    return app.test_client()
+
+def test_choose_encoding_respects_quality_values():
+    """gzip is picked when accepted; q=0 and unknown encodings are ignored."""
+    assert choose_encoding('gzip, deflate') == 'gzip'
+    assert choose_encoding('deflate') is None
+    assert choose_encoding('gzip;q=0') is None
+    assert choose_encoding('*') in ('br', 'gzip')
+    assert choose_encoding(None) is None
+
+def test_large_json_is_gzipped_and_small_is_not():
+    """Only bodies above the threshold are compressed; both vary on Accept-Encoding."""
+    client = make_app()
+    response = client.get('/big', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.data) == client.get('/big').data
+
+    response = client.get('/small', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+
+def test_public_responses_reuse_compressed_bytes():
+    """Catalog responses are compressed once per ETag and get a weak ETag."""
+    cache = CompressedCache()
+    client = make_app(cache)
+    first = client.get('/catalog', headers={'Accept-Encoding': 'gzip'})
+    assert first.headers['ETag'].startswith('W/')
+    assert len(cache._data) == 1
+    second = client.get('/catalog', headers={'Accept-Encoding': 'gzip'})
+    assert second.data == first.data
+    revalidated = client.get('/catalog', headers={'Accept-Encoding': 'gzip', 'If-None-Match': first.headers['ETag']})
+    assert revalidated.status_code == 304
+
+def test_streamed_responses_are_compressed_incrementally():
+    """Streaming bodies are encoded chunk by chunk and still decode to the original."""
+    client = make_app()
+    response = client.get('/stream', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    expected = ''.join(f'{i},linea\n' for i in range(500)).encode()
+    assert gzip.decompress(response.data) == expected
+
+    chunks = list(compress_stream([b'a' * 100, b'b' * 100], 'gzip'))
+    decoder = zlib.decompressobj(31)
+    assert decoder.decompress(chunks[0]) == b'a' * 100
+
+def test_etag_is_weak_per_encoding_and_304_keeps_vary():
+    """Encoded and identity bodies never share a strong ETag; a 304 matches its 200's headers."""
+    client = make_app()
+    identity = client.get('/catalog')
+    gzipped = client.get('/catalog', headers={'Accept-Encoding': 'gzip'})
+    assert not identity.headers['ETag'].startswith('W/')
+    assert gzipped.headers['ETag'] == 'W/' + identity.headers['ETag']
+
+    revalidated = client.get('/catalog', headers={'Accept-Encoding': 'gzip', 'If-None-Match': gzipped.headers['ETag']})
+    assert revalidated.status_code == 304
+    assert revalidated.headers['ETag'] == gzipped.headers['ETag']
+    assert 'Accept-Encoding' in revalidated.headers['Vary']
+    assert revalidated.headers['Cache-Control'] == gzipped.headers['Cache-Control']
+
+    plain = client.get('/catalog', headers={'If-None-Match': identity.headers['ETag']})
+    assert plain.status_code == 304
+    assert plain.headers['ETag'] == identity.headers['ETag']
+    assert 'Accept-Encoding' in plain.headers['Vary']
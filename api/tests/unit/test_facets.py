@@ -0,0 +1,48 @@
+"""
+Unit tests for the bitmap facet index.
+"""
+from utils.facets import FacetIndex, normalize_tag, prep_time_bucket, recipe_tags
+
+RECIPES = [
+    {'id': 'a', 'supermarket': 'mercadona', 'difficulty': 'facil', 'cost': 'barato', 'prep_time_min': 10,
+     'tags': ['vegetariano', 'sin gluten']},
+    {'id': 'b', 'supermarket': 'lidl', 'difficulty': 'facil', 'cost': 'medio', 'prep_time_min': 25,
+     'tags': '["vegetariano","sin_gluten","rapido"]'},
+    {'id': 'c', 'supermarket': 'lidl', 'difficulty': 'medio', 'cost': 'caro', 'prep_time_min': 45,
+     'tags': '{pescado,Sin-Gluten}'},
+    {'id': 'd', 'supermarket': 'Mercadona', 'difficulty': 'dificil', 'cost': 'barato', 'prep_time_min': None,
+     'tags': None},
+]
+
+def ids(result):
+    return [r['id'] for r in result['recipes']]
+
+def test_tag_variants_share_one_value():
+    """Spacing, underscores, hyphens, case and storage format don't split a tag."""
+    assert normalize_tag('Sin_Gluten') == normalize_tag('sin-gluten') == 'sin gluten'
+    assert recipe_tags('{pescado,Sin-Gluten}') == ['pescado', 'sin gluten']
+    assert recipe_tags(None) == []
+    assert prep_time_bucket(15) == '0-15' and prep_time_bucket(90) == '60+' and prep_time_bucket(None) is None
+
+def test_filters_intersect_across_facets_and_union_within():
+    """Values of one facet are OR-ed, different facets are AND-ed, tags are AND-ed."""
+    index = FacetIndex(RECIPES)
+    assert ids(index.search({'tag': ['sin_gluten']})) == ['a', 'b', 'c']
+    assert ids(index.search({'tag': ['sin gluten', 'vegetariano']})) == ['a', 'b']
+    assert ids(index.search({'supermarket': ['lidl', 'MERCADONA'], 'cost': ['barato']})) == ['a', 'd']
+    assert ids(index.search({'prep_time': ['16-30', '31-60'], 'difficulty': ['medio']})) == ['c']
+    assert index.search({'tag': ['inexistente']})['total'] == 0
+
+def test_counts_ignore_the_facets_own_selection():
+    """Counts for a facet reflect the other filters, so siblings stay selectable."""
+    index = FacetIndex(RECIPES)
+    result = index.search({'supermarket': ['lidl'], 'cost': ['barato']})
+    assert result['total'] == 0
+    assert result['facets']['supermarket'] == {'mercadona': 2}
+    assert result['facets']['cost'] == {'caro': 1, 'medio': 1}
+
+def test_pagination_over_matches():
+    """limit/offset walk matches in catalog order while total stays constant."""
+    index = FacetIndex(RECIPES)
+    page = index.search({}, limit=2, offset=1)
+    assert ids(page) == ['b', 'c'] and page['total'] == 4
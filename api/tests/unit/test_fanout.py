@@ -0,0 +1,119 @@
+"""
+Unit tests for concurrent source fan-out under a deadline.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils.fanout import BoundedExecutor, ExecutorSaturated, fan_out
+
+@pytest.fixture
+def executor():
+    pool = ThreadPoolExecutor(max_workers=4)
+    yield pool
+    pool.shutdown(wait=False)
+
+def test_sources_run_concurrently(executor):
+    """Two slow sources take about as long as the slowest one."""
+    started = time.monotonic()
+    results, pending = fan_out({
+        'recipes': (executor, lambda: time.sleep(0.2) or ['r']),
+        'products': (executor, lambda: time.sleep(0.2) or ['p']),
+    }, timeout=2)
+    assert results == {'recipes': ['r'], 'products': ['p']}
+    assert pending == set()
+    assert time.monotonic() - started < 0.35
+
+def test_deadline_returns_partial_results(executor):
+    """A source that misses the deadline is reported as pending."""
+    release = threading.Event()
+    started = time.monotonic()
+    results, pending = fan_out({
+        'recipes': (executor, lambda: ['r']),
+        'products': (executor, lambda: release.wait(5) and ['p']),
+    }, timeout=0.1)
+    release.set()
+    assert results == {'recipes': ['r']}
+    assert pending == {'products'}
+    assert time.monotonic() - started < 1
+
+def test_failed_source_is_skipped(executor):
+    """An exception in one source does not hide the others."""
+    def boom():
+        raise RuntimeError('OFF down')
+
+    results, pending = fan_out({'recipes': (executor, lambda: ['r']), 'products': (executor, boom)}, timeout=1)
+    assert results == {'recipes': ['r']}
+    assert pending == set()
+
+def test_bounded_executor_rejects_work_beyond_its_backlog():
+    """Submitting past max_pending fails fast and slots free up as tasks finish."""
+    release = threading.Event()
+    pool = BoundedExecutor(max_workers=1, max_pending=2)
+    blocked = [pool.submit(release.wait, 5) for _ in range(2)]
+    with pytest.raises(ExecutorSaturated):
+        pool.submit(lambda: None)
+    release.set()
+    for future in blocked:
+        future.result(timeout=1)
+    assert pool.submit(lambda: 'ok').result(timeout=1) == 'ok'
+    pool.shutdown()
+
+def test_saturated_off_pool_does_not_delay_recipes():
+    """Slow OFF calls filling their pool never block the recipe search on its own pool."""
+    release = threading.Event()
+    off_pool = BoundedExecutor(max_workers=2, max_pending=2)
+    recipe_pool = BoundedExecutor(max_workers=2)
+    for _ in range(2):
+        off_pool.submit(release.wait, 5)
+
+    started = time.monotonic()
+    results, pending = fan_out({'recipes': (recipe_pool, lambda: ['r']),
+                                'products': (off_pool, lambda: ['p'])}, timeout=0.5)
+    release.set()
+    off_pool.shutdown()
+    recipe_pool.shutdown()
+    assert results == {'recipes': ['r']}
+    assert pending == {'products'}
+    assert time.monotonic() - started < 0.3
+
+def patch_search(app, mocker, recipes):
+    mocker.patch.object(app, 'search_recipes', side_effect=recipes)
+    return mocker.patch.object(app, 'fetch_off_food_search', return_value=[])
+
+def test_search_food_returns_recipes_when_off_pool_is_saturated(mock_supabase, mocker):
+    """search-food answers with recipes and partial: true while every OFF worker is busy."""
+    import app
+    release = threading.Event()
+    pool = BoundedExecutor(max_workers=1, max_pending=1)
+    pool.submit(release.wait, 5)
+    mocker.patch.object(app, 'off_search_executor', pool)
+    fetch = patch_search(app, mocker, lambda *a, **kw: [{'id': 1, 'name': 'Tortilla', 'calories': 300}])
+
+    response = app.app.test_client().get('/api/search-food?q=tortilla')
+    release.set()
+    pool.shutdown()
+    body = response.get_json()
+    assert response.status_code == 200
+    assert [r['name'] for r in body['recipes']] == ['Tortilla']
+    assert body['products'] == []
+    assert body['partial'] is True
+    fetch.assert_not_called()
+
+def test_search_food_does_not_wait_past_the_deadline_for_recipes(mock_supabase, mocker):
+    """A slow recipe search (cold catalog, slow RPC) is cut at the deadline and reported as partial."""
+    import app
+    release = threading.Event()
+    mocker.patch.object(app, 'SEARCH_FOOD_DEADLINE_SECONDS', 0.2)
+    patch_search(app, mocker, lambda *a, **kw: release.wait(5) and [])
+
+    started = time.monotonic()
+    response = app.app.test_client().get('/api/search-food?q=tortilla')
+    release.set()
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['recipes'] == []
+    assert body['partial'] is True
+    assert time.monotonic() - started < 1
@@ -0,0 +1,26 @@
+"""
+Unit tests for sparse fieldset parsing.
+"""
+import pytest
+
+from utils.fields import PLAN_FIELDS, RECIPE_FIELDS, parse_fields, select_clause
+
+def test_no_fields_means_every_column():
+    """Without ?fields= endpoints keep selecting '*'."""
+    assert parse_fields(None, RECIPE_FIELDS) is None
+    assert parse_fields('  ', RECIPE_FIELDS) is None
+    assert select_clause(None) == '*'
+
+def test_required_columns_come_first_without_duplicates():
+    """Columns the endpoint needs are always projected, once."""
+    fields = parse_fields('recipe_name, calories,day_of_week', PLAN_FIELDS, required=('id', 'day_of_week'))
+    assert fields == ('id', 'day_of_week', 'recipe_name', 'calories')
+
+def test_unknown_columns_are_rejected():
+    """Anything outside the whitelist is a client error, never a PostgREST query."""
+    with pytest.raises(ValueError, match='instructions;drop, password_hash'):
+        parse_fields('name,password_hash,instructions;drop', RECIPE_FIELDS)
+
+def test_select_clause_joins_columns():
+    """Projected columns become a PostgREST select list."""
+    assert select_clause(('id', 'name', 'image_url')) == 'id,name,image_url'
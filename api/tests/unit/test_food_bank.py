@@ -0,0 +1,70 @@
+"""
+Unit tests for food-bank reads with embedded recipe rows.
+"""
+from unittest.mock import MagicMock
+
+import pytest
+
+from services import recipe_service
+from services.recipe_service import RecipeService
+
+@pytest.fixture
+def local_db(tmp_path, monkeypatch):
+    # db_local initialises its database on import: point it at a temp file first
+    monkeypatch.setenv('LOCAL_DB_PATH', str(tmp_path / 'local.db'))
+    import db_local
+    monkeypatch.setattr(db_local, 'DB_PATH', str(tmp_path / 'local.db'))
+    db_local.init_db()
+    with db_local.get_db() as conn:
+        recipe_ids = [row['id'] for row in conn.execute(
+            "SELECT id FROM master_recipes WHERE meal_type = 'breakfast' ORDER BY name LIMIT 2")]
+        for i, recipe_id in enumerate(recipe_ids):
+            conn.execute('INSERT INTO user_food_bank (id, user_id, meal_type, recipe_id, times_used) VALUES (?, ?, ?, ?, ?)',
+                         (f'fb-{i}', 'u1', 'breakfast', recipe_id, i))
+        conn.execute("INSERT INTO user_food_bank (id, user_id, meal_type, recipe_id) VALUES ('fb-x', 'u1', 'snack', 'gone')")
+        conn.commit()
+    return recipe_ids
+
+def test_supabase_backend_uses_one_embedded_query(monkeypatch):
+    """Available recipes come from a single user_food_bank query embedding master_recipes."""
+    monkeypatch.setattr(recipe_service, 'FOOD_BANK_BACKEND', 'supabase')
+    client = MagicMock()
+    query = client.table.return_value.select.return_value.eq.return_value
+    query.eq.return_value.execute.return_value.data = [
+        {'recipe_id': 'r1', 'master_recipes': {'id': 'r1', 'name': 'Avena'}},
+        {'recipe_id': 'r2', 'master_recipes': None},
+    ]
+    service = RecipeService(client)
+    client.reset_mock()
+    recipes, error = service.get_available_recipes_for_meal('u1', 'breakfast')
+    assert error is None and recipes == [{'id': 'r1', 'name': 'Avena'}]
+    client.table.assert_called_once_with('user_food_bank')
+    client.table.return_value.select.assert_called_once_with('*, master_recipes(*)')
+
+def test_get_food_bank_keeps_plain_rows(monkeypatch):
+    """The food-bank listing does not embed recipes."""
+    monkeypatch.setattr(recipe_service, 'FOOD_BANK_BACKEND', 'supabase')
+    client = MagicMock()
+    client.table.return_value.select.return_value.eq.return_value.execute.return_value.data = [{'recipe_id': 'r1'}]
+    service = RecipeService(client)
+    client.reset_mock()
+    bank, error = service.get_food_bank('u1')
+    assert error is None and bank == [{'recipe_id': 'r1'}]
+    client.table.return_value.select.assert_called_once_with('*')
+
+def test_local_backend_joins_recipes(local_db, monkeypatch):
+    """db_local returns the same shapes, joining recipes only for available recipes."""
+    monkeypatch.setattr(recipe_service, 'FOOD_BANK_BACKEND', 'local')
+    service = RecipeService(MagicMock())
+    bank, error = service.get_food_bank('u1')
+    assert error is None
+    assert [row['recipe_id'] for row in bank][:2] == local_db
+    assert all('master_recipes' not in row for row in bank)
+
+    import db_local
+    joined = db_local.get_food_bank('u1', with_recipes=True)
+    assert joined[0]['master_recipes']['meal_type'] == 'breakfast'
+    assert joined[2]['master_recipes'] is None
+
+    recipes, error = service.get_available_recipes_for_meal('u1', 'breakfast')
+    assert [r['id'] for r in recipes] == local_db
@@ -0,0 +1,27 @@
+"""
+Unit tests for the compiled allergen / disliked-food matcher.
+"""
+from utils.food_matcher import TermMatcher, normalize_text, ingredient_names, get_exclusion_matcher
+
+def test_normalize_text_strips_accents():
+    """Accents, case and extra spaces are removed."""
+    assert normalize_text('  Limón  Exprimido ') == 'limon exprimido'
+
+def test_term_matcher_finds_overlapping_terms():
+    """All terms are found in one pass, including overlapping ones."""
+    matcher = TermMatcher(['he', 'she', 'hers', 'nuez'])
+    assert matcher.find_all('ushers') == {'he', 'she', 'hers'}
+    assert matcher.matches('con nuez moscada')
+    assert not matcher.matches('pollo')
+
+def test_ingredients_in_list_format():
+    """Structured and mixed ingredient lists are supported."""
+    assert ingredient_names([{'name': 'Nueces', 'amount': 20}, 'Plátano', 3]) == ['Nueces', 'Plátano']
+    assert ingredient_names('Merluza, Limón,') == ['Merluza', 'Limón']
+
+def test_matcher_is_cached_per_preference_string():
+    """Identical preferences reuse the same compiled automaton."""
+    first = get_exclusion_matcher({'allergies': 'Nueces, gluten', 'disliked_foods': ''})
+    second = get_exclusion_matcher({'allergies': 'gluten,nueces', 'disliked_foods': None})
+    assert first is second
+    assert get_exclusion_matcher({'allergies': '', 'disliked_foods': ''}) is None
@@ -0,0 +1,82 @@
+"""
+Unit tests for the catalog HTTP caching decorator.
+"""
+from flask import Flask, jsonify
+
+from utils.http_cache import http_cached
+
+def make_app(state):
+    app = Flask(__name__)
+
+    @app.route('/versioned')
+    @http_cached(version=lambda: state['version'], last_modified=lambda: 1_700_000_000)
+    def versioned():
+        state['calls'] += 1
+        return jsonify({'version': state['version']}), 200
+
+    @app.route('/hashed')
+    @http_cached()
+    def hashed():
+        state['calls'] += 1
+        return jsonify({'body': state['body']}), 200, {'Vary': 'Accept-Language'}
+
+    @app.route('/broken')
+    @http_cached(version=lambda: state['version'])
+    def broken():
+        return jsonify({'error': 'boom'}), 500
+
+    return app.test_client()
+
+def test_versioned_etag_answers_304_without_running_the_view():
+    """A matching If-None-Match is a 304 and the view is skipped."""
+    state = {'version': 'v1', 'calls': 0}
+    client = make_app(state)
+    first = client.get('/versioned?b=2&a=1')
+    assert first.status_code == 200
+    assert 's-maxage=' in first.headers['Cache-Control']
+    assert 'stale-while-revalidate=' in first.headers['Cache-Control']
+    assert first.headers['Last-Modified'].endswith('GMT')
+
+    again = client.get('/versioned?a=1&b=2', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert again.headers['ETag'] == first.headers['ETag']
+    assert state['calls'] == 1
+
+def test_etag_changes_with_version_and_query():
+    """A new catalog version or different parameters never reuse an ETag."""
+    state = {'version': 'v1', 'calls': 0}
+    client = make_app(state)
+    etag = client.get('/versioned').headers['ETag']
+    assert client.get('/versioned?limit=5').headers['ETag'] != etag
+    state['version'] = 'v2'
+    stale = client.get('/versioned', headers={'If-None-Match': etag})
+    assert stale.status_code == 200
+    assert stale.get_json() == {'version': 'v2'}
+
+def test_body_hash_etag_without_version():
+    """Without a version the ETag tracks the response body."""
+    state = {'body': 'a', 'calls': 0}
+    client = make_app(state)
+    etag = client.get('/hashed').headers['ETag']
+    assert client.get('/hashed', headers={'If-None-Match': etag}).status_code == 304
+    state['body'] = 'b'
+    assert client.get('/hashed', headers={'If-None-Match': etag}).status_code == 200
+
+def test_errors_are_not_cacheable():
+    """Error responses pass through without cache headers."""
+    response = make_app({'version': 'v1', 'calls': 0}).get('/broken')
+    assert response.status_code == 500
+    assert 'Cache-Control' not in response.headers
+    assert 'ETag' not in response.headers
+
+def test_304_carries_the_headers_of_the_200():
+    """A 304 repeats the ETag, Cache-Control and the view's Vary, without body headers."""
+    client = make_app({'version': 'v1', 'body': 'a', 'calls': 0})
+    for path in ('/versioned', '/hashed'):
+        first = client.get(path)
+        again = client.get(path, headers={'If-None-Match': first.headers['ETag']})
+        assert again.status_code == 304
+        assert again.data == b''
+        for header in ('ETag', 'Cache-Control', 'Vary'):
+            assert again.headers.get(header) == first.headers.get(header)
+        assert 'Content-Encoding' not in again.headers
@@ -0,0 +1,73 @@
+"""
+Unit tests for the shared outbound HTTP session.
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from utils.http_client import build_retry, build_session, get_http_session, USER_AGENT
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.ports.add(self.client_address[1])
+        self.server.requests += 1
+        if self.server.failures > 0:
+            self.server.failures -= 1
+            status, body = 503, b'{}'
+        else:
+            status, body = 200, json.dumps({'agent': self.headers.get('User-Agent')}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    httpd.ports, httpd.requests, httpd.failures = set(), 0, 0
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+def url(httpd):
+    return f"http://127.0.0.1:{httpd.server_address[1]}/product"
+
+def test_connections_are_kept_alive(server):
+    """Consecutive calls reuse one pooled connection and send our User-Agent."""
+    session = build_session()
+    for _ in range(3):
+        assert session.get(url(server), timeout=(1, 2)).json() == {'agent': USER_AGENT}
+    assert server.requests == 3
+    assert len(server.ports) == 1
+
+def test_transient_errors_are_retried(server):
+    """A 503 is retried with backoff until it succeeds."""
+    server.failures = 2
+    response = build_session(retries=2).get(url(server), timeout=(1, 2))
+    assert response.status_code == 200
+    assert server.requests == 3
+
+def test_retries_are_bounded(server):
+    """After the retry budget the error surfaces as a RequestException."""
+    server.failures = 10
+    with pytest.raises(requests.RequestException):
+        build_session(retries=1).get(url(server), timeout=(1, 2))
+    assert server.requests == 2
+
+def test_retry_policy_and_shared_session():
+    """Read timeouts are not retried and the process shares one session."""
+    retry = build_retry(3)
+    assert retry.read == 0 and retry.connect == 3
+    assert not retry.respect_retry_after_header
+    assert get_http_session() is get_http_session()
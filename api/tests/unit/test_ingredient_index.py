@@ -0,0 +1,44 @@
+"""
+Unit tests for the incremental ingredient inverted index.
+"""
+from utils.food_matcher import get_exclusion_matcher
+from utils.ingredient_index import IngredientIndex
+
+RECIPES = [
+    {'id': 1, 'ingredients': 'Merluza, Limón'},
+    {'id': 2, 'ingredients': [{'name': 'Pollo'}, {'name': 'Nueces'}]},
+    {'id': 3, 'ingredients': ['Arroz', 'Pollo']},
+    {'id': 4, 'ingredients': None},
+]
+
+def test_excluded_ids_is_accent_insensitive():
+    """'limon' and 'nuez' exclude recipes across every ingredient format."""
+    index = IngredientIndex(RECIPES)
+    matcher = get_exclusion_matcher({'allergies': 'nuec', 'disliked_foods': 'limon'})
+    assert index.excluded_ids(matcher) == {1, 2}
+    assert index.excluded_ids(None) == frozenset()
+    assert index.excluded_ids(get_exclusion_matcher({'allergies': 'Pollo'})) == {2, 3}
+
+def test_upsert_and_remove_update_postings():
+    """Changing or removing a recipe only touches its own postings."""
+    index = IngredientIndex(RECIPES)
+    matcher = get_exclusion_matcher({'allergies': 'pollo'})
+    assert index.excluded_ids(matcher) == {2, 3}
+
+    assert index.upsert({'id': 3, 'ingredients': 'Arroz, Tofu'})
+    assert not index.upsert({'id': 3, 'ingredients': 'Arroz, Tofu'})
+    assert index.excluded_ids(matcher) == {2}
+
+    assert index.remove(2)
+    assert not index.remove(2)
+    assert index.excluded_ids(matcher) == frozenset()
+    assert index.excluded_ids(get_exclusion_matcher({'allergies': 'nueces'})) == frozenset()
+
+def test_sync_reports_changed_recipes():
+    """sync() reindexes only changed recipes and drops missing ones."""
+    index = IngredientIndex(RECIPES)
+    updated = [dict(r) for r in RECIPES[:3]]
+    updated[0]['ingredients'] = 'Merluza, Perejil'
+    assert index.sync(updated) == 2
+    assert len(index) == 3
+    assert index.excluded_ids(get_exclusion_matcher({'allergies': 'limon'})) == frozenset()
@@ -0,0 +1,101 @@
+"""
+Unit tests for the SQLite-backed background job queue.
+"""
+import time
+
+import pytest
+
+from services import job_queue as jq
+from services.job_queue import JobQueue
+
+@pytest.fixture
+def queue(tmp_path):
+    q = JobQueue(db_path=str(tmp_path / 'jobs.db'), workers=0)
+    q.register('echo', lambda payload, user_id: {'echo': payload, 'user': user_id})
+    q.register('boom', lambda payload, user_id: 1 / 0)
+    return q
+
+def test_submit_and_run_job(queue):
+    """Jobs are persisted as queued and store the handler result."""
+    job = queue.submit('echo', {'x': 1}, user_id='u1')
+    assert job['status'] == 'queued'
+    assert queue.run_next()
+    done = queue.get(job['id'], user_id='u1')
+    assert done['status'] == 'succeeded'
+    assert done['result'] == {'echo': {'x': 1}, 'user': 'u1'}
+    assert done['attempts'] == 1
+    assert not queue.run_next()
+
+def test_failed_job_records_error(queue):
+    """Handler exceptions mark the job as failed."""
+    job = queue.submit('boom', user_id='u1')
+    queue.run_next()
+    failed = queue.get(job['id'])
+    assert failed['status'] == 'failed'
+    assert 'division' in failed['error']
+
+def test_jobs_are_private_and_types_validated(queue):
+    """Other users cannot see a job; unknown types are rejected."""
+    job = queue.submit('echo', user_id='u1')
+    assert queue.get(job['id'], user_id='u2') is None
+    with pytest.raises(ValueError):
+        queue.submit('unknown')
+
+def test_jobs_survive_restart_and_stale_runs_are_requeued(queue, monkeypatch):
+    """A job left running by a dead process is picked up again by a new queue."""
+    job = queue.submit('echo', user_id='u1')
+    queue._claim()  # claimed but never finished
+
+    restarted = JobQueue(db_path=queue.db_path, workers=0)
+    restarted.register('echo', lambda payload, user_id: {'ok': True})
+    assert restarted.recover() == 0
+    monkeypatch.setattr(jq, 'JOB_STALE_SECONDS', -1)
+    assert restarted.recover() == 1
+    assert restarted.run_next()
+    assert restarted.get(job['id'])['status'] == 'succeeded'
+    assert restarted.get(job['id'])['attempts'] == 2
+
+def test_worker_threads_process_jobs(tmp_path):
+    """Started workers pick up submitted jobs without polling delay."""
+    q = JobQueue(db_path=str(tmp_path / 'jobs.db'), workers=1, poll_seconds=5)
+    q.register('echo', lambda payload, user_id: payload)
+    try:
+        job = q.submit('echo', {'n': 3})
+        deadline = time.monotonic() + 5
+        while q.get(job['id'])['status'] != 'succeeded' and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert q.get(job['id'])['result'] == {'n': 3}
+    finally:
+        q.stop()
+
+def test_queue_without_storage_is_disabled():
+    """Without JOB_QUEUE_DB nothing is queued to a per-instance temp file."""
+    q = JobQueue(db_path=None, workers=1)
+    q.register('echo', lambda payload, user_id: payload)
+    assert not q.enabled
+    with pytest.raises(RuntimeError):
+        q.submit('echo')
+    assert q.get('missing') is None
+    q.start()
+    assert q._threads == []
+
+def test_workers_recover_stale_jobs_periodically(tmp_path, monkeypatch):
+    """A running worker requeues jobs orphaned after it started, not only at startup."""
+    q = JobQueue(db_path=str(tmp_path / 'jobs.db'), workers=1, poll_seconds=0.05)
+    q.register('echo', lambda payload, user_id: payload)
+    try:
+        job = q.submit('echo', {'n': 1})
+        deadline = time.monotonic() + 5
+        while q.get(job['id'])['status'] != 'succeeded' and time.monotonic() < deadline:
+            time.sleep(0.01)
+        with q._connect() as conn:
+            # Simulate a claim by a process that died afterwards
+            conn.execute("UPDATE jobs SET status = 'running', finished_at = NULL WHERE id = ?", (job['id'],))
+        monkeypatch.setattr(jq, 'JOB_STALE_SECONDS', -1)
+        monkeypatch.setattr(jq, 'JOB_RECOVER_SECONDS', 0)
+        deadline = time.monotonic() + 5
+        while q.get(job['id'])['attempts'] < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert q.get(job['id'])['attempts'] == 2
+    finally:
+        q.stop()
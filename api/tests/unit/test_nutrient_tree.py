@@ -0,0 +1,58 @@
+"""
+Unit tests for the nutrient-space KD-tree used by swap suggestions.
+"""
+import math
+import random
+import time
+
+from utils.nutrient_tree import NutrientNeighbors, nutrient_values
+
+def make_recipes(n, seed=7):
+    rng = random.Random(seed)
+    return [{
+        'id': i,
+        'meal_type': rng.choice(['desayuno', 'comida', 'cena']),
+        'calories': rng.uniform(150, 900),
+        'protein': rng.uniform(2, 60),
+        'carbs': rng.uniform(5, 120),
+        'fat': rng.uniform(1, 45),
+    } for i in range(n)]
+
+def brute_force(neighbors, recipes, meal_type, values, k, exclude):
+    items, scales, _ = neighbors._trees[meal_type]
+    target = [v / s for v, s in zip(values, scales)]
+    scored = []
+    for recipe in items:
+        if recipe['id'] in exclude:
+            continue
+        point = [v / s for v, s in zip(nutrient_values(recipe), scales)]
+        scored.append((math.dist(point, target), recipe['id']))
+    return [rid for _, rid in sorted(scored)[:k]]
+
+def test_nearest_matches_brute_force():
+    """KD-tree results equal an exhaustive scan, with exclusions applied."""
+    recipes = make_recipes(600)
+    neighbors = NutrientNeighbors(recipes)
+    rng = random.Random(1)
+    for _ in range(50):
+        query = rng.choice(recipes)
+        exclude = {query['id']} | {r['id'] for r in rng.sample(recipes, 40)}
+        result = neighbors.nearest(query['meal_type'], nutrient_values(query), k=5, exclude_ids=exclude)
+        assert [r['id'] for _, r in result] == brute_force(
+            neighbors, recipes, query['meal_type'], nutrient_values(query), 5, exclude)
+
+def test_nearest_handles_unknown_meal_type_and_small_buckets():
+    """Unknown meal types return nothing; k larger than the bucket returns all."""
+    neighbors = NutrientNeighbors([{'id': 1, 'meal_type': 'cena', 'calories': 300}])
+    assert neighbors.nearest('merienda', (300, 0, 0, 0)) == []
+    assert [r['id'] for _, r in neighbors.nearest('cena', (0, 0, 0, 0), k=5)] == [1]
+
+def test_query_is_sub_millisecond():
+    """A single lookup over a catalog-sized bucket stays well under a millisecond."""
+    recipes = make_recipes(600)
+    neighbors = NutrientNeighbors(recipes)
+    query = recipes[0]
+    started = time.perf_counter()
+    for _ in range(100):
+        neighbors.nearest(query['meal_type'], nutrient_values(query), k=5, exclude_ids={query['id']})
+    assert (time.perf_counter() - started) / 100 < 0.001
@@ -0,0 +1,53 @@
+"""
+Unit tests for the columnar nutrition store.
+"""
+import random
+
+import pytest
+
+from utils.nutrition_store import NutritionStore
+
+RECIPES = [
+    {'id': 'a', 'meal_type': 'desayuno', 'calories': 420, 'protein': 30, 'carbs': 40, 'fat': 12},
+    {'id': 'b', 'meal_type': 'desayuno', 'calories': 310, 'protein_g': '26', 'carbs_g': 35, 'fat_g': 9},
+    {'id': 'c', 'meal_type': 'cena', 'calories': 350, 'protein': 40, 'carbs': 10, 'fat': 15},
+    {'id': 'd', 'meal_type': 'desayuno', 'calories': 450, 'protein': 12, 'carbs': 70, 'fat': 10},
+    {'id': 'e', 'meal_type': 'desayuno', 'calories': None, 'protein': None},
+]
+
+def ids(recipes):
+    return [r['id'] for r in recipes]
+
+def test_range_query_with_protein_floor():
+    """desayuno 300-450 kcal with >= 25 g protein, in catalog order."""
+    store = NutritionStore(RECIPES)
+    assert ids(store.select('desayuno', 300, 450, min_protein=25)) == ['a', 'b']
+    assert ids(store.select('desayuno', 300, 450)) == ['a', 'b', 'd']
+    assert ids(store.select(None, max_calories=0)) == ['e']
+    assert store.select('merienda', 0, 1000) == []
+
+def test_unknown_bound_is_rejected():
+    """Only min_/max_ bounds on known columns are accepted."""
+    with pytest.raises(ValueError):
+        NutritionStore(RECIPES).query('desayuno', min_sugar=3)
+
+def test_protein_density_ranking():
+    """Recipes are ranked by grams of protein per 100 kcal."""
+    store = NutritionStore(RECIPES)
+    assert ids(store.top_protein_density(store.query(), 3)) == ['c', 'b', 'a']
+
+def test_matches_a_dict_scan_on_random_catalogs():
+    """searchsorted + masks return exactly what a per-recipe scan would."""
+    rng = random.Random(7)
+    recipes = [{'id': i, 'meal_type': rng.choice(['desayuno', 'comida', 'cena']),
+                'calories': rng.randint(100, 900), 'protein': rng.randint(0, 60), 'fat': rng.randint(0, 40)}
+               for i in range(500)]
+    store = NutritionStore(recipes)
+    for _ in range(50):
+        meal = rng.choice(['desayuno', 'comida', 'cena'])
+        low = rng.randint(100, 700)
+        high = low + rng.randint(0, 300)
+        protein = rng.randint(0, 40)
+        expected = [r for r in recipes if r['meal_type'] == meal and low <= r['calories'] <= high
+                    and r['protein'] >= protein and r['fat'] <= 30]
+        assert store.select(meal, low, high, min_protein=protein, max_fat=30) == expected
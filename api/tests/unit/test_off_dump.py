@@ -0,0 +1,65 @@
+"""
+Unit tests for the offline Open Food Facts dump importer and barcode index.
+"""
+import gzip
+import os
+import shutil
+
+from services.off_dump import import_dump, OfflineProductStore, open_offline_store, SPAIN_TAG, SUPERMARKETS
+
+FIXTURES = os.path.join(os.path.dirname(__file__), '..', 'fixtures')
+JSONL_DUMP = os.path.join(FIXTURES, 'off_sample.jsonl')
+CSV_DUMP = os.path.join(FIXTURES, 'off_sample.csv')
+
+def test_import_keeps_search_fields_and_looks_up_barcodes(tmp_path):
+    """Every product with a barcode is indexed with only the API's fields."""
+    stats = import_dump(JSONL_DUMP, str(tmp_path))
+    assert stats['indexed'] == 4
+    assert stats['invalid'] == 1
+
+    store = OfflineProductStore(str(tmp_path))
+    assert len(store) == 4
+    nutella = store.get('3017620422003')
+    assert nutella['brands'] == 'Ferrero'
+    assert nutella['nutriments'] == {'energy-kcal_100g': 539, 'sugars_100g': 56.3}
+    assert 'countries_tags' not in nutella
+    assert store.get('0000000000000') is None
+    assert store.get('') is None
+
+def test_duplicate_barcodes_keep_the_last_entry(tmp_path):
+    """A later line in the dump replaces an earlier one with the same code."""
+    import_dump(JSONL_DUMP, str(tmp_path))
+    milk = OfflineProductStore(str(tmp_path)).get(' 8480000123456 ')
+    assert milk['product_name'] == 'Leche entera (reformulada)'
+    assert 'ecoscore_data' not in milk
+
+def test_spain_and_supermarket_filters(tmp_path):
+    """Products sold in Spain or in one of our supermarkets are kept."""
+    stats = import_dump(JSONL_DUMP, str(tmp_path), countries=[SPAIN_TAG], stores=SUPERMARKETS)
+    store = OfflineProductStore(str(tmp_path))
+    assert stats['filtered'] == 1
+    assert store.get('0041196910759') is None
+    assert store.get('20123456')['brands'] == 'Milbona'
+    assert '3017620422003' in store
+
+def test_gzipped_tsv_dump(tmp_path):
+    """The official TSV export, gzipped, is streamed and its nutriment columns regrouped."""
+    source = str(tmp_path / 'dump.csv.gz')
+    with open(CSV_DUMP, 'rb') as f, gzip.open(source, 'wb') as out:
+        shutil.copyfileobj(f, out)
+    import_dump(source, str(tmp_path / 'out'), countries=[SPAIN_TAG])
+
+    store = OfflineProductStore(str(tmp_path / 'out'))
+    assert len(store) == 1
+    oil = store.get('8410000000017')
+    assert oil['nutriments'] == {'energy-kcal_100g': 884.0, 'proteins_100g': 0.0, 'fat_100g': 100.0}
+
+def test_missing_or_empty_store(tmp_path):
+    """No dump configured means no offline store; an empty import still opens."""
+    assert open_offline_store(None) is None
+    assert open_offline_store(str(tmp_path / 'missing')) is None
+
+    import_dump(JSONL_DUMP, str(tmp_path), countries=['en:japan'])
+    store = open_offline_store(str(tmp_path))
+    assert len(store) == 0
+    assert store.get('3017620422003') is None
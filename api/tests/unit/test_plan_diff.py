@@ -0,0 +1,50 @@
+"""
+Unit tests for the incremental weekly plan diff.
+"""
+from utils.plan_diff import diff_plan
+
+def entry(day, meal_type, recipe_id, **extra):
+    return {'day_of_week': day, 'meal_type': meal_type, 'selected_recipe_id': recipe_id, **extra}
+
+def test_unchanged_and_manual_rows_are_kept():
+    """Same recipe or a manual swap means no write for that slot."""
+    existing = [
+        entry(0, 'desayuno', 'a', id='r1'),
+        entry(0, 'comida', 'b', id='r2', is_manual=True),
+        entry(1, 'desayuno', 'c', id='r3'),
+    ]
+    new = [entry(0, 'desayuno', 'a'), entry(0, 'comida', 'x'), entry(1, 'desayuno', 'y')]
+    diff = diff_plan(existing, new)
+    assert [r['id'] for r in diff['kept']] == ['r1', 'r2']
+    assert diff['upserts'] == [{**new[2], 'id': 'r3'}]
+    assert diff['delete_ids'] == []
+    assert [r['selected_recipe_id'] for r in diff['plan']] == ['a', 'b', 'y']
+
+def test_still_valid_rows_are_kept():
+    """Rows whose recipe still satisfies the constraints are not rewritten."""
+    existing = [entry(0, 'cena', 'ok', id='r1'), entry(1, 'cena', 'nuez', id='r2')]
+    new = [entry(0, 'cena', 'n1'), entry(1, 'cena', 'n2')]
+    diff = diff_plan(existing, new, lambda row: row['selected_recipe_id'] != 'nuez')
+    assert [r['id'] for r in diff['kept']] == ['r1']
+    assert [u['id'] for u in diff['upserts']] == ['r2']
+
+def test_new_slots_are_inserted_and_stale_slots_deleted():
+    """Slots only in the new plan are inserted; removed slots and duplicates are deleted."""
+    existing = [
+        entry(0, 'merienda', 'a', id='r1'),
+        entry(0, 'cena', 'b', id='r2'),
+        entry(0, 'cena', 'c', id='r3'),
+    ]
+    new = [entry(0, 'cena', 'b'), entry(0, 'comida', 'd')]
+    diff = diff_plan(existing, new)
+    assert diff['upserts'] == [new[1]]
+    assert sorted(diff['delete_ids']) == ['r1', 'r3']
+
+def test_manual_rows_of_removed_slots_are_kept():
+    """A manual meal in a slot the new plan drops stays in the plan, as in the RPC."""
+    existing = [entry(0, 'merienda', 'a', id='r1', is_manual=True), entry(1, 'merienda', 'b', id='r2')]
+    new = [entry(0, 'cena', 'c')]
+    diff = diff_plan(existing, new)
+    assert diff['delete_ids'] == ['r2']
+    assert [r['id'] for r in diff['kept']] == ['r1']
+    assert [r['selected_recipe_id'] for r in diff['plan']] == ['c', 'a']
@@ -0,0 +1,54 @@
+"""
+Unit tests for seeded plan generation and the plan memo cache.
+"""
+from utils.plan_memo import PlanMemo, plan_memo_key, plan_seed
+
+def test_plan_seed_is_stable_per_user_and_week():
+    """The same (user, year, week) always yields the same seed."""
+    assert plan_seed('u1', 2026, 42) == plan_seed('u1', 2026, 42)
+    assert plan_seed('u1', 2026, 42) != plan_seed('u1', 2026, 43)
+    assert plan_seed('u1', 2026, 42) != plan_seed('u2', 2026, 42)
+
+def test_memo_key_ignores_argument_order():
+    """Keys hash the inputs, not their order."""
+    assert plan_memo_key(a=1, b='x') == plan_memo_key(b='x', a=1)
+    assert plan_memo_key(a=1, b='x') != plan_memo_key(a=2, b='x')
+
+def test_memo_evicts_least_recently_used_and_copies_values():
+    """Old entries are evicted and callers cannot mutate cached values."""
+    memo = PlanMemo(max_size=2)
+    memo.put('a', {'v': 1})
+    memo.put('b', {'v': 2})
+    memo.get('a')['v'] = 99
+    memo.put('c', {'v': 3})
+    assert memo.get('a') == {'v': 1}
+    assert memo.get('b') is None
+    assert len(memo) == 2
+
+def test_seeded_generation_is_reproducible_and_memoized(mock_supabase):
+    """Same inputs give the same plan; the second call skips recomputation."""
+    import app
+    app.plan_memo.clear()
+    mock_supabase.table.return_value.select.return_value.execute.return_value.data = [
+        {'id': f'{meal}-{i}', 'meal_type': meal, 'calories': cal + i * 10, 'ingredients': ''}
+        for meal, cal in [('desayuno', 450), ('comida', 650), ('merienda', 250), ('cena', 450)]
+        for i in range(10)
+    ]
+    profile = {'meals_per_day': 4}
+
+    first = app.generate_weekly_plan(mock_supabase, 'user-1', profile, 2000, deterministic=True)
+    second = app.generate_weekly_plan(mock_supabase, 'user-1', profile, 2000, deterministic=True)
+    assert not first['cached'] and second['cached']
+    assert first['seed'] == second['seed']
+    assert first['days'] == second['days']
+
+    app.plan_memo.clear()
+    recomputed = app.generate_weekly_plan(mock_supabase, 'user-1', profile, 2000, seed=first['seed'])
+    assert not recomputed['cached']
+    assert recomputed['days'] == first['days']
+
+    optimized = []
+    for _ in range(2):
+        app.plan_memo.clear()
+        optimized.append(app.generate_weekly_plan(mock_supabase, 'user-1', profile, 2000, mode='optimize', seed=7))
+    assert optimized[0]['days'] == optimized[1]['days']
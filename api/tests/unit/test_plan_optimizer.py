@@ -0,0 +1,58 @@
+"""
+Unit tests for the macro-targeting plan optimizer.
+"""
+import random
+import time
+
+from utils.plan_optimizer import optimize_week, nutrient_matrix
+
+def recipe(rid, calories, protein, carbs, fat):
+    return {'id': rid, 'calories': calories, 'protein': protein, 'carbs': carbs, 'fat': fat}
+
+CANDIDATES = {
+    'desayuno': [recipe('d-carbs', 500, 10, 100, 5), recipe('d-prot', 500, 50, 40, 13)],
+    'comida': [recipe('c-fat', 800, 20, 40, 62), recipe('c-prot', 800, 80, 60, 27)],
+    'cena': [recipe('n-prot', 700, 70, 50, 24), recipe('n-carbs', 700, 15, 140, 8)],
+}
+MEAL_CALORIES = {'desayuno': 500, 'comida': 800, 'cena': 700}
+MACROS = {'calories': 2000, 'protein': 200, 'carbs': 150, 'fat': 64}
+
+def test_nutrient_matrix_handles_missing_values():
+    """Missing or invalid nutrients count as zero."""
+    matrix = nutrient_matrix([{'calories': '120', 'protein': None, 'fat': 'x'}])
+    assert matrix.tolist() == [[120.0, 0.0, 0.0, 0.0]]
+
+def test_optimizer_picks_combination_closest_to_macros():
+    """The high-protein combination matches a high-protein target."""
+    week = optimize_week(CANDIDATES, MEAL_CALORIES, MACROS, days=1, rng=random.Random(1))
+    assert {meal: r['id'] for meal, r in week[0].items()} == {
+        'desayuno': 'd-prot', 'comida': 'c-prot', 'cena': 'n-prot'
+    }
+
+def test_zero_budget_still_returns_full_week():
+    """An exhausted budget returns the greedy solution for every day."""
+    week = optimize_week(CANDIDATES, MEAL_CALORIES, MACROS, days=7, budget_ms=0)
+    assert len(week) == 7
+    assert all(set(day) == set(MEAL_CALORIES) for day in week)
+
+def test_meals_without_candidates_are_skipped():
+    """Meal types with no candidates are left out of the day."""
+    candidates = dict(CANDIDATES, cena=[])
+    week = optimize_week(candidates, MEAL_CALORIES, MACROS, days=2)
+    assert all(set(day) == {'desayuno', 'comida'} for day in week)
+
+def test_restart_cap_is_reproducible_and_keeps_the_budget():
+    """Capped runs repeat with the same seed and still stop at the time budget."""
+    rng = random.Random(3)
+    candidates = {meal: [recipe(f"{meal}-{i}", rng.randint(200, 900), rng.randint(5, 80),
+                                rng.randint(10, 120), rng.randint(3, 40)) for i in range(40)]
+                  for meal in MEAL_CALORIES}
+    runs = [optimize_week(candidates, MEAL_CALORIES, MACROS, rng=random.Random(7), max_restarts=8)
+            for _ in range(2)]
+    assert [[r['id'] for r in day.values()] for day in runs[0]] == \
+        [[r['id'] for r in day.values()] for day in runs[1]]
+
+    started = time.monotonic()
+    week = optimize_week(candidates, MEAL_CALORIES, MACROS, budget_ms=0, rng=random.Random(7), max_restarts=8)
+    assert len(week) == 7
+    assert time.monotonic() - started < 0.5
@@ -0,0 +1,79 @@
+"""
+Unit tests for the persistent Open Food Facts product cache.
+"""
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from services.product_cache import ProductCache, KIND_PRODUCT, KIND_SEARCH, normalize_barcode, search_key
+
+@pytest.fixture
+def cache(tmp_path):
+    return ProductCache(db_path=str(tmp_path / 'off.db'))
+
+def test_fetches_once_then_serves_from_cache(cache):
+    """A second lookup of the same barcode does not call Open Food Facts."""
+    fetch = MagicMock(return_value={'product_name': 'Leche'})
+    assert cache.get_or_fetch(KIND_PRODUCT, '123', fetch, ttl=60) == {'product_name': 'Leche'}
+    assert cache.get_or_fetch(KIND_PRODUCT, '123', fetch, ttl=60) == {'product_name': 'Leche'}
+    fetch.assert_called_once()
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_unknown_products_are_negatively_cached(cache):
+    """A barcode OFF does not know is remembered as None."""
+    fetch = MagicMock(return_value=None)
+    assert cache.get_or_fetch(KIND_PRODUCT, '999', fetch, ttl=60, negative_ttl=60) is None
+    assert cache.get_or_fetch(KIND_PRODUCT, '999', fetch, ttl=60, negative_ttl=60) is None
+    fetch.assert_called_once()
+
+def test_expired_entries_are_refetched(cache):
+    """Entries past their TTL count as misses and purge() removes them."""
+    cache.put(KIND_SEARCH, 'leche|', [{'code': '1'}], ttl=-1)
+    fetch = MagicMock(return_value=[{'code': '2'}])
+    assert cache.get_or_fetch(KIND_SEARCH, 'leche|', fetch, ttl=60) == [{'code': '2'}]
+    fetch.assert_called_once()
+
+    cache.put(KIND_PRODUCT, 'old', {'x': 1}, ttl=-1)
+    assert cache.purge() == 1
+
+def test_entries_survive_a_new_instance(tmp_path):
+    """The SQLite file keeps entries across processes and restarts."""
+    path = str(tmp_path / 'off.db')
+    ProductCache(db_path=path).put(KIND_PRODUCT, '123', {'product_name': 'Pan'}, ttl=60)
+    ProductCache(db_path=path).put(KIND_PRODUCT, '404', None, ttl=60)
+
+    fresh = ProductCache(db_path=path)
+    fetch = MagicMock()
+    assert fresh.get_or_fetch(KIND_PRODUCT, '123', fetch, ttl=60) == {'product_name': 'Pan'}
+    assert fresh.get_or_fetch(KIND_PRODUCT, '404', fetch, ttl=60) is None
+    fetch.assert_not_called()
+
+def test_fetch_errors_are_not_cached(cache):
+    """Timeouts and network errors propagate and the next call retries."""
+    fetch = MagicMock(side_effect=[TimeoutError('timeout'), {'product_name': 'Arroz'}])
+    with pytest.raises(TimeoutError):
+        cache.get_or_fetch(KIND_PRODUCT, '123', fetch, ttl=60)
+    assert cache.get_or_fetch(KIND_PRODUCT, '123', fetch, ttl=60) == {'product_name': 'Arroz'}
+    assert fetch.call_count == 2
+
+def test_keys_are_normalized():
+    """Whitespace and case do not split cache entries."""
+    assert normalize_barcode(' 84 1234 ') == '841234'
+    assert search_key('  Leche   ENTERA ', 'mercadona') == search_key('leche entera', 'mercadona')
+    assert search_key('leche', None) == 'leche|'
+
+def test_concurrent_misses_share_one_fetch(cache):
+    """Simultaneous lookups of the same barcode wait on a single OFF call."""
+    fetch = MagicMock(side_effect=lambda: time.sleep(0.1) or {'product_name': 'Leche'})
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        cache.get_or_fetch(KIND_PRODUCT, '123', fetch, ttl=60))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [{'product_name': 'Leche'}] * 8
+    fetch.assert_called_once()
+    assert cache.misses == 1
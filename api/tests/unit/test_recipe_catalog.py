@@ -0,0 +1,62 @@
+"""
+Unit tests for the shared master_recipes catalog cache.
+"""
+from unittest.mock import MagicMock
+
+from services.recipe_catalog import RecipeCatalog, get_recipe_catalog, bump_catalog_version
+
+RECIPES = [
+    {'id': 1, 'name': 'Tortilla', 'meal_type': 'cena', 'calories': 280},
+    {'id': 2, 'name': 'Avena', 'meal_type': 'desayuno', 'calories': 310},
+    {'id': 3, 'name': 'Merluza', 'meal_type': 'cena', 'calories': 320},
+]
+
+def make_client(remote_version=None):
+    client = MagicMock()
+    client.table.return_value.select.return_value.execute.return_value.data = RECIPES
+    client.rpc.return_value.execute.return_value.data = remote_version
+    return client
+
+def reads(client):
+    return client.table.return_value.select.return_value.execute.call_count
+
+def test_catalog_reads_table_once_within_ttl():
+    """Repeated lookups are served from memory."""
+    client = make_client()
+    catalog = RecipeCatalog(client, ttl=60)
+    assert [r['id'] for r in catalog.by_meal_type('cena')] == [1, 3]
+    assert catalog.get(2)['name'] == 'Avena'
+    assert [r['id'] for r in catalog.get_many([3, 99, 1])] == [3, 1]
+    assert reads(client) == 1
+
+def test_unchanged_remote_version_skips_reload():
+    """After the TTL expires, an unchanged version only extends the TTL."""
+    client = make_client(remote_version=7)
+    catalog = RecipeCatalog(client, ttl=0)
+    catalog.all()
+    catalog.all()
+    assert reads(client) == 1
+    client.rpc.return_value.execute.return_value.data = 8
+    catalog.all()
+    assert reads(client) == 2
+
+def test_bump_forces_reload():
+    """The bump hook invalidates every shared catalog."""
+    client = make_client(remote_version=1)
+    catalog = get_recipe_catalog(client)
+    assert get_recipe_catalog(client) is catalog
+    catalog.all()
+    bump_catalog_version(client)
+    client.rpc.assert_any_call('bump_catalog_version')
+    client.rpc.return_value.execute.return_value.data = 2
+    catalog.all()
+    assert reads(client) == 2
+
+def test_version_changes_with_content():
+    """The catalog version is a content fingerprint."""
+    client = make_client()
+    catalog = RecipeCatalog(client, ttl=60)
+    version = catalog.ensure_version()
+    client.table.return_value.select.return_value.execute.return_value.data = RECIPES[:2]
+    catalog.bump()
+    assert catalog.ensure_version() != version
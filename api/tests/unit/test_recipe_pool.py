@@ -0,0 +1,61 @@
+"""
+Unit tests for the in-memory recipe pool used by plan generation.
+"""
+from utils.recipe_pool import RecipePool
+
+RECIPES = [
+    {'id': 'a', 'meal_type': 'desayuno', 'calories': 400, 'ingredients': 'Avena, Leche'},
+    {'id': 'b', 'meal_type': 'desayuno', 'calories': 250, 'ingredients': 'Huevo, Pan'},
+    {'id': 'c', 'meal_type': 'cena', 'calories': 300, 'ingredients': 'Merluza'},
+    {'id': 'd', 'meal_type': 'desayuno', 'calories': 320, 'ingredients': 'Yogur, Nueces'},
+    {'id': 'e', 'meal_type': 'desayuno', 'calories': None, 'ingredients': ''},
+]
+
+def test_candidates_filters_by_meal_type_and_calories():
+    """Only recipes of the meal type inside the window are returned."""
+    pool = RecipePool(RECIPES)
+    ids = [r['id'] for r in pool.candidates('desayuno', 240, 350)]
+    assert ids == ['b', 'd']
+
+def test_candidates_keep_original_order():
+    """Candidates come back in load order, not calorie order."""
+    pool = RecipePool(RECIPES)
+    ids = [r['id'] for r in pool.candidates('desayuno', 0, 1000)]
+    assert ids == ['a', 'b', 'd', 'e']
+
+def test_candidates_unknown_meal_type():
+    """Unknown meal types produce an empty list."""
+    pool = RecipePool(RECIPES)
+    assert pool.candidates('merienda', 0, 1000) == []
+    assert len(pool) == 5
+
+def test_generate_weekly_plan_reads_recipes_once(mock_supabase):
+    """A full week is generated with a single master_recipes read."""
+    import app
+    recipes_table = mock_supabase.table.return_value
+    recipes_table.select.return_value.execute.return_value.data = [
+        {'id': 'x', 'meal_type': meal, 'calories': cal, 'ingredients': ''}
+        for meal, cal in [('desayuno', 500), ('comida', 700), ('merienda', 300), ('cena', 500)]
+    ]
+    plan = app.generate_weekly_plan(mock_supabase, 'user-1', {'meals_per_day': 4}, 2000)
+    assert recipes_table.select.return_value.execute.call_count == 1
+    assert recipes_table.select.return_value.eq.call_count == 0
+    assert all(len(meals) == 4 for meals in plan['days'].values())
+
+def test_plans_never_contain_excluded_ingredients(mock_supabase):
+    """Allergens are excluded even when that leaves a meal without candidates."""
+    import app
+    recipes_table = mock_supabase.table.return_value
+    recipes_table.select.return_value.execute.return_value.data = [
+        {'id': 'lemon-1', 'meal_type': 'desayuno', 'calories': 500, 'ingredients': 'Yogur, Limón'},
+        {'id': 'lemon-2', 'meal_type': 'desayuno', 'calories': 480, 'ingredients': [{'name': 'Zumo de limón'}]},
+        {'id': 'lemon-3', 'meal_type': 'comida', 'calories': 700, 'ingredients': 'Merluza, limon'},
+        {'id': 'safe-1', 'meal_type': 'comida', 'calories': 690, 'ingredients': 'Arroz, Pollo'},
+        {'id': 'safe-2', 'meal_type': 'cena', 'calories': 500, 'ingredients': 'Tortilla'},
+    ]
+    profile = {'meals_per_day': 3, 'allergies': 'Limón'}
+    for mode in ('random', 'optimize'):
+        plan = app.generate_weekly_plan(mock_supabase, 'user-1', profile, 1700, mode=mode, seed=3)
+        chosen = {m['selected_recipe_id'] for meals in plan['days'].values() for m in meals}
+        assert chosen == {'safe-1', 'safe-2'}
+        assert all(m['meal_type'] != 'desayuno' for meals in plan['days'].values() for m in meals)
@@ -0,0 +1,60 @@
+"""
+Unit tests for single-flight request coalescing.
+"""
+import threading
+import time
+
+from utils.single_flight import SingleFlight
+
+def run_concurrently(n, target):
+    results, errors = [], []
+    def worker():
+        try:
+            results.append(target())
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=worker) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, errors
+
+def test_identical_calls_share_one_execution():
+    """Concurrent calls with the same key run fn once and share its result."""
+    flights = SingleFlight()
+    calls = []
+    def fetch():
+        calls.append(1)
+        time.sleep(0.1)
+        return {'code': '123'}
+
+    results, errors = run_concurrently(5, lambda: flights.do('123', fetch))
+    assert results == [{'code': '123'}] * 5
+    assert not errors
+    assert len(calls) == 1
+    assert flights.shared == 4
+    assert flights.in_flight() == 0
+
+def test_errors_are_shared_and_not_remembered():
+    """Waiters see the leader's exception; the next call runs again."""
+    flights = SingleFlight()
+    def fail():
+        time.sleep(0.1)
+        raise TimeoutError('OFF timeout')
+
+    results, errors = run_concurrently(3, lambda: flights.do('q', fail))
+    assert not results
+    assert len(errors) == 3 and all(isinstance(e, TimeoutError) for e in errors)
+    assert flights.do('q', lambda: 'ok') == 'ok'
+
+def test_different_keys_do_not_wait_on_each_other():
+    """Only identical keys are coalesced."""
+    flights = SingleFlight()
+    release = threading.Event()
+    slow = threading.Thread(target=lambda: flights.do('slow', lambda: release.wait(5)))
+    slow.start()
+    assert flights.do('fast', lambda: 1) == 1
+    release.set()
+    slow.join()
+    assert flights.shared == 0
@@ -0,0 +1,51 @@
+"""
+Unit tests for the in-memory typeahead index.
+"""
+import time
+
+from utils.suggest_index import SuggestIndex, catalog_suggestions
+
+RECIPES = [
+    {'id': 1, 'name': 'Pollo al horno', 'ingredients': 'Pollo, Patatas'},
+    {'id': 2, 'name': 'Ensalada de pollo', 'ingredients': [{'name': 'Pollo'}, {'name': 'Lechuga'}]},
+    {'id': 3, 'name': 'Merluza al limón', 'ingredients': 'Merluza, Limón'},
+]
+
+def test_prefix_matches_any_content_word():
+    """Prefixes match the start of the name or of any later non-stopword."""
+    index = catalog_suggestions(RECIPES)
+    texts = [s['text'] for s in index.suggest('pol', k=5)]
+    assert texts == ['Pollo al horno', 'Ensalada de pollo', 'Pollo']
+    assert [s['text'] for s in index.suggest('LIMO')] == ['Merluza al limón', 'Limón']
+    assert index.suggest('de') == []
+
+def test_types_filter_and_extra_fields():
+    """Results can be restricted by type and keep their extra fields."""
+    index = catalog_suggestions(RECIPES)
+    result = index.suggest('pollo', types=['recipe'])
+    assert [(s['type'], s['id']) for s in result] == [('recipe', 1), ('recipe', 2)]
+
+def test_bounded_index_evicts_oldest_entries():
+    """Recently seen products are capped; re-adding refreshes an entry."""
+    index = SuggestIndex(max_entries=2)
+    index.add('Leche entera', 'product', barcode='1')
+    index.add('Leche desnatada', 'product', barcode='2')
+    index.add('Leche entera', 'product', barcode='1')
+    index.add('Lentejas cocidas', 'product', barcode='3')
+    assert len(index) == 2
+    assert {s['barcode'] for s in index.suggest('le', k=5)} == {'1', '3'}
+
+def test_suggest_is_fast_on_large_indexes():
+    """A lookup over ~20k entries stays in the tens of microseconds."""
+    index = SuggestIndex({'text': f'producto {i:05d}', 'type': 'product'} for i in range(20000))
+    started = time.perf_counter()
+    for _ in range(100):
+        index.suggest('producto 1234', k=8)
+    assert (time.perf_counter() - started) / 100 < 0.001
+
+def test_short_prefix_results_are_invalidated_on_add():
+    """Memoized short-prefix results never hide a newly added entry."""
+    index = SuggestIndex({'text': f'producto {i:03d}', 'type': 'product'} for i in range(200))
+    assert index.suggest('p', k=1)[0]['text'] == 'producto 000'
+    index.add('Pan', 'product', weight=5.0)
+    assert index.suggest('p', k=1)[0]['text'] == 'Pan'
@@ -0,0 +1,52 @@
+"""
+Unit tests for Spanish full-text recipe search.
+"""
+from unittest.mock import MagicMock
+
+from services.recipe_search import search_recipes
+from utils.text_search import BM25Index, fts5_query, spanish_stem, tokenize
+
+RECIPES = [
+    {'id': 1, 'name': 'Merluza al limón', 'meal_type': 'dinner', 'ingredients': 'Merluza, Limón'},
+    {'id': 2, 'name': 'Ensalada de pollo', 'meal_type': 'lunch',
+     'description': 'Con limones y nueces', 'ingredients': [{'name': 'Pollo'}, {'name': 'Nueces'}]},
+    {'id': 3, 'name': 'Pollo al horno con patatas', 'meal_type': 'dinner', 'ingredients': 'Pollo, Patatas'},
+    {'id': 4, 'name': 'Yogur con fruta', 'meal_type': 'snack', 'tags': ['vegetariano', 'sin gluten']},
+]
+
+def test_stemming_and_unaccenting():
+    """Plurals, gender vowels and accents collapse to the same term."""
+    assert spanish_stem('limones') == spanish_stem('limon') == 'limon'
+    assert spanish_stem('nueces') == 'nuez'
+    assert tokenize('Limón con Tomates') == ['limon', 'tomat']
+    assert fts5_query('pollo con pat') == '"poll" AND "pat"*'
+    assert fts5_query('de la') == ''
+
+def test_bm25_ranks_name_matches_first():
+    """A match in the name outranks the same word in the description."""
+    index = BM25Index(RECIPES)
+    assert [r['id'] for _, r in index.search('limon')] == [1, 2]
+    assert [r['id'] for _, r in index.search('pollo patatas')] == [3]
+
+def test_last_term_is_a_prefix_and_filters_apply():
+    """Partial last words match; meal_type narrows the results."""
+    index = BM25Index(RECIPES)
+    assert {r['id'] for _, r in index.search('pol')} == {2, 3}
+    assert [r['id'] for _, r in index.search('pol', meal_type='dinner')] == [3]
+    assert [r['id'] for _, r in index.search('sin glu')] == [4]
+    assert index.search('') == []
+
+def test_search_falls_back_to_memory_when_rpc_fails():
+    """Without the search_recipes migration the in-memory index answers."""
+    client = MagicMock()
+    client.table.return_value.select.return_value.execute.return_value.data = RECIPES
+    client.rpc.side_effect = lambda name, *args: (_ for _ in ()).throw(RuntimeError('no rpc')) \
+        if name == 'search_recipes' else MagicMock()
+    assert [r['id'] for r in search_recipes(client, 'nueces')] == [2]
+
+def test_search_uses_rpc_order():
+    """RPC results are returned in rank order as catalog rows."""
+    client = MagicMock()
+    client.table.return_value.select.return_value.execute.return_value.data = RECIPES
+    client.rpc.return_value.execute.return_value.data = [{'id': 3, 'rank': 0.9}, {'id': 2, 'rank': 0.4}]
+    assert [r['id'] for r in search_recipes(client, 'pollo')] == [3, 2]
@@ -0,0 +1,61 @@
+"""
+Unit tests for write-behind recipe usage counters.
+"""
+from unittest.mock import MagicMock
+
+import pytest
+
+from services.usage_counters import UsageCounters
+
+def make_counters(**kwargs):
+    client = MagicMock()
+    return client, UsageCounters(client, flush_seconds=0, **kwargs)
+
+def test_increments_accumulate_and_flush_in_one_rpc():
+    """Many increments become a single sorted batch of deltas."""
+    client, counters = make_counters()
+    counters.increment('u2', 'r1')
+    counters.increment('u1', 'r9')
+    counters.increment('u2', 'r1', 2)
+    assert client.rpc.call_count == 0
+
+    assert counters.flush() == 2
+    client.rpc.assert_called_once_with('increment_recipe_usage_batch', {'p_increments': [
+        {'user_id': 'u1', 'recipe_id': 'r9', 'delta': 1},
+        {'user_id': 'u2', 'recipe_id': 'r1', 'delta': 3},
+    ]})
+    assert counters.pending() == {}
+    assert counters.flush() == 0
+
+def test_failed_flush_requeues_increments():
+    """Nothing is lost when the RPC fails; new increments merge with the requeued ones."""
+    client, counters = make_counters()
+    counters.increment(1, 7)
+    client.rpc.return_value.execute.side_effect = RuntimeError('offline')
+    with pytest.raises(RuntimeError):
+        counters.flush()
+    counters.increment(1, 7)
+    assert counters.pending() == {('1', '7'): 2}
+
+def test_ranking_refresh_is_throttled_and_only_after_writes():
+    """The materialized view is refreshed after a flush, at most once per interval."""
+    client, counters = make_counters(refresh_seconds=3600)
+    assert counters.refresh_ranking() is False
+    counters.increment('u', 'r')
+    counters.flush()
+    counters._last_refresh -= 3600
+    assert counters.refresh_ranking() is True
+    counters.increment('u', 'r')
+    counters.flush()
+    assert counters.refresh_ranking() is False
+    assert [c.args[0] for c in client.rpc.call_args_list].count('refresh_popular_recipes') == 1
+
+def test_popular_reads_are_cached():
+    """The ranking is one query, reused until it expires."""
+    client, counters = make_counters()
+    query = client.table.return_value.select.return_value.order.return_value.order.return_value.limit.return_value
+    query.execute.return_value.data = [{'recipe_id': 'a', 'total_uses': 9, 'users': 3},
+                                       {'recipe_id': 'b', 'total_uses': 4, 'users': 2}]
+    assert [r['recipe_id'] for r in counters.popular(1)] == ['a']
+    assert len(counters.popular(5)) == 2
+    assert query.execute.call_count == 1
@@ -0,0 +1,92 @@
+"""
+Unit tests for the batch week-rollover job.
+"""
+from datetime import date
+from unittest.mock import MagicMock
+
+from services.plan_service import build_next_week_entries, next_iso_week
+from services.week_rollover import run_week_rollover
+
+RECIPES = [
+    {'id': 1, 'meal_type': 'desayuno', 'calories': 300, 'protein': 20, 'carbs': 30, 'fat': 10},
+    {'id': 2, 'meal_type': 'desayuno', 'calories': 320, 'protein': 18, 'carbs': 35, 'fat': 9},
+    {'id': 3, 'meal_type': 'comida', 'calories': 600, 'protein': 40, 'carbs': 60, 'fat': 20},
+    {'id': 4, 'meal_type': 'cena', 'calories': 400, 'protein': 30, 'carbs': 20, 'fat': 15},
+]
+BY_ID = {r['id']: r for r in RECIPES}
+
+def by_meal(meal_type):
+    return [r for r in RECIPES if r['meal_type'] == meal_type]
+
+def test_build_entries_rotates_least_used_recipes():
+    """The least used food-bank recipe is chosen, counting this week's picks."""
+    food_bank = [
+        {'recipe_id': 1, 'meal_type': 'desayuno', 'times_used': 0},
+        {'recipe_id': 2, 'meal_type': 'desayuno', 'times_used': 1},
+    ]
+    entries = build_next_week_entries(7, 3, food_bank, 10, BY_ID.get, by_meal)
+    breakfasts = [e['selected_recipe_id'] for e in entries if e['meal_type'] == 'desayuno']
+    assert breakfasts[:3] == [1, 1, 2]
+    assert len(entries) == 21
+    assert all(e['week_number'] == 10 and e['user_id'] == 7 for e in entries)
+
+def make_client(profiles, food_bank):
+    tables = {name: MagicMock() for name in ('master_recipes', 'user_profiles', 'user_food_bank', 'weekly_plans')}
+    tables['master_recipes'].select.return_value.execute.return_value.data = RECIPES
+    profile_query = tables['user_profiles'].select.return_value.eq.return_value
+    profile_query.order.return_value.limit.return_value.execute.return_value.data = profiles
+    tables['user_food_bank'].select.return_value.in_.return_value.order.return_value \
+        .range.return_value.execute.return_value.data = food_bank
+    client = MagicMock()
+    client.table.side_effect = lambda name: tables[name]
+    return client, tables
+
+def test_rollover_writes_pages_in_bulk():
+    """Users with a food bank are planned and replaced in one call; the rest are skipped."""
+    profiles = [{'user_id': 1, 'meals_per_day': 3}, {'user_id': 2, 'meals_per_day': 3}]
+    food_bank = [{'user_id': 1, 'recipe_id': 3, 'meal_type': 'comida', 'times_used': 0}]
+    client, tables = make_client(profiles, food_bank)
+
+    stats = run_week_rollover(client, workers=0, page_size=10, batch_size=5, week_number=42)
+
+    assert stats['users'] == 2
+    assert stats['users_planned'] == 1
+    assert stats['users_skipped'] == 1
+    assert stats['entries'] == 21
+    assert stats['insert_batches'] == 1
+    calls = [call.args[1] for call in client.rpc.call_args_list if call.args[0] == 'replace_weekly_plans']
+    assert len(calls) == 1
+    params = calls[0]
+    assert params['p_user_ids'] == [1] and params['p_week_number'] == 42
+    assert len(params['p_entries']) == 21
+    tables['weekly_plans'].delete.assert_not_called()
+
+def test_next_week_crosses_the_year_boundary():
+    """The target week comes from the date a week ahead, ISO year included."""
+    assert next_iso_week(date(2026, 12, 28)) == (2027, 1)
+    assert next_iso_week(date(2020, 12, 24)) == (2020, 53)
+    assert next_iso_week(date(2026, 10, 18)) == (2026, 43)
+
+def test_food_banks_are_read_in_small_id_chunks():
+    """Large profile pages never put more than USER_ID_CHUNK ids in one in_() filter."""
+    profiles = [{'user_id': f"user-{i:03d}", 'meals_per_day': 3} for i in range(250)]
+    client, tables = make_client(profiles, [])
+
+    stats = run_week_rollover(client, workers=0, page_size=500, week_number=42)
+
+    assert stats['users'] == 250
+    sizes = [len(call.args[1]) for call in tables['user_food_bank'].select.return_value.in_.call_args_list]
+    assert sizes == [100, 100, 50]
+
+def test_write_groups_never_split_a_user():
+    """Replace calls hold whole users, up to about batch_size rows each."""
+    profiles = [{'user_id': i, 'meals_per_day': 3} for i in range(1, 5)]
+    food_bank = [{'user_id': i, 'recipe_id': 3, 'meal_type': 'comida', 'times_used': 0} for i in range(1, 5)]
+    client, _ = make_client(profiles, food_bank)
+
+    stats = run_week_rollover(client, workers=0, page_size=10, batch_size=50, week_number=42)
+
+    calls = [call.args[1] for call in client.rpc.call_args_list if call.args[0] == 'replace_weekly_plans']
+    assert [c['p_user_ids'] for c in calls] == [[1, 2], [3, 4]]
+    assert all(len(c['p_entries']) == 42 for c in calls)
+    assert stats['insert_batches'] == 2
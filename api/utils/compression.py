@@ -0,0 +1,164 @@
+"""Compresión negociada (brotli o gzip) de las respuestas JSON grandes."""
+import gzip
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Iterable, Iterator, Optional
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:   # brotli es opcional: sin él solo se ofrece gzip
+    brotli = None
+
+# Por debajo de este tamaño la compresión no compensa la cabecera y la CPU
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', '1024'))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+COMPRESSIBLE_MIMETYPES = frozenset(('application/json', 'text/plain', 'text/csv', 'text/html', 'application/javascript'))
+# Respuestas públicas ya comprimidas, por (ETag, codificación)
+COMPRESSED_CACHE_MAX = 256
+
+
+def supported_encodings():
+    """Codificaciones disponibles en este proceso, por orden de preferencia."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Mejor codificación aceptada por el cliente (respetando q=0), o None."""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    best = None
+    for encoding in supported_encodings():
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > 0 and (best is None or quality > best[1]):
+            best = (encoding, quality)
+    return best[0] if best else None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """Comprime un cuerpo completo."""
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_stream(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    """Comprime un cuerpo en streaming: cada fragmento sale en cuanto se genera."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        process, sync, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)   # 31 = formato gzip
+        process, finish = compressor.compress, compressor.flush
+        sync = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        # Vaciar tras cada fragmento para que el cliente no espere al final
+        out = process(chunk) + sync()
+        if out:
+            yield out
+    yield finish()
+
+
+class CompressedCache:
+    """LRU de cuerpos comprimidos de respuestas públicas, indexados por (ETag, codificación)."""
+
+    def __init__(self, max_entries: int = COMPRESSED_CACHE_MAX):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            data = self._data.get(key)
+            if data is not None:
+                self._data.move_to_end(key)
+            return data
+
+    def put(self, key, data: bytes):
+        with self._lock:
+            self._data[key] = data
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+
+def _weaken_etag(response):
+    etag, weak = response.get_etag()
+    if etag is not None and not weak:
+        # gzip, brotli e identidad no son idénticas byte a byte: solo equivalentes
+        response.set_etag(etag, weak=True)
+
+
+def init_compression(app, min_bytes: int = COMPRESS_MIN_BYTES, cache: Optional[CompressedCache] = None):
+    """Registra en la app un after_request que comprime las respuestas negociadas.
+
+    Se comprimen las respuestas 200 de tipos de texto/JSON que superan
+    min_bytes; las de streaming se comprimen por fragmentos. Si la
+    respuesta es pública y tiene ETag, el resultado se guarda en una LRU
+    para no volver a comprimir los mismos bytes del catálogo.
+
+    Si el cliente negocia una codificación, el ETag pasa a ser débil (W/)
+    aunque el cuerpo quede por debajo de min_bytes: un 304 no sabe el tamaño
+    del 200 y debe repetir el mismo ETag. Los 304 con ETag (http_cached)
+    también llevan Vary: Accept-Encoding.
+    """
+    cache = cache if cache is not None else CompressedCache()
+
+    @app.after_request
+    def compress_response(response):
+        if response.status_code == 304 and response.get_etag()[0] is not None:
+            response.vary.add('Accept-Encoding')
+            if choose_encoding(request.headers.get('Accept-Encoding')) is not None:
+                _weaken_etag(response)
+            return response
+        if (response.status_code != 200 or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return response
+        etag, weak = response.get_etag()
+
+        if response.is_streamed:
+            response.response = compress_stream(response.response, encoding)
+            response.headers.pop('Content-Length', None)
+        else:
+            if response.content_length is not None and response.content_length < min_bytes:
+                _weaken_etag(response)
+                return response
+            cacheable = etag is not None and 'public' in (response.headers.get('Cache-Control') or '')
+            body = cache.get((etag, encoding)) if cacheable else None
+            if body is None:
+                data = response.get_data()
+                if len(data) < min_bytes:
+                    _weaken_etag(response)
+                    return response
+                body = compress(data, encoding)
+                if cacheable:
+                    cache.put((etag, encoding), body)
+            response.set_data(body)
+
+        response.headers['Content-Encoding'] = encoding
+        _weaken_etag(response)
+        return response
+
+    return compress_response
@@ -0,0 +1,160 @@
+"""Filtrado por facetas con bitmaps (enteros de Python) sobre el catálogo de recetas."""
+import json
+import re
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from utils.food_matcher import normalize_text
+
+# Tramos de tiempo de preparación: (etiqueta, mínimo, máximo) en minutos
+PREP_TIME_BUCKETS = (('0-15', 0, 15), ('16-30', 16, 30), ('31-60', 31, 60), ('60+', 61, None))
+
+FACETS = ('meal_type', 'supermarket', 'difficulty', 'cost', 'prep_time', 'tag')
+# Facetas multivalor: al pedir varios valores la receta debe tenerlos todos
+CONJUNCTIVE_FACETS = frozenset(('tag',))
+
+_TAG_SEPARATORS = re.compile(r'[\s_\-]+')
+
+
+def normalize_tag(tag) -> str:
+    """Forma canónica de una etiqueta: "Sin_Gluten", "sin-gluten" y "sin gluten" son la misma."""
+    return _TAG_SEPARATORS.sub(' ', normalize_text(str(tag or ''))).strip()
+
+
+def recipe_tags(tags) -> List[str]:
+    """Etiquetas normalizadas de una receta (lista, JSON o texto separado por comas)."""
+    if isinstance(tags, str):
+        text = tags.strip()
+        if text.startswith('['):
+            try:
+                tags = json.loads(text)
+            except ValueError:
+                tags = text.strip('[]').split(',')
+        elif text.startswith('{'):   # array de PostgreSQL en texto: {a,b}
+            tags = text.strip('{}').split(',')
+        else:
+            tags = text.split(',')
+    normalized = (normalize_tag(str(t).strip('"\' ')) for t in (tags or []))
+    return sorted({t for t in normalized if t})
+
+
+def prep_time_bucket(minutes) -> Optional[str]:
+    """Tramo de tiempo de preparación, o None si la receta no lo indica."""
+    try:
+        minutes = float(minutes)
+    except (TypeError, ValueError):
+        return None
+    for label, low, high in PREP_TIME_BUCKETS:
+        if minutes >= low and (high is None or minutes <= high):
+            return label
+    return None
+
+
+def facet_values(recipe: Dict) -> Dict[str, List[str]]:
+    """Valores de cada faceta para una receta."""
+    values = {}
+    for facet in ('meal_type', 'supermarket', 'difficulty', 'cost'):
+        value = normalize_text(str(recipe.get(facet) or ''))
+        values[facet] = [value] if value else []
+    bucket = prep_time_bucket(recipe.get('prep_time_min'))
+    values['prep_time'] = [bucket] if bucket else []
+    values['tag'] = recipe_tags(recipe.get('tags'))
+    return values
+
+
+def _popcount(bitmap: int) -> int:
+    return bin(bitmap).count('1')
+
+
+def _iter_bits(bitmap: int) -> Iterator[int]:
+    while bitmap:
+        low = bitmap & -bitmap
+        yield low.bit_length() - 1
+        bitmap ^= low
+
+
+class FacetIndex:
+    """Un bitmap por (faceta, valor): el bit i indica que la receta i lo tiene.
+
+    Filtrar es combinar bitmaps: OR entre los valores pedidos de una faceta
+    (salvo las etiquetas, que se combinan con AND) y AND entre facetas. Los
+    recuentos de cada faceta se calculan con el resto de filtros aplicados,
+    para que el cliente vea cuántas recetas obtendría al añadir un valor.
+    """
+
+    def __init__(self, recipes: Iterable[Dict]):
+        self._recipes = list(recipes)
+        self._all = (1 << len(self._recipes)) - 1
+        self._bitmaps = {facet: {} for facet in FACETS}
+        for i, recipe in enumerate(self._recipes):
+            bit = 1 << i
+            for facet, values in facet_values(recipe).items():
+                bitmaps = self._bitmaps[facet]
+                for value in values:
+                    bitmaps[value] = bitmaps.get(value, 0) | bit
+
+    def __len__(self) -> int:
+        return len(self._recipes)
+
+    @staticmethod
+    def normalize_filters(filters: Dict[str, Iterable[str]]) -> Dict[str, List[str]]:
+        """Filtros con valores normalizados como en el índice. Lanza ValueError si la faceta no existe."""
+        normalized = {}
+        for facet, values in (filters or {}).items():
+            if facet not in FACETS:
+                raise ValueError(f"Faceta desconocida: {facet}")
+            if facet == 'tag':
+                values = [normalize_tag(v) for v in values]
+            elif facet != 'prep_time':
+                values = [normalize_text(str(v)) for v in values]
+            values = [v for v in values if v]
+            if values:
+                normalized[facet] = values
+        return normalized
+
+    def _facet_bitmap(self, facet: str, values: List[str]) -> int:
+        bitmaps = self._bitmaps[facet]
+        if facet in CONJUNCTIVE_FACETS:
+            bitmap = self._all
+            for value in values:
+                bitmap &= bitmaps.get(value, 0)
+            return bitmap
+        bitmap = 0
+        for value in values:
+            bitmap |= bitmaps.get(value, 0)
+        return bitmap
+
+    def match(self, filters: Dict[str, Iterable[str]], skip: Optional[str] = None) -> int:
+        """Bitmap de recetas que cumplen todos los filtros (opcionalmente ignorando una faceta)."""
+        bitmap = self._all
+        for facet, values in self.normalize_filters(filters).items():
+            if facet != skip:
+                bitmap &= self._facet_bitmap(facet, values)
+        return bitmap
+
+    def counts(self, filters: Dict[str, Iterable[str]]) -> Dict[str, Dict[str, int]]:
+        """Recuento por valor de cada faceta bajo los filtros del resto de facetas."""
+        filters = self.normalize_filters(filters)
+        full = self.match(filters)
+        result = {}
+        for facet in FACETS:
+            # En facetas OR el recuento de un valor no debe depender de la propia selección
+            base = full if facet in CONJUNCTIVE_FACETS else self.match(filters, skip=facet)
+            counts = {}
+            for value, bitmap in self._bitmaps[facet].items():
+                count = _popcount(base & bitmap)
+                if count:
+                    counts[value] = count
+            result[facet] = dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+        return result
+
+    def search(self, filters: Dict[str, Iterable[str]], limit: int = 50, offset: int = 0) -> Dict:
+        """Recetas que cumplen los filtros (en orden de catálogo), total y recuentos por faceta."""
+        bitmap = self.match(filters)
+        recipes = []
+        for n, i in enumerate(_iter_bits(bitmap)):
+            if n < offset:
+                continue
+            if len(recipes) == limit:
+                break
+            recipes.append(self._recipes[i])
+        return {'recipes': recipes, 'total': _popcount(bitmap), 'facets': self.counts(filters)}
@@ -0,0 +1,79 @@
+"""Consultas concurrentes a varias fuentes con un plazo común."""
+import logging
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorSaturated(RuntimeError):
+    """El pool ya tiene el máximo de tareas en curso o en cola."""
+
+
+class BoundedExecutor(Executor):
+    """ThreadPoolExecutor con un tope de tareas pendientes (en ejecución + en cola).
+
+    Las llamadas lentas que no llegan a su plazo siguen ocupando hilos; sin
+    tope, una racha de ellas haría crecer la cola sin límite. Al llegar a
+    max_pending, submit() lanza ExecutorSaturated en lugar de encolar.
+    """
+
+    def __init__(self, max_workers: int, max_pending: Optional[int] = None, thread_name_prefix: str = ''):
+        self.max_pending = max_pending if max_pending is not None else max_workers * 2
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+
+    def submit(self, fn: Callable, *args, **kwargs):
+        """Encola fn o lanza ExecutorSaturated si no queda hueco."""
+        if not self._slots.acquire(blocking=False):
+            raise ExecutorSaturated(f"{self.max_pending} tasks already pending")
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+def fan_out(tasks: Dict[str, Tuple[Executor, Callable[[], Any]]], timeout: float) -> Tuple[Dict[str, Any], Set[str]]:
+    """Lanza cada tarea en su pool y espera a todas como mucho timeout segundos.
+
+    tasks asocia cada nombre con (pool, función). Con un pool por fuente,
+    la saturación de una (p. ej. OFF lento) no retrasa a las demás.
+    Devuelve (resultados por nombre, nombres que no terminaron a tiempo).
+    Una tarea que su pool rechaza o que no llega a tiempo cuenta como
+    pendiente; la que no llega sigue ejecutándose en segundo plano (p. ej.
+    para llenar una caché). Una tarea que falla se registra y se omite de
+    los resultados.
+    """
+    started = time.monotonic()
+    futures = {}
+    pending = set()
+    for name, (executor, task) in tasks.items():
+        try:
+            futures[executor.submit(task)] = name
+        except ExecutorSaturated:
+            logger.warning(f"Search source '{name}' skipped: worker pool saturated")
+            pending.add(name)
+
+    results = {}
+    done, not_done = wait(futures, timeout=timeout) if futures else (set(), set())
+    for future in done:
+        name = futures[future]
+        error = future.exception()
+        if error is not None:
+            logger.warning(f"Search source '{name}' failed: {error}")
+            continue
+        results[name] = future.result()
+
+    pending |= {futures[future] for future in not_done}
+    if pending:
+        logger.info(f"Sources {sorted(pending)} missed the {timeout}s deadline "
+                    f"({time.monotonic() - started:.2f}s elapsed)")
+    return results, pending
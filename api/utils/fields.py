@@ -0,0 +1,38 @@
+"""Proyección de columnas (?fields=) con listas blancas por endpoint."""
+from typing import Iterable, Optional, Tuple
+
+# Columnas que cada endpoint permite pedir
+RECIPE_FIELDS = frozenset((
+    'id', 'name', 'description', 'meal_type', 'supermarket', 'calories', 'protein', 'carbs', 'fat',
+    'ingredients', 'instructions', 'prep_time_min', 'servings', 'image_url', 'tags',
+    'difficulty', 'cost', 'rating', 'times_used'
+))
+PLAN_FIELDS = frozenset((
+    'id', 'user_id', 'week_number', 'day_of_week', 'meal_type', 'selected_recipe_id', 'calories',
+    'protein', 'carbs', 'fat', 'recipe_name', 'recipe_image', 'is_manual', 'created_at'
+))
+FOOD_LOG_FIELDS = frozenset((
+    'id', 'meal_type', 'food_name', 'recipe_id', 'barcode', 'calories', 'protein', 'carbs', 'fat',
+    'quantity', 'notes', 'source', 'week_number', 'day_of_week', 'logged_at'
+))
+
+
+def parse_fields(raw: Optional[str], allowed: Iterable[str], required: Iterable[str] = ()) -> Optional[Tuple[str, ...]]:
+    """Columnas pedidas en "a,b,c" (más las que el endpoint necesita), o None si no se pidió ninguna.
+
+    Lanza ValueError si alguna no está en la lista blanca.
+    """
+    if raw is None or not raw.strip():
+        return None
+    requested = [f.strip() for f in raw.split(',') if f.strip()]
+    unknown = sorted(set(requested) - set(allowed))
+    if unknown:
+        raise ValueError(f"Campos no permitidos: {', '.join(unknown)}")
+    fields = list(required)
+    fields += [f for f in requested if f not in fields]
+    return tuple(fields)
+
+
+def select_clause(fields: Optional[Tuple[str, ...]]) -> str:
+    """Argumento para select() de PostgREST: solo las columnas pedidas, o '*'."""
+    return ','.join(fields) if fields else '*'
@@ -0,0 +1,127 @@
+"""Detección de alérgenos y alimentos no deseados en ingredientes (Aho-Corasick)."""
+import unicodedata
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set
+
+
+def normalize_text(text: str) -> str:
+    """Minúsculas, sin tildes y con espacios colapsados ("Limón " -> "limon")."""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return ' '.join(stripped.split())
+
+
+def ingredient_names(ingredients) -> List[str]:
+    """Nombres de ingredientes en cualquiera de los formatos de master_recipes.
+
+    Acepta el formato antiguo (string separado por comas) y el nuevo
+    (lista de dicts con 'name' o lista de strings).
+    """
+    if not ingredients:
+        return []
+    if isinstance(ingredients, str):
+        return [i.strip() for i in ingredients.split(',') if i.strip()]
+    names = []
+    if isinstance(ingredients, list):
+        for ing in ingredients:
+            if isinstance(ing, dict):
+                name = ing.get('name') or ''
+            elif isinstance(ing, str):
+                name = ing
+            else:
+                continue
+            if name.strip():
+                names.append(name.strip())
+    return names
+
+
+class TermMatcher:
+    """Autómata Aho-Corasick sobre un conjunto de términos normalizados.
+
+    Encuentra cualquier término como subcadena del texto en una sola pasada,
+    sin importar cuántos términos haya.
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        self.terms = tuple(sorted({t for t in terms if t}))
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+
+        for term in self.terms:
+            state = 0
+            for ch in term:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                    self._goto[state][ch] = nxt
+                state = nxt
+            self._out[state] = self._out[state] + (term,)
+
+        # Enlaces de fallo por anchura
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                candidate = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = candidate if candidate != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def __bool__(self) -> bool:
+        return bool(self.terms)
+
+    def _scan(self, text: str):
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                yield out[state]
+
+    def matches(self, text: str) -> bool:
+        """True si algún término aparece en el texto (ya normalizado)."""
+        for _ in self._scan(text):
+            return True
+        return False
+
+    def find_all(self, text: str) -> Set[str]:
+        """Términos que aparecen en el texto (ya normalizado)."""
+        found = set()
+        for terms in self._scan(text):
+            found.update(terms)
+        return found
+
+
+def split_terms(value) -> List[str]:
+    """Términos normalizados de un campo de preferencias (string con comas o lista)."""
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        value = ','.join(str(v) for v in value if v)
+    return [normalize_text(t) for t in str(value).split(',') if t.strip()]
+
+
+@lru_cache(maxsize=256)
+def _compile(terms: tuple) -> TermMatcher:
+    return TermMatcher(terms)
+
+
+def get_exclusion_matcher(preferences: Optional[Dict]) -> Optional[TermMatcher]:
+    """Matcher compilado para allergies + disliked_foods, cacheado por cadena de preferencias."""
+    if not preferences:
+        return None
+    terms = split_terms(preferences.get('allergies')) + split_terms(preferences.get('disliked_foods'))
+    if not terms:
+        return None
+    return _compile(tuple(sorted(set(terms))))
+
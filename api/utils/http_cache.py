@@ -0,0 +1,91 @@
+"""Cabeceras de caché HTTP (ETag, Last-Modified, Cache-Control) para endpoints públicos del catálogo."""
+import hashlib
+import os
+from email.utils import formatdate
+from functools import wraps
+from typing import Callable, Optional
+
+from flask import make_response, request
+
+# El navegador revalida pronto; la CDN (Vercel) sirve su copia más tiempo y la
+# refresca en segundo plano mientras siga dentro de stale-while-revalidate
+CACHE_MAX_AGE = int(os.getenv('CATALOG_CACHE_MAX_AGE', '60'))
+CACHE_S_MAXAGE = int(os.getenv('CATALOG_CACHE_S_MAXAGE', '300'))
+CACHE_STALE_WHILE_REVALIDATE = int(os.getenv('CATALOG_CACHE_SWR', '600'))
+# Cabeceras que describen el cuerpo: un 304 no lleva cuerpo, así que no se copian
+_BODY_HEADERS = frozenset(('content-type', 'content-length', 'content-encoding'))
+
+
+def _query_fingerprint() -> str:
+    """Ruta y parámetros en orden canónico (?a=1&b=2 y ?b=2&a=1 comparten ETag)."""
+    args = sorted((key, value) for key in request.args for value in request.args.getlist(key))
+    return request.path + '?' + '&'.join(f'{key}={value}' for key, value in args)
+
+
+def _etag(*parts: str) -> str:
+    return hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest()[:32]
+
+
+def _not_modified(response=None):
+    """304 con las cabeceras que llevaría el 200 (RFC 9110 §15.4.5): Vary, Cache-Control, ETag...
+
+    Con la respuesta de la vista se copian sus cabeceras; sin ella (ETag por
+    versión, la vista no se ejecuta) el decorador añade las suyas después.
+    """
+    not_modified = make_response('', 304)
+    if response is not None:
+        for key, value in response.headers.items():
+            if key.lower() not in _BODY_HEADERS:
+                not_modified.headers.add(key, value)
+    return not_modified
+
+
+def cache_control(max_age: int = CACHE_MAX_AGE, s_maxage: int = CACHE_S_MAXAGE,
+                  stale_while_revalidate: int = CACHE_STALE_WHILE_REVALIDATE) -> str:
+    """Valor de Cache-Control para respuestas públicas e idénticas para todos los usuarios."""
+    return (f'public, max-age={max_age}, s-maxage={s_maxage}, '
+            f'stale-while-revalidate={stale_while_revalidate}')
+
+
+def http_cached(version: Optional[Callable[[], str]] = None, last_modified: Optional[Callable[[], float]] = None,
+                **cache_options):
+    """Decorador: ETag fuerte, 304 ante If-None-Match y Cache-Control con s-maxage.
+
+    Con version (p. ej. la versión del catálogo) el ETag sale de la versión y
+    los parámetros de la petición y se compara antes de ejecutar la vista,
+    así que un 304 no cuesta nada. Sin version se calcula sobre el cuerpo de
+    la respuesta: ahorra la transferencia, no el trabajo.
+
+    Solo se validan ETags: Last-Modified se emite como información, pero con
+    varias instancias cargando el catálogo en momentos distintos no sirve
+    para decidir un 304.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = None
+            if version is not None:
+                try:
+                    etag = _etag(version(), _query_fingerprint())
+                except Exception:
+                    etag = None   # sin versión disponible se recurre al hash del cuerpo
+            if etag is not None and request.if_none_match.contains_weak(etag):
+                response = _not_modified()
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                if etag is None:
+                    etag = _etag(_query_fingerprint(), hashlib.sha1(response.get_data()).hexdigest())
+                    if request.if_none_match.contains_weak(etag):
+                        response = _not_modified(response)
+
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = cache_control(**cache_options)
+            if last_modified is not None:
+                modified_at = last_modified()
+                if modified_at:
+                    response.headers['Last-Modified'] = formatdate(modified_at, usegmt=True)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,72 @@
+"""Sesión HTTP compartida para llamadas salientes (pool keep-alive, reintentos y timeouts)."""
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+USER_AGENT = 'DietTrackerApp/1.0'
+# Conexiones keep-alive por host (una por hilo de Flask/gunicorn que llame a la vez)
+POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', '16'))
+RETRY_TOTAL = int(os.getenv('HTTP_RETRIES', '2'))
+RETRY_BACKOFF = 0.3
+RETRY_BACKOFF_JITTER = 0.3
+RETRY_BACKOFF_MAX = 2.0
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Presupuestos (conexión, lectura) en segundos por tipo de llamada
+BARCODE_TIMEOUT = (3.05, 7.0)
+SEARCH_TIMEOUT = (3.05, 12.0)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def build_retry(total: int = RETRY_TOTAL) -> Retry:
+    """Reintentos acotados con backoff exponencial y jitter.
+
+    Solo se reintentan fallos rápidos (conexión rechazada o cortada, 429 y
+    5xx); un timeout de lectura ya ha gastado el presupuesto y no se repite.
+    Retry-After se ignora para que el tiempo total siga acotado.
+    """
+    return Retry(
+        total=total,
+        connect=total,
+        read=0,
+        status=total,
+        backoff_factor=RETRY_BACKOFF,
+        backoff_jitter=RETRY_BACKOFF_JITTER,
+        backoff_max=RETRY_BACKOFF_MAX,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=False,
+    )
+
+
+def build_session(pool_maxsize: int = POOL_MAXSIZE, retries: int = RETRY_TOTAL) -> requests.Session:
+    """Sesión con pool de conexiones keep-alive y la política de reintentos."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize,
+                          max_retries=build_retry(retries), pool_block=False)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+
+def get_http_session() -> requests.Session:
+    """Sesión compartida del proceso: reutiliza las conexiones TLS entre peticiones."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = build_session()
+    return _session
+
+
+def http_get(url: str, params: Optional[Dict] = None,
+             timeout: Tuple[float, float] = SEARCH_TIMEOUT) -> requests.Response:
+    """GET a través de la sesión compartida con el presupuesto (conexión, lectura) indicado."""
+    return get_http_session().get(url, params=params, timeout=timeout)
@@ -0,0 +1,101 @@
+"""Índice invertido ingrediente normalizado -> ids de receta."""
+import threading
+from typing import Dict, FrozenSet, Iterable, Optional
+
+from utils.food_matcher import TermMatcher, ingredient_names, normalize_text
+
+MAX_CACHED_EXCLUSIONS = 256
+
+
+class IngredientIndex:
+    """Índice invertido sobre los ingredientes de master_recipes.
+
+    Cada ingrediente normalizado (sin tildes, minúsculas) apunta al conjunto
+    de recetas que lo usan. Excluir alérgenos o alimentos no deseados pasa a
+    ser una diferencia de conjuntos: se recorre el vocabulario de
+    ingredientes (unos cientos) una vez por combinación de preferencias, en
+    lugar de escanear el texto de cada receta.
+
+    Se actualiza de forma incremental: solo se tocan las recetas cuyos
+    ingredientes han cambiado.
+    """
+
+    def __init__(self, recipes: Iterable[Dict] = ()):
+        self._lock = threading.Lock()
+        self._postings = {}        # ingrediente -> set(recipe_id)
+        self._recipe_terms = {}    # recipe_id -> frozenset(ingredientes)
+        self._exclusions = {}      # términos del matcher -> set(recipe_id)
+        self.sync(recipes)
+
+    def __len__(self) -> int:
+        return len(self._recipe_terms)
+
+    @staticmethod
+    def _terms_for(recipe: Dict) -> frozenset:
+        return frozenset(normalize_text(name) for name in ingredient_names(recipe.get('ingredients')))
+
+    def _remove_locked(self, recipe_id, terms):
+        for term in terms:
+            ids = self._postings.get(term)
+            if ids is None:
+                continue
+            ids.discard(recipe_id)
+            if not ids:
+                del self._postings[term]
+
+    def upsert(self, recipe: Dict) -> bool:
+        """Indexa o reindexa una receta. Devuelve True si sus ingredientes cambiaron."""
+        recipe_id = recipe.get('id')
+        terms = self._terms_for(recipe)
+        with self._lock:
+            old_terms = self._recipe_terms.get(recipe_id)
+            if old_terms == terms:
+                return False
+            if old_terms is not None:
+                self._remove_locked(recipe_id, old_terms)
+            for term in terms:
+                self._postings.setdefault(term, set()).add(recipe_id)
+            self._recipe_terms[recipe_id] = terms
+            self._exclusions.clear()
+        return True
+
+    def remove(self, recipe_id) -> bool:
+        """Quita una receta del índice."""
+        with self._lock:
+            terms = self._recipe_terms.pop(recipe_id, None)
+            if terms is None:
+                return False
+            self._remove_locked(recipe_id, terms)
+            self._exclusions.clear()
+        return True
+
+    def sync(self, recipes: Iterable[Dict]) -> int:
+        """Alinea el índice con un catálogo nuevo. Devuelve cuántas recetas cambiaron."""
+        changed = 0
+        seen = set()
+        for recipe in recipes:
+            seen.add(recipe.get('id'))
+            if self.upsert(recipe):
+                changed += 1
+        for recipe_id in [rid for rid in self._recipe_terms if rid not in seen]:
+            if self.remove(recipe_id):
+                changed += 1
+        return changed
+
+    def excluded_ids(self, matcher: Optional[TermMatcher]) -> FrozenSet:
+        """Ids de recetas con algún ingrediente que coincide con el matcher."""
+        if not matcher:
+            return frozenset()
+        with self._lock:
+            cached = self._exclusions.get(matcher.terms)
+            if cached is not None:
+                return cached
+            excluded = set()
+            for term, ids in self._postings.items():
+                if matcher.matches(term):
+                    excluded |= ids
+            excluded = frozenset(excluded)
+            if len(self._exclusions) >= MAX_CACHED_EXCLUSIONS:
+                self._exclusions.clear()
+            self._exclusions[matcher.terms] = excluded
+        return excluded
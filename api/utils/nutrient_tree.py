@@ -0,0 +1,121 @@
+"""KD-tree por tipo de comida sobre (calorías, proteína, carbohidratos, grasa)."""
+import heapq
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+NUTRIENTS = ('calories', 'protein', 'carbs', 'fat')
+
+
+def nutrient_values(recipe: Dict) -> Tuple[float, ...]:
+    """Valores nutricionales de una receta (0 si faltan o no son numéricos)."""
+    values = []
+    for nutrient in NUTRIENTS:
+        try:
+            values.append(float(recipe.get(nutrient) or 0))
+        except (TypeError, ValueError):
+            values.append(0.0)
+    return tuple(values)
+
+
+class _KDTree:
+    """KD-tree estático sobre puntos ya escalados.
+
+    Los nodos se guardan en listas paralelas (punto, eje, hijo izquierdo,
+    hijo derecho) para que la búsqueda no cree objetos.
+    """
+
+    def __init__(self, points: List[Tuple[float, ...]]):
+        self.points = points
+        self._axis = [0] * len(points)
+        self._left = [-1] * len(points)
+        self._right = [-1] * len(points)
+        self.root = self._build(list(range(len(points))), 0)
+
+    def _build(self, indices: List[int], depth: int) -> int:
+        if not indices:
+            return -1
+        axis = depth % len(NUTRIENTS)
+        indices.sort(key=lambda i: self.points[i][axis])
+        mid = len(indices) // 2
+        node = indices[mid]
+        self._axis[node] = axis
+        self._left[node] = self._build(indices[:mid], depth + 1)
+        self._right[node] = self._build(indices[mid + 1:], depth + 1)
+        return node
+
+    def nearest(self, target: Tuple[float, ...], k: int, skip) -> List[Tuple[float, int]]:
+        """Los k puntos más cercanos a target cuyo índice no cumple skip(i)."""
+        heap = []  # (-distancia², índice): el peor de los k está arriba
+        points, axes, left, right = self.points, self._axis, self._left, self._right
+
+        def visit(node):
+            if node < 0:
+                return
+            point = points[node]
+            if not skip(node):
+                dist = sum((p - t) ** 2 for p, t in zip(point, target))
+                if len(heap) < k:
+                    heapq.heappush(heap, (-dist, node))
+                elif dist < -heap[0][0]:
+                    heapq.heapreplace(heap, (-dist, node))
+
+            axis = axes[node]
+            diff = target[axis] - point[axis]
+            near, far = (left[node], right[node]) if diff < 0 else (right[node], left[node])
+            visit(near)
+            # Solo se explora la otra rama si puede contener algo más cercano
+            if len(heap) < k or diff * diff < -heap[0][0]:
+                visit(far)
+
+        if k > 0:
+            visit(self.root)
+        return sorted((-neg_dist, node) for neg_dist, node in heap)
+
+
+class NutrientNeighbors:
+    """Vecinos más cercanos en espacio nutricional, un KD-tree por meal_type.
+
+    Cada nutriente se divide por su desviación típica dentro del tipo de
+    comida, para que las calorías no dominen la distancia.
+    """
+
+    def __init__(self, recipes: Iterable[Dict]):
+        grouped = {}
+        for recipe in recipes:
+            grouped.setdefault(recipe.get('meal_type'), []).append(recipe)
+
+        # meal_type -> (recetas, escalas, árbol)
+        self._trees = {}
+        for meal_type, items in grouped.items():
+            raw = [nutrient_values(r) for r in items]
+            scales = []
+            for axis in range(len(NUTRIENTS)):
+                column = [values[axis] for values in raw]
+                mean = sum(column) / len(column)
+                std = math.sqrt(sum((v - mean) ** 2 for v in column) / len(column))
+                scales.append(std if std > 0 else 1.0)
+            points = [tuple(v / s for v, s in zip(values, scales)) for values in raw]
+            self._trees[meal_type] = (items, tuple(scales), _KDTree(points))
+
+    def nearest(self, meal_type: str, values: Tuple[float, ...], k: int = 5,
+                exclude_ids: Optional[Iterable] = None) -> List[Tuple[float, Dict]]:
+        """
+        Recetas de meal_type más cercanas a los valores dados.
+
+        Args:
+            meal_type: tipo de comida
+            values: (calorías, proteína, carbohidratos, grasa) de referencia
+            k: número de recetas
+            exclude_ids: ids que no deben devolverse (alérgenos, receta actual)
+
+        Returns:
+            Lista de (distancia escalada, receta), de la más cercana a la más lejana
+        """
+        entry = self._trees.get(meal_type)
+        if not entry:
+            return []
+        items, scales, tree = entry
+        exclude_ids = exclude_ids or ()
+        target = tuple(v / s for v, s in zip(values, scales))
+        found = tree.nearest(target, k, lambda i: items[i].get('id') in exclude_ids)
+        return [(math.sqrt(dist), items[i]) for dist, i in found]
@@ -0,0 +1,110 @@
+"""Almacén columnar (arrays NumPy) de los valores nutricionales del catálogo."""
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+NUTRITION_COLUMNS = ('calories', 'protein', 'carbs', 'fat', 'fiber')
+# Nombres alternativos de cada columna en master_recipes / CSV
+_ALIASES = {'protein': ('protein_g',), 'carbs': ('carbs_g',), 'fat': ('fat_g',), 'fiber': ('fiber_g',)}
+
+
+def _number(recipe: Dict, column: str) -> float:
+    for key in (column,) + _ALIASES.get(column, ()):
+        value = recipe.get(key)
+        if value is not None and value != '':
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                return 0.0
+    return 0.0
+
+
+class NutritionStore:
+    """Columnas nutricionales como arrays en el orden del catálogo.
+
+    Para cada meal_type guarda las posiciones ordenadas por calorías, de
+    modo que un rango de calorías se resuelve con searchsorted y el resto de
+    condiciones (proteína mínima, grasa máxima...) con máscaras booleanas
+    sobre esa ventana. Los resultados son posiciones en el orden original.
+    """
+
+    def __init__(self, recipes: Iterable[Dict]):
+        self._recipes = list(recipes)
+        n = len(self._recipes)
+        self.columns = {
+            column: np.fromiter((_number(r, column) for r in self._recipes), dtype=np.float64, count=n)
+            for column in NUTRITION_COLUMNS
+        }
+        # meal_type -> (calorías ordenadas, posiciones en ese orden)
+        self._by_meal = {}
+        meals = {}
+        for position, recipe in enumerate(self._recipes):
+            meals.setdefault(recipe.get('meal_type'), []).append(position)
+        calories = self.columns['calories']
+        for meal_type, positions in meals.items():
+            positions = np.asarray(positions, dtype=np.intp)
+            order = positions[np.argsort(calories[positions], kind='stable')]
+            self._by_meal[meal_type] = (calories[order], order)
+        all_order = np.argsort(calories, kind='stable')
+        self._all = (calories[all_order], all_order)
+
+    def __len__(self) -> int:
+        return len(self._recipes)
+
+    def meal_types(self) -> List:
+        """Tipos de comida presentes."""
+        return list(self._by_meal.keys())
+
+    def query(self, meal_type: Optional[str] = None, min_calories: Optional[float] = None,
+              max_calories: Optional[float] = None, **bounds) -> np.ndarray:
+        """Posiciones (ordenadas) de las recetas que cumplen todos los rangos.
+
+        bounds admite min_<columna> / max_<columna> para protein, carbs, fat
+        y fiber, p. ej. query('desayuno', 300, 450, min_protein=25).
+        """
+        if meal_type is None:
+            sorted_calories, order = self._all
+        else:
+            bucket = self._by_meal.get(meal_type)
+            if bucket is None:
+                return np.empty(0, dtype=np.intp)
+            sorted_calories, order = bucket
+        lo = 0 if min_calories is None else np.searchsorted(sorted_calories, min_calories, side='left')
+        hi = len(order) if max_calories is None else np.searchsorted(sorted_calories, max_calories, side='right')
+        positions = order[lo:hi]
+
+        for name, limit in bounds.items():
+            if limit is None:
+                continue
+            side, _, column = name.partition('_')
+            if side not in ('min', 'max') or column not in self.columns or column == 'calories':
+                raise ValueError(f"Filtro nutricional desconocido: {name}")
+            values = self.columns[column][positions]
+            positions = positions[values >= limit] if side == 'min' else positions[values <= limit]
+        return np.sort(positions)
+
+    def mask(self, meal_type: Optional[str] = None, min_calories: Optional[float] = None,
+             max_calories: Optional[float] = None, **bounds) -> np.ndarray:
+        """Máscara booleana (orden del catálogo) equivalente a query()."""
+        mask = np.zeros(len(self._recipes), dtype=bool)
+        mask[self.query(meal_type, min_calories, max_calories, **bounds)] = True
+        return mask
+
+    def recipes(self, positions: Iterable[int]) -> List[Dict]:
+        """Recetas en las posiciones dadas."""
+        return [self._recipes[i] for i in positions]
+
+    def select(self, meal_type: Optional[str] = None, min_calories: Optional[float] = None,
+               max_calories: Optional[float] = None, **bounds) -> List[Dict]:
+        """Recetas que cumplen los rangos, en el orden del catálogo."""
+        return self.recipes(self.query(meal_type, min_calories, max_calories, **bounds))
+
+    def top_protein_density(self, positions: np.ndarray, limit: int) -> List[Dict]:
+        """Las recetas de positions con más gramos de proteína por 100 kcal."""
+        if len(positions) == 0:
+            return []
+        calories = self.columns['calories'][positions]
+        density = np.where(calories > 0, self.columns['protein'][positions] * 100.0 / np.maximum(calories, 1e-9), 0.0)
+        # Orden estable: a igual densidad se respeta el orden del catálogo
+        ranked = positions[np.argsort(-density, kind='stable')][:limit]
+        return self.recipes(ranked)
@@ -0,0 +1,38 @@
+"""Paginación por cursor (keyset) sobre recetas ordenadas por (meal_type, calories, id)."""
+import base64
+import json
+from typing import Dict, Optional, Tuple
+
+# Tamaño de página por defecto y máximo que acepta el servidor
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+
+def recipe_sort_key(recipe: Dict) -> Tuple[str, float, str]:
+    """Clave de orden total de una receta: (meal_type, calories, id)."""
+    return (recipe.get('meal_type') or '', float(recipe.get('calories') or 0), str(recipe.get('id')))
+
+
+def encode_cursor(key: Tuple[str, float, str]) -> str:
+    """Cursor opaco (base64 url-safe) con la clave de la última fila de la página."""
+    raw = json.dumps(list(key), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[str, float, str]]:
+    """Clave contenida en un cursor. Lanza ValueError si el cursor no es válido."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        meal_type, calories, recipe_id = json.loads(raw)
+        return (str(meal_type), float(calories), str(recipe_id))
+    except (ValueError, TypeError) as e:
+        raise ValueError('Cursor inválido') from e
+
+
+def page_size(limit: Optional[int]) -> int:
+    """Tamaño de página pedido, acotado a [1, MAX_PAGE_SIZE]."""
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
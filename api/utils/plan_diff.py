@@ -0,0 +1,80 @@
+"""Diferencias entre el plan semanal guardado y uno recién generado."""
+from typing import Callable, Dict, List, Optional
+
+# Columnas de weekly_plans que dependen de la receta elegida
+PLAN_ENTRY_FIELDS = ('selected_recipe_id', 'calories', 'protein', 'carbs', 'fat', 'recipe_name', 'recipe_image')
+
+
+def _slot(row: Dict):
+    return (row.get('day_of_week'), row.get('meal_type'))
+
+
+def diff_plan(existing_rows: List[Dict], new_entries: List[Dict],
+              still_valid: Optional[Callable[[Dict], bool]] = None) -> Dict:
+    """
+    Compara las filas de weekly_plans de una semana con el plan nuevo, por
+    hueco (day_of_week, meal_type).
+
+    Se conserva la fila existente cuando:
+      - el usuario la cambió a mano (is_manual),
+      - tiene la misma receta que el plan nuevo, o
+      - still_valid(fila) dice que su receta sigue cumpliendo las preferencias
+        y el objetivo de calorías.
+
+    Args:
+        existing_rows: filas actuales de la semana
+        new_entries: entradas generadas (sin id)
+        still_valid: criterio opcional para conservar filas no manuales
+
+    Returns:
+        dict con:
+          - upserts: filas a escribir (con 'id' si actualizan una existente)
+          - delete_ids: ids de filas sobrantes (huecos que ya no existen o duplicados);
+            las filas manuales de huecos que ya no existen se conservan
+          - kept: filas existentes que no se tocan
+          - plan: plan resultante ordenado por día
+    """
+    by_slot = {}
+    delete_ids = []
+    for row in existing_rows:
+        slot = _slot(row)
+        if slot in by_slot:
+            # Duplicados de planes antiguos: se queda la primera fila
+            delete_ids.append(row.get('id'))
+        else:
+            by_slot[slot] = row
+
+    upserts, kept, plan = [], [], []
+    new_slots = set()
+    for entry in new_entries:
+        slot = _slot(entry)
+        new_slots.add(slot)
+        current = by_slot.get(slot)
+        if current is None:
+            upserts.append(entry)
+            plan.append(entry)
+            continue
+
+        if (current.get('is_manual')
+                or current.get('selected_recipe_id') == entry.get('selected_recipe_id')
+                or (still_valid is not None and still_valid(current))):
+            kept.append(current)
+            plan.append(current)
+            continue
+
+        update = {**entry, 'id': current.get('id')}
+        upserts.append(update)
+        plan.append(update)
+
+    for slot, row in by_slot.items():
+        if slot in new_slots:
+            continue
+        if row.get('is_manual'):
+            # Igual que apply_weekly_plan_diff: las comidas manuales no se borran
+            kept.append(row)
+            plan.append(row)
+        else:
+            delete_ids.append(row.get('id'))
+
+    plan.sort(key=lambda r: r.get('day_of_week') or 0)
+    return {'upserts': upserts, 'delete_ids': delete_ids, 'kept': kept, 'plan': plan}
@@ -0,0 +1,71 @@
+"""Semillas deterministas y memoización de planes semanales generados."""
+import copy
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+PLAN_MEMO_SIZE = int(os.getenv('PLAN_MEMO_SIZE', '256'))
+
+
+def plan_seed(user_id, iso_year: int, iso_week: int) -> int:
+    """Semilla estable para (usuario, año ISO, semana ISO)."""
+    raw = f"{user_id}:{iso_year}:{iso_week}".encode('utf-8')
+    return int.from_bytes(hashlib.sha256(raw).digest()[:8], 'big')
+
+
+def plan_memo_key(**inputs) -> str:
+    """Hash de las entradas que determinan un plan (perfil, objetivo, versión del catálogo...)."""
+    raw = json.dumps(inputs, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(raw).hexdigest()
+
+
+class PlanMemo:
+    """LRU en proceso de planes ya calculados.
+
+    Solo tiene sentido para generaciones con semilla: con las mismas
+    entradas y la misma versión del catálogo el resultado es idéntico.
+    Los valores se copian al guardar y al leer para que nadie modifique
+    la entrada compartida.
+    """
+
+    def __init__(self, max_size: int = PLAN_MEMO_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Valor memorizado para key, o None."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(value)
+
+    def put(self, key: str, value: Any):
+        """Guarda un valor, descartando el menos usado si se supera max_size."""
+        if self.max_size <= 0:
+            return
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+plan_memo = PlanMemo()
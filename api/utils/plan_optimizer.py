@@ -0,0 +1,145 @@
+"""Optimizador de planes: elige la combinación diaria que mejor cumple calorías y macros."""
+import os
+import random
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+NUTRIENTS = ('calories', 'protein', 'carbs', 'fat')
+
+# Presupuesto de tiempo por petición (toda la semana)
+OPTIMIZER_BUDGET_MS = float(os.getenv('PLAN_OPTIMIZER_BUDGET_MS', '250'))
+
+# Peso relativo de cada nutriente en la desviación (las calorías pesan el doble)
+NUTRIENT_WEIGHTS = np.array([2.0, 1.0, 1.0, 1.0])
+
+# Penalización por cada vez que una receta ya se usó en la semana
+VARIETY_PENALTY = 0.01
+
+# Desviación considerada suficientemente buena para dejar de buscar (~2% por nutriente)
+GOOD_ENOUGH_COST = 5 * 0.02 ** 2
+
+MAX_RESTARTS = 30
+
+# Reinicios por día en planes con semilla: un tope fijo pequeño que se alcanza
+# mucho antes que el presupuesto, así el resultado no depende de la carga de la máquina
+SEEDED_MAX_RESTARTS = 8
+
+
+def nutrient_matrix(recipes: List[Dict]) -> np.ndarray:
+    """Matriz (n, 4) con calorías, proteína, carbohidratos y grasa de cada receta."""
+    matrix = np.zeros((len(recipes), len(NUTRIENTS)))
+    for i, recipe in enumerate(recipes):
+        for j, nutrient in enumerate(NUTRIENTS):
+            try:
+                matrix[i, j] = float(recipe.get(nutrient) or 0)
+            except (TypeError, ValueError):
+                pass
+    return matrix
+
+
+def _descend(matrices, picks, total, target, scale, penalties, deadline):
+    """Búsqueda local por coordenadas: re-elige cada comida con las demás fijas."""
+    improved = True
+    while improved and time.monotonic() < deadline:
+        improved = False
+        for k, matrix in enumerate(matrices):
+            residual = target - (total - matrix[picks[k]])
+            costs = (((matrix - residual) ** 2) * scale).sum(axis=1) + penalties[k]
+            best = int(costs.argmin())
+            if best != picks[k] and costs[best] < costs[picks[k]] - 1e-12:
+                total = total - matrix[picks[k]] + matrix[best]
+                picks[k] = best
+                improved = True
+    return picks, total
+
+
+def _cost(picks, total, target, scale, penalties) -> float:
+    deviation = float((((total - target) ** 2) * scale).sum())
+    return deviation + sum(float(penalties[k][idx]) for k, idx in enumerate(picks))
+
+
+def _optimize_day(matrices, shares, target, scale, penalties, deadline, rng, max_restarts):
+    # Arranque voraz: cada comida toma la receta más cercana a su parte del objetivo
+    picks = []
+    for k, matrix in enumerate(matrices):
+        costs = (((matrix - target * shares[k]) ** 2) * scale).sum(axis=1) + penalties[k]
+        picks.append(int(costs.argmin()))
+    total = sum(matrix[idx] for matrix, idx in zip(matrices, picks))
+
+    picks, total = _descend(matrices, picks, total, target, scale, penalties, deadline)
+    best_picks, best_total = list(picks), total
+    best_cost = _cost(best_picks, best_total, target, scale, penalties)
+
+    # Búsqueda local iterada: perturbar una comida y volver a descender
+    restarts = 0
+    while best_cost > GOOD_ENOUGH_COST and restarts < max_restarts and time.monotonic() < deadline:
+        restarts += 1
+        picks, total = list(best_picks), best_total
+        k = rng.randrange(len(matrices))
+        new_idx = rng.randrange(len(matrices[k]))
+        total = total - matrices[k][picks[k]] + matrices[k][new_idx]
+        picks[k] = new_idx
+        picks, total = _descend(matrices, picks, total, target, scale, penalties, deadline)
+        cost = _cost(picks, total, target, scale, penalties)
+        if cost < best_cost:
+            best_picks, best_total, best_cost = list(picks), total, cost
+
+    return best_picks
+
+
+def optimize_week(candidates: Dict[str, List[Dict]], meal_calories: Dict[str, float], macros: Dict,
+                  days: int = 7, budget_ms: float = None, rng: Optional[random.Random] = None,
+                  max_restarts: Optional[int] = None) -> List[Dict[str, Dict]]:
+    """
+    Elige una receta por comida y día minimizando la desviación diaria
+    respecto a las calorías y macros objetivo.
+
+    Args:
+        candidates: recetas candidatas por meal_type (ya filtradas por preferencias)
+        meal_calories: calorías objetivo por meal_type (distribute_meal_calories)
+        macros: objetivo diario con calories, protein, carbs, fat (distribute_macros)
+        days: número de días a planificar
+        budget_ms: presupuesto de tiempo total; al agotarse se devuelve la mejor solución hallada
+        rng: generador aleatorio para las perturbaciones
+        max_restarts: reinicios por día (por defecto MAX_RESTARTS); con un tope bajo
+                      el resultado solo depende de rng mientras no se agote el presupuesto
+
+    Returns:
+        Lista (un elemento por día) de dicts meal_type -> receta
+    """
+    rng = rng or random.Random()
+    budget_ms = OPTIMIZER_BUDGET_MS if budget_ms is None else budget_ms
+    max_restarts = MAX_RESTARTS if max_restarts is None else max_restarts
+    deadline = time.monotonic() + budget_ms / 1000.0
+
+    slots = [meal_type for meal_type in meal_calories if candidates.get(meal_type)]
+    if not slots:
+        return [{} for _ in range(days)]
+
+    matrices = [nutrient_matrix(candidates[meal_type]) for meal_type in slots]
+    target = np.array([float(macros.get(n) or 0) for n in NUTRIENTS])
+    scale = NUTRIENT_WEIGHTS / np.maximum(target, 1.0) ** 2
+
+    total_calories = float(sum(meal_calories[meal_type] for meal_type in slots)) or 1.0
+    shares = [meal_calories[meal_type] / total_calories for meal_type in slots]
+    target = target * (total_calories / max(sum(meal_calories.values()), 1.0))
+
+    usage = [np.zeros(len(matrix)) for matrix in matrices]
+    week = []
+    for day in range(days):
+        # Reparto del tiempo restante entre los días pendientes
+        now = time.monotonic()
+        day_deadline = now + max(0.0, deadline - now) / (days - day)
+        penalties = [VARIETY_PENALTY * counts for counts in usage]
+
+        picks = _optimize_day(matrices, shares, target, scale, penalties, day_deadline, rng, max_restarts)
+
+        day_plan = {}
+        for k, idx in enumerate(picks):
+            usage[k][idx] += 1
+            day_plan[slots[k]] = candidates[slots[k]][idx]
+        week.append(day_plan)
+
+    return week
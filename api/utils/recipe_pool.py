@@ -0,0 +1,27 @@
+"""Índice en memoria de recetas candidatas por tipo de comida y rango de calorías."""
+from typing import Dict, Iterable, List
+
+from utils.nutrition_store import NutritionStore
+
+
+class RecipePool:
+    """Pool de recetas cargado una sola vez y consultado muchas veces.
+
+    Se apoya en un NutritionStore: las recetas de cada meal_type están
+    ordenadas por calorías, de modo que cada ventana (min_cal, max_cal) se
+    resuelve con searchsorted en lugar de una consulta a master_recipes.
+    """
+
+    def __init__(self, recipes: Iterable[Dict]):
+        self.store = NutritionStore(recipes)
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def meal_types(self) -> List[str]:
+        """Tipos de comida presentes en el pool."""
+        return self.store.meal_types()
+
+    def candidates(self, meal_type: str, min_cal: float, max_cal: float) -> List[Dict]:
+        """Recetas de meal_type con calorías en [min_cal, max_cal], en el orden original."""
+        return self.store.select(meal_type, min_cal, max_cal)
@@ -0,0 +1,59 @@
+"""Agrupación de llamadas idénticas simultáneas (single-flight)."""
+import threading
+from typing import Any, Callable, Hashable
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Ejecuta una sola vez cada clave mientras haya llamadas en curso.
+
+    La primera llamada con una clave ejecuta fn(); las que llegan mientras
+    tanto con la misma clave esperan y reciben el mismo resultado (o la misma
+    excepción). Cuando termina, la clave queda libre: no es una caché.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]):
+        """Resultado de fn() para key, compartido con las llamadas simultáneas."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self) -> int:
+        """Claves con una llamada en curso."""
+        with self._lock:
+            return len(self._calls)
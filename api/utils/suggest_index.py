@@ -0,0 +1,135 @@
+"""Índice de autocompletado por prefijo sobre un array ordenado."""
+import heapq
+import threading
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+from utils.food_matcher import ingredient_names, normalize_text
+from utils.text_search import SPANISH_STOPWORDS
+
+# Los prefijos cortos abarcan muchas claves: su resultado se memoriza hasta el próximo cambio
+SHORT_PREFIX_LENGTH = 3
+MAX_CACHED_PREFIXES = 4096
+
+
+def _keys_for(text: str) -> List[str]:
+    """Claves de búsqueda: el texto completo y cada sufijo que empieza en una palabra con contenido.
+
+    Así "pol" sugiere tanto "Pollo al horno" como "Ensalada de pollo".
+    """
+    words = normalize_text(text).split()
+    keys = []
+    for i, word in enumerate(words):
+        if i == 0 or word not in SPANISH_STOPWORDS:
+            keys.append(' '.join(words[i:]))
+    return keys
+
+
+class SuggestIndex:
+    """Sugerencias por prefijo con búsqueda binaria sobre claves normalizadas.
+
+    Cada entrada es (texto, tipo, peso, datos extra). Una consulta localiza
+    el rango de claves con el prefijo y devuelve las k de más peso (a
+    igualdad, las más cortas). Con max_entries se comporta como LRU: las
+    entradas más antiguas se descartan al añadir nuevas.
+
+    Los resultados de prefijos cortos (los que recorren más claves) se
+    memorizan y se invalidan con cada cambio del índice.
+    """
+
+    def __init__(self, entries: Iterable[Dict] = (), max_entries: Optional[int] = None):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._keys = []        # [(clave, id de entrada)] ordenado
+        self._entries = OrderedDict()   # id de entrada -> entrada
+        self._cache = {}
+        # Carga inicial en bloque: una sola ordenación en lugar de un insort por clave
+        for entry in entries:
+            text = entry.get('text')
+            if not text or not text.strip():
+                continue
+            entry_id = (entry['type'], normalize_text(text))
+            if entry_id in self._entries:
+                continue
+            self._entries[entry_id] = {'weight': 1.0, **entry, 'text': text.strip()}
+            self._keys.extend((key, entry_id) for key in _keys_for(text))
+        self._keys.sort()
+        if max_entries is not None:
+            while len(self._entries) > max_entries:
+                self._remove_locked(next(iter(self._entries)))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove_locked(self, entry_id):
+        self._cache.clear()
+        entry = self._entries.pop(entry_id)
+        for key in _keys_for(entry['text']):
+            i = bisect_left(self._keys, (key, entry_id))
+            if i < len(self._keys) and self._keys[i] == (key, entry_id):
+                del self._keys[i]
+
+    def add(self, text: str, type: str, weight: float = 1.0, **extra):
+        """Añade o refresca una sugerencia (mismo tipo y texto normalizado = misma entrada)."""
+        if not text or not text.strip():
+            return
+        entry_id = (type, normalize_text(text))
+        with self._lock:
+            if entry_id in self._entries:
+                self._entries.move_to_end(entry_id)
+                self._entries[entry_id].update(extra)
+                self._cache.clear()
+                return
+            self._entries[entry_id] = {'text': text.strip(), 'type': type, 'weight': weight, **extra}
+            self._cache.clear()
+            for key in _keys_for(text):
+                insort(self._keys, (key, entry_id))
+            if self.max_entries is not None:
+                while len(self._entries) > self.max_entries:
+                    self._remove_locked(next(iter(self._entries)))
+
+    def suggest(self, prefix: str, k: int = 8, types: Optional[Iterable[str]] = None) -> List[Dict]:
+        """Las k mejores sugerencias cuyo texto (o alguna de sus palabras) empieza por prefix."""
+        prefix = normalize_text(prefix or '')
+        if not prefix or k <= 0:
+            return []
+        types = set(types) if types else None
+        cache_key = (prefix, k, frozenset(types) if types else None) if len(prefix) <= SHORT_PREFIX_LENGTH else None
+        with self._lock:
+            cached = self._cache.get(cache_key) if cache_key else None
+            if cached is not None:
+                return [dict(entry) for entry in cached]
+            keys = self._keys
+            seen = {}
+            for i in range(bisect_left(keys, (prefix,)), len(keys)):
+                key, entry_id = keys[i]
+                if not key.startswith(prefix):
+                    break
+                if entry_id in seen or (types and entry_id[0] not in types):
+                    continue
+                seen[entry_id] = self._entries[entry_id]
+            best = heapq.nsmallest(k, seen.values(), key=lambda e: (-e['weight'], len(e['text']), e['text']))
+            if cache_key:
+                if len(self._cache) >= MAX_CACHED_PREFIXES:
+                    self._cache.clear()
+                self._cache[cache_key] = best
+        return [dict(entry) for entry in best]
+
+
+def catalog_suggestions(recipes: Iterable[Dict]) -> SuggestIndex:
+    """Índice con los nombres de receta y los ingredientes del catálogo (pesados por frecuencia)."""
+    recipes = list(recipes)
+    ingredient_counts = {}
+    ingredient_text = {}
+    for recipe in recipes:
+        for name in ingredient_names(recipe.get('ingredients')):
+            key = normalize_text(name)
+            ingredient_counts[key] = ingredient_counts.get(key, 0) + 1
+            ingredient_text.setdefault(key, name)
+
+    entries = [{'text': recipe.get('name') or '', 'type': 'recipe', 'weight': 2.0, 'id': recipe.get('id')}
+               for recipe in recipes]
+    entries += [{'text': ingredient_text[key], 'type': 'ingredient', 'weight': 1.0 + min(count, 50) / 50.0}
+                for key, count in ingredient_counts.items()]
+    return SuggestIndex(entries)
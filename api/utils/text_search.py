@@ -0,0 +1,148 @@
+"""Tokenización para búsqueda de texto en español: sin tildes, sin stopwords y con stemming ligero."""
+import math
+import re
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Tuple
+
+from utils.food_matcher import ingredient_names, normalize_text
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+# Palabras vacías frecuentes en nombres y descripciones de recetas.
+# "sin" se mantiene a propósito ("sin gluten", "sin lactosa").
+SPANISH_STOPWORDS = frozenset((
+    'a', 'al', 'con', 'de', 'del', 'el', 'en', 'la', 'las', 'lo', 'los', 'o', 'para', 'por',
+    'su', 'sus', 'un', 'una', 'unas', 'unos', 'y', 'e', 'u'
+))
+
+# Peso de cada campo de la receta en la puntuación
+FIELD_WEIGHTS = {'name': 3.0, 'description': 1.5, 'ingredients': 1.0, 'tags': 1.0}
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def spanish_stem(word: str) -> str:
+    """Stemmer ligero: quita plurales y la vocal de género ("limones" -> "limon", "tomates" -> "tomat")."""
+    if len(word) <= 3:
+        return word
+    if word.endswith('ces'):
+        word = word[:-3] + 'z'
+    elif word.endswith('es') and len(word) > 4 and word[-3] not in 'aeiou':
+        word = word[:-2]
+    elif word.endswith('s'):
+        word = word[:-1]
+    if len(word) > 4 and word[-1] in 'aoe':
+        word = word[:-1]
+    return word
+
+
+def tokenize(text) -> List[str]:
+    """Términos indexables de un texto: normalizados, sin stopwords y con stemming."""
+    if not text:
+        return []
+    words = _WORD_RE.findall(normalize_text(str(text)))
+    return [spanish_stem(w) for w in words if w not in SPANISH_STOPWORDS]
+
+
+def _tags_text(tags) -> str:
+    if isinstance(tags, (list, tuple)):
+        return ' '.join(str(t) for t in tags)
+    return str(tags or '')
+
+
+def recipe_fields(recipe: Dict) -> Dict[str, str]:
+    """Texto de cada campo buscable de una receta."""
+    return {
+        'name': recipe.get('name') or '',
+        'description': recipe.get('description') or '',
+        'ingredients': ' '.join(ingredient_names(recipe.get('ingredients'))),
+        'tags': _tags_text(recipe.get('tags')),
+    }
+
+
+def fts5_query(query: str) -> str:
+    """Consulta FTS5 equivalente: todos los términos, el último como prefijo (búsqueda mientras se escribe)."""
+    terms = tokenize(query)
+    if not terms:
+        return ''
+    quoted = [f'"{t}"' for t in terms]
+    quoted[-1] += '*'
+    return ' AND '.join(quoted)
+
+
+class BM25Index:
+    """Índice invertido en memoria con puntuación BM25 por campos ponderados.
+
+    Todos los términos de la consulta deben aparecer (AND); el último se
+    trata como prefijo para que "pol" ya encuentre "pollo".
+    """
+
+    def __init__(self, recipes: Iterable[Dict]):
+        self._recipes = []
+        self._postings = {}   # término -> {posición: tf ponderada}
+        lengths = []
+        for recipe in recipes:
+            doc = len(self._recipes)
+            self._recipes.append(recipe)
+            length = 0.0
+            for field, text in recipe_fields(recipe).items():
+                weight = FIELD_WEIGHTS[field]
+                for term in tokenize(text):
+                    postings = self._postings.setdefault(term, {})
+                    postings[doc] = postings.get(doc, 0.0) + weight
+                    length += weight
+            lengths.append(length)
+        self._lengths = lengths
+        self._avg_length = (sum(lengths) / len(lengths)) if lengths else 1.0
+        self._vocabulary = sorted(self._postings)
+
+    def __len__(self) -> int:
+        return len(self._recipes)
+
+    def _expand(self, term: str, prefix: bool) -> List[str]:
+        if not prefix:
+            return [term] if term in self._postings else []
+        start = bisect_left(self._vocabulary, term)
+        found = []
+        for candidate in self._vocabulary[start:]:
+            if not candidate.startswith(term):
+                break
+            found.append(candidate)
+        return found
+
+    def _idf(self, term: str) -> float:
+        n = len(self._recipes)
+        df = len(self._postings[term])
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, limit: int = 20, meal_type: str = None) -> List[Tuple[float, Dict]]:
+        """Recetas que contienen todos los términos, ordenadas por puntuación BM25."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        scores = None
+        for i, term in enumerate(terms):
+            expansions = self._expand(term, prefix=(i == len(terms) - 1))
+            term_scores = {}
+            for expanded in expansions:
+                idf = self._idf(expanded)
+                for doc, tf in self._postings[expanded].items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[doc] / self._avg_length)
+                    term_scores[doc] = term_scores.get(doc, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {doc: scores[doc] + s for doc, s in term_scores.items() if doc in scores}
+            if not scores:
+                return []
+
+        ranked = []
+        for doc, score in scores.items():
+            recipe = self._recipes[doc]
+            if meal_type and recipe.get('meal_type') != meal_type:
+                continue
+            ranked.append((score, doc))
+        ranked.sort(key=lambda item: (-item[0], item[1]))
+        return [(score, self._recipes[doc]) for score, doc in ranked[:limit]]
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""Generar en lote el plan de la próxima semana para todos los usuarios activos.
+
+Pensado para ejecutarse fuera de hora punta (p. ej. domingo de madrugada por cron)
+en lugar de generar los planes de forma perezosa en la primera petición de la semana.
+
+Uso:
+    python week_rollover.py --workers 4 --page-size 500 --batch-size 1000
+"""
+
+import argparse
+import json
+import os
+from supabase import create_client
+from dotenv import load_dotenv
+
+from services.week_rollover import run_week_rollover, PROFILE_PAGE_SIZE, INSERT_BATCH_SIZE
+
+load_dotenv()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cambio de semana en lote')
+    parser.add_argument('--workers', type=int, default=None, help='Procesos del pool (por defecto, nº de CPUs)')
+    parser.add_argument('--page-size', type=int, default=PROFILE_PAGE_SIZE, help='Perfiles leídos por página')
+    parser.add_argument('--batch-size', type=int, default=INSERT_BATCH_SIZE, help='Filas por inserción en weekly_plans')
+    parser.add_argument('--week', type=int, default=None, help='Semana a generar (por defecto, la próxima)')
+    args = parser.parse_args()
+
+    supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
+
+    print("📅 Generando planes de la próxima semana...")
+    stats = run_week_rollover(
+        supabase,
+        workers=args.workers,
+        page_size=args.page_size,
+        batch_size=args.batch_size,
+        week_number=args.week
+    )
+    print(f"✅ {stats['users_planned']}/{stats['users']} usuarios, {stats['entries']} entradas "
+          f"en {stats['elapsed_seconds']}s ({stats['users_per_second']} usuarios/s)")
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == '__main__':
+    main()
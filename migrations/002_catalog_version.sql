@@ -0,0 +1,48 @@
+-- ============================================
+-- MIGRACIÓN: Versión del catálogo master_recipes
+-- Fecha: 2026-10-18
+-- ============================================
+--
+-- La API mantiene master_recipes en una caché en memoria (RecipeCatalog).
+-- Al vencer el TTL consulta get_catalog_version(); si la versión no ha
+-- cambiado, no vuelve a leer la tabla.
+
+-- 1. Tabla con el contador de versión (una sola fila)
+CREATE TABLE IF NOT EXISTS catalog_versions (
+  name TEXT PRIMARY KEY,
+  version BIGINT NOT NULL DEFAULT 1,
+  updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+INSERT INTO catalog_versions (name, version)
+VALUES ('master_recipes', 1)
+ON CONFLICT (name) DO NOTHING;
+
+-- 2. Lectura de la versión actual
+CREATE OR REPLACE FUNCTION get_catalog_version()
+RETURNS BIGINT AS $$
+  SELECT version FROM catalog_versions WHERE name = 'master_recipes';
+$$ LANGUAGE sql STABLE;
+
+-- 3. Hook explícito para cargas masivas
+CREATE OR REPLACE FUNCTION bump_catalog_version()
+RETURNS BIGINT AS $$
+  UPDATE catalog_versions
+  SET version = version + 1, updated_at = NOW()
+  WHERE name = 'master_recipes'
+  RETURNING version;
+$$ LANGUAGE sql;
+
+-- 4. Cualquier escritura en master_recipes sube la versión (una vez por sentencia)
+CREATE OR REPLACE FUNCTION master_recipes_bump_version()
+RETURNS TRIGGER AS $$
+BEGIN
+  PERFORM bump_catalog_version();
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_master_recipes_version ON master_recipes;
+CREATE TRIGGER trg_master_recipes_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON master_recipes
+FOR EACH STATEMENT EXECUTE FUNCTION master_recipes_bump_version();
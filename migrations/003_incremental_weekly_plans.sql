@@ -0,0 +1,66 @@
+-- ============================================
+-- MIGRACIÓN: Regeneración incremental de weekly_plans
+-- Fecha: 2026-10-18
+-- ============================================
+--
+-- POST /api/generate-plan con incremental=true ya no borra y reinserta toda
+-- la semana: la API calcula las diferencias con el plan guardado y las
+-- aplica en una sola llamada a apply_weekly_plan_diff(), que se ejecuta en
+-- una transacción. Las comidas cambiadas a mano (is_manual) no se tocan.
+
+-- 1. Marca de comidas cambiadas por el usuario (POST /api/plan/swap)
+ALTER TABLE weekly_plans ADD COLUMN IF NOT EXISTS is_manual BOOLEAN DEFAULT FALSE;
+
+CREATE INDEX IF NOT EXISTS idx_weekly_plans_user_week ON weekly_plans(user_id, week_number);
+
+-- 2. Aplicación atómica de las diferencias
+--    p_upserts: array JSON de entradas; con "id" actualizan esa fila, sin "id" se insertan
+--    p_delete_ids: filas a borrar
+CREATE OR REPLACE FUNCTION apply_weekly_plan_diff(
+  p_user_id UUID,
+  p_week_number INTEGER,
+  p_upserts JSONB DEFAULT '[]'::jsonb,
+  p_delete_ids UUID[] DEFAULT '{}'
+)
+RETURNS JSONB AS $$
+DECLARE
+  v_entry JSONB;
+  v_row weekly_plans%ROWTYPE;
+  v_count INTEGER;
+  v_inserted INTEGER := 0;
+  v_updated INTEGER := 0;
+  v_deleted INTEGER := 0;
+BEGIN
+  DELETE FROM weekly_plans
+  WHERE user_id = p_user_id AND week_number = p_week_number
+    AND id = ANY(p_delete_ids) AND NOT COALESCE(is_manual, FALSE);
+  GET DIAGNOSTICS v_deleted = ROW_COUNT;
+
+  FOR v_entry IN SELECT * FROM jsonb_array_elements(COALESCE(p_upserts, '[]'::jsonb)) LOOP
+    v_row := jsonb_populate_record(NULL::weekly_plans, v_entry);
+
+    IF v_row.id IS NOT NULL THEN
+      UPDATE weekly_plans
+      SET selected_recipe_id = v_row.selected_recipe_id,
+          calories = v_row.calories,
+          protein = v_row.protein,
+          carbs = v_row.carbs,
+          fat = v_row.fat,
+          recipe_name = v_row.recipe_name,
+          recipe_image = v_row.recipe_image
+      WHERE id = v_row.id AND user_id = p_user_id AND week_number = p_week_number
+        AND NOT COALESCE(is_manual, FALSE);
+      GET DIAGNOSTICS v_count = ROW_COUNT;
+      v_updated := v_updated + v_count;
+    ELSE
+      INSERT INTO weekly_plans (user_id, week_number, day_of_week, meal_type, selected_recipe_id,
+                                calories, protein, carbs, fat, recipe_name, recipe_image, is_manual)
+      VALUES (p_user_id, p_week_number, v_row.day_of_week, v_row.meal_type, v_row.selected_recipe_id,
+              v_row.calories, v_row.protein, v_row.carbs, v_row.fat, v_row.recipe_name, v_row.recipe_image, FALSE);
+      v_inserted := v_inserted + 1;
+    END IF;
+  END LOOP;
+
+  RETURN jsonb_build_object('inserted', v_inserted, 'updated', v_updated, 'deleted', v_deleted);
+END;
+$$ LANGUAGE plpgsql;
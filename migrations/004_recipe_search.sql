@@ -0,0 +1,107 @@
+-- ============================================
+-- MIGRACIÓN: Búsqueda de texto completo en master_recipes
+-- Fecha: 2026-10-18
+-- ============================================
+--
+-- /api/search-food buscaba con ilike '%q%' sobre name: sin índice, sin
+-- tildes ("limon" no encontraba "Limón") y sin mirar descripción ni
+-- ingredientes. Ahora usa search_recipes(), que consulta una columna
+-- tsvector con índice GIN, en español, sin tildes y con stemming.
+
+-- 1. Configuración de texto en español que ignora tildes
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+DO $$
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'es_unaccent') THEN
+    CREATE TEXT SEARCH CONFIGURATION public.es_unaccent (COPY = pg_catalog.spanish);
+    ALTER TEXT SEARCH CONFIGURATION public.es_unaccent
+      ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+  END IF;
+END $$;
+
+-- 2. Columna tsvector ponderada: nombre (A), descripción (B), ingredientes (C), etiquetas (D)
+ALTER TABLE master_recipes ADD COLUMN IF NOT EXISTS search_vector TSVECTOR;
+
+-- Solo los nombres de los ingredientes: indexar ingredients::text metería
+-- también las claves JSON ("name", "quantity", "unit"), que coinciden con
+-- todas las recetas y distorsionan el ranking. Admite los mismos formatos
+-- que la API: [{"name": ...}], ["..."] o un string separado por comas.
+CREATE OR REPLACE FUNCTION recipe_ingredient_names(p_ingredients JSONB)
+RETURNS TEXT AS $$
+  SELECT CASE jsonb_typeof(p_ingredients)
+    WHEN 'array' THEN (
+      SELECT string_agg(
+        CASE jsonb_typeof(item)
+          WHEN 'object' THEN item->>'name'
+          WHEN 'string' THEN item #>> '{}'
+        END, ', ')
+      FROM jsonb_array_elements(p_ingredients) AS item
+    )
+    WHEN 'string' THEN p_ingredients #>> '{}'
+  END;
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION master_recipes_search_vector()
+RETURNS TRIGGER AS $$
+BEGIN
+  NEW.search_vector :=
+    setweight(to_tsvector('public.es_unaccent', COALESCE(NEW.name, '')), 'A') ||
+    setweight(to_tsvector('public.es_unaccent', COALESCE(NEW.description, '')), 'B') ||
+    setweight(to_tsvector('public.es_unaccent', COALESCE(recipe_ingredient_names(NEW.ingredients), '')), 'C') ||
+    setweight(to_tsvector('public.es_unaccent', COALESCE(array_to_string(NEW.tags, ' '), '')), 'D');
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_master_recipes_search_vector ON master_recipes;
+CREATE TRIGGER trg_master_recipes_search_vector
+BEFORE INSERT OR UPDATE OF name, description, ingredients, tags ON master_recipes
+FOR EACH ROW EXECUTE FUNCTION master_recipes_search_vector();
+
+-- Rellenar las filas existentes (el trigger calcula el vector)
+UPDATE master_recipes SET name = name;
+
+CREATE INDEX IF NOT EXISTS idx_master_recipes_search ON master_recipes USING GIN(search_vector);
+
+-- 3. Búsqueda ordenada por relevancia
+--    Todos los términos deben aparecer; el último se busca como prefijo
+--    (búsqueda mientras se escribe). ts_rank_cd normalizado por longitud
+--    es lo más parecido a BM25 que ofrece PostgreSQL.
+CREATE OR REPLACE FUNCTION search_recipes(
+  p_query TEXT,
+  p_limit INTEGER DEFAULT 20,
+  p_meal_type TEXT DEFAULT NULL
+)
+RETURNS TABLE (id UUID, rank REAL) AS $$
+#variable_conflict use_column
+DECLARE
+  v_terms TEXT[];
+  v_tsquery TSQUERY;
+BEGIN
+  SELECT array_agg(w) INTO v_terms
+  FROM regexp_split_to_table(lower(unaccent(COALESCE(p_query, ''))), '[^a-z0-9]+') AS w
+  WHERE w <> '';
+
+  IF v_terms IS NULL THEN
+    RETURN;
+  END IF;
+
+  v_tsquery := to_tsquery(
+    'public.es_unaccent',
+    array_to_string(
+      array(SELECT quote_literal(t) FROM unnest(v_terms[1:array_length(v_terms, 1) - 1]) AS t)
+      || (quote_literal(v_terms[array_length(v_terms, 1)]) || ':*'),
+      ' & '
+    )
+  );
+
+  RETURN QUERY
+  SELECT r.id, ts_rank_cd(r.search_vector, v_tsquery, 1 | 32) AS rank
+  FROM master_recipes r
+  WHERE r.search_vector @@ v_tsquery
+    AND (p_meal_type IS NULL OR r.meal_type = p_meal_type)
+  ORDER BY rank DESC, r.name
+  LIMIT p_limit;
+END;
+$$ LANGUAGE plpgsql STABLE;
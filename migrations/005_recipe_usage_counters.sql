@@ -0,0 +1,67 @@
+-- ============================================
+-- MIGRACIÓN: Contadores de uso de recetas y ranking de populares
+-- Fecha: 2026-10-18
+-- ============================================
+--
+-- La API hacía update({'times_used': 1}) en user_food_bank, que
+-- sobrescribía el contador en lugar de sumarle uno, con una escritura
+-- síncrona por cada cambio de plato. Ahora acumula los incrementos en
+-- memoria y los envía por lotes a increment_recipe_usage_batch(). Las
+-- recetas populares se leen de una vista materializada que se refresca
+-- periódicamente en lugar de ordenar user_food_bank en cada petición.
+
+-- 1. Incremento atómico por lotes
+--    p_increments: [{"user_id": ..., "recipe_id": ..., "delta": n}, ...]
+--    Las variables %TYPE convierten los ids al tipo real de la columna,
+--    así cada UPDATE usa idx_foodbank_user_recipe.
+CREATE OR REPLACE FUNCTION increment_recipe_usage_batch(p_increments JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+  v_item RECORD;
+  v_user_id user_food_bank.user_id%TYPE;
+  v_recipe_id user_food_bank.recipe_id%TYPE;
+  v_updated INTEGER := 0;
+  v_rows INTEGER;
+BEGIN
+  -- Orden fijo de filas para que dos lotes concurrentes no se bloqueen mutuamente
+  FOR v_item IN
+    SELECT user_id, recipe_id, SUM(delta)::INTEGER AS delta
+    FROM jsonb_to_recordset(COALESCE(p_increments, '[]'::jsonb)) AS x(user_id TEXT, recipe_id TEXT, delta INTEGER)
+    GROUP BY user_id, recipe_id
+    ORDER BY user_id, recipe_id
+  LOOP
+    v_user_id := v_item.user_id;
+    v_recipe_id := v_item.recipe_id;
+    UPDATE user_food_bank
+    SET times_used = COALESCE(times_used, 0) + v_item.delta
+    WHERE user_id = v_user_id AND recipe_id = v_recipe_id;
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    v_updated := v_updated + v_rows;
+  END LOOP;
+  RETURN v_updated;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 2. Ranking materializado de recetas populares
+CREATE MATERIALIZED VIEW IF NOT EXISTS popular_recipes AS
+SELECT
+  recipe_id,
+  SUM(COALESCE(times_used, 0))::BIGINT AS total_uses,
+  COUNT(DISTINCT user_id)::BIGINT AS users
+FROM user_food_bank
+GROUP BY recipe_id;
+
+-- Índice único: permite REFRESH ... CONCURRENTLY (sin bloquear lecturas)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_popular_recipes_recipe ON popular_recipes(recipe_id);
+CREATE INDEX IF NOT EXISTS idx_popular_recipes_rank ON popular_recipes(total_uses DESC, users DESC);
+
+-- 3. Refresco (lo llama la API tras volcar contadores, como mucho cada pocos minutos)
+CREATE OR REPLACE FUNCTION refresh_popular_recipes()
+RETURNS VOID AS $$
+BEGIN
+  REFRESH MATERIALIZED VIEW CONCURRENTLY popular_recipes;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Con pg_cron disponible también puede programarse en la base de datos:
+-- SELECT cron.schedule('refresh-popular-recipes', '*/10 * * * *', 'SELECT refresh_popular_recipes()');
@@ -0,0 +1,39 @@
+-- ============================================
+-- MIGRACIÓN: Reemplazo atómico de weekly_plans en el cambio de semana
+-- Fecha: 2026-10-18
+-- ============================================
+--
+-- El cambio de semana en lote borraba el plan de la próxima semana de toda
+-- una página de usuarios y después insertaba las filas nuevas en llamadas
+-- separadas: si fallaba una inserción, esos usuarios se quedaban sin plan.
+-- replace_weekly_plans() hace el borrado y la inserción de un grupo de
+-- usuarios en una sola transacción; si algo falla, se conserva el plan
+-- anterior.
+
+--    p_user_ids: usuarios cuyo plan de p_week_number se reemplaza
+--    p_entries: array JSON de entradas nuevas (mismas columnas que weekly_plans, sin id)
+CREATE OR REPLACE FUNCTION replace_weekly_plans(
+  p_week_number INTEGER,
+  p_user_ids UUID[],
+  p_entries JSONB DEFAULT '[]'::jsonb
+)
+RETURNS JSONB AS $$
+DECLARE
+  v_deleted INTEGER := 0;
+  v_inserted INTEGER := 0;
+BEGIN
+  DELETE FROM weekly_plans
+  WHERE user_id = ANY(p_user_ids) AND week_number = p_week_number;
+  GET DIAGNOSTICS v_deleted = ROW_COUNT;
+
+  INSERT INTO weekly_plans (user_id, week_number, day_of_week, meal_type, selected_recipe_id,
+                            calories, protein, carbs, fat)
+  SELECT e.user_id, p_week_number, e.day_of_week, e.meal_type, e.selected_recipe_id,
+         e.calories, e.protein, e.carbs, e.fat
+  FROM jsonb_populate_recordset(NULL::weekly_plans, COALESCE(p_entries, '[]'::jsonb)) AS e
+  WHERE e.user_id = ANY(p_user_ids);
+  GET DIAGNOSTICS v_inserted = ROW_COUNT;
+
+  RETURN jsonb_build_object('deleted', v_deleted, 'inserted', v_inserted);
+END;
+$$ LANGUAGE plpgsql;